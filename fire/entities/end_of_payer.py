@@ -5,8 +5,8 @@ and support functions for conversion into different formats.
 """
 from itertools import chain
 
-from fire.translator.util import rjust_zero
-from fire.translator.util import factor_transforms, xform_entity, fire_entity
+from fire.translator.kernels import identity, zero_fill
+from fire.translator.util import RecordLayout
 
 """
 _END_OF_PAYER_TRANSFORMS
@@ -18,24 +18,26 @@ Values in key-value pairs represent metadata in the following format:
 """
 
 _ITEMS = [
-    ("record_type", ("C", 1, "\x00", lambda x: x)),
-    ("number_of_payees", ("", 8, "0", lambda x: x)),
-    ("blank_1", ("", 6, "\x00", lambda x: x)),
+    ("record_type", ("C", 1, "\x00", identity)),
+    ("number_of_payees", ("", 8, "0", identity)),
+    ("blank_1", ("", 6, "\x00", identity)),
 ]
 
 for field in chain((x for x in range(1, 10)), \
                    (chr(x) for x in range(ord('A'), ord('H')))):
     _ITEMS.append((f"payment_amount_{field}",
-                   (18*"0", 18, "0", lambda x: rjust_zero(x, 18))))
+                   (18*"0", 18, "0", zero_fill(18))))
 
 _ITEMS += [
-    ("blank_2", ("", 196, "\x00", lambda x: x)),
-    ("record_sequence_number", ("", 8, "0", lambda x: x)),
-    ("blank_3", ("", 241, "\x00", lambda x: x)),
-    ("blank_4", ("", 2, "\x00", lambda x: x))
+    ("blank_2", ("", 196, "\x00", identity)),
+    ("record_sequence_number", ("", 8, "0", identity)),
+    ("blank_3", ("", 241, "\x00", identity)),
+    ("blank_4", ("", 2, "\x00", identity))
 ]
 
-_END_OF_PAYER_SORT, _END_OF_PAYER_TRANSFORMS = factor_transforms(_ITEMS)
+_END_OF_PAYER_LAYOUT = RecordLayout(_ITEMS)
+_END_OF_PAYER_SORT, _END_OF_PAYER_TRANSFORMS = \
+    _END_OF_PAYER_LAYOUT.sort_keys, _END_OF_PAYER_LAYOUT.transforms
 
 def xform(data):
     """
@@ -55,7 +57,7 @@ def xform(data):
         Dictionary containing processed (transformed) data provided as a
         parameter.
     """
-    return xform_entity(_END_OF_PAYER_TRANSFORMS, data)
+    return _END_OF_PAYER_LAYOUT.xform(data)
 
 def fire(data):
     """
@@ -73,4 +75,4 @@ def fire(data):
     str
         String formatted to meet IRS Publication 1220
     """
-    return fire_entity(_END_OF_PAYER_TRANSFORMS, _END_OF_PAYER_SORT, data)
+    return _END_OF_PAYER_LAYOUT.fire(data)
@@ -3,8 +3,8 @@ Module: entities.end_of_transmission
 Representation of an "end_of_transmission" record, including transformation
 functions and support functions for conversion into different formats.
 """
-from fire.translator.util import rjust_zero
-from fire.translator.util import factor_transforms, xform_entity, fire_entity
+from fire.translator.kernels import identity, zero_fill
+from fire.translator.util import RecordLayout
 
 """
 _END_OF_TRANSMISSION_TRANSFORMS
@@ -16,20 +16,21 @@ Values in key-value pairs represent metadata in the following format:
 """
 
 _ITEMS = [
-    ("record_type", ("F", 1, "\x00", lambda x: x)),
-    ("number_of_a_records", ("00000000", 8, "0", lambda x: rjust_zero(x, 8))),
-    ("zeros", (21*"0", 21, "0", lambda x: x)),
-    ("blank_1", ("", 19, "\x00", lambda x: x)),
+    ("record_type", ("F", 1, "\x00", identity)),
+    ("number_of_a_records", ("00000000", 8, "0", zero_fill(8))),
+    ("zeros", (21*"0", 21, "0", identity)),
+    ("blank_1", ("", 19, "\x00", identity)),
     ("total_number_of_payees",
-     ("00000000", 8, "0", lambda x: rjust_zero(x, 8))),
-    ("blank_2", ("", 442, "\x00", lambda x: x)),
-    ("record_sequence_number", ("", 8, "0", lambda x: x)),
-    ("blank_3", ("", 241, "\x00", lambda x: x)),
-    ("blank_4", ("", 2, "\x00", lambda x: x))
+     ("00000000", 8, "0", zero_fill(8))),
+    ("blank_2", ("", 442, "\x00", identity)),
+    ("record_sequence_number", ("", 8, "0", identity)),
+    ("blank_3", ("", 241, "\x00", identity)),
+    ("blank_4", ("", 2, "\x00", identity))
 ]
 
+_END_OF_TRANSMISSION_LAYOUT = RecordLayout(_ITEMS)
 _END_OF_TRANSMISSION_SORT, _END_OF_TRANSMISSION_TRANSFORMS = \
-    factor_transforms(_ITEMS)
+    _END_OF_TRANSMISSION_LAYOUT.sort_keys, _END_OF_TRANSMISSION_LAYOUT.transforms
 
 def xform(data):
     """
@@ -49,7 +50,7 @@ def xform(data):
         Dictionary containing processed (transformed) data provided as a
         parameter.
     """
-    return xform_entity(_END_OF_TRANSMISSION_TRANSFORMS, data)
+    return _END_OF_TRANSMISSION_LAYOUT.xform(data)
 
 def fire(data):
     """
@@ -67,6 +68,4 @@ def fire(data):
     str
         String formatted to meet IRS Publication 1220
     """
-    return fire_entity(
-        _END_OF_TRANSMISSION_TRANSFORMS,
-        _END_OF_TRANSMISSION_SORT, data)
+    return _END_OF_TRANSMISSION_LAYOUT.fire(data)
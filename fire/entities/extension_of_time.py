@@ -3,8 +3,8 @@ Module: entities.extension_of_time
 Representation of a "extension_of_time" record, including transformation
 functions and support functions for conversion into different formats.
 """
-from fire.translator.util import digits_only, uppercase
-from fire.translator.util import factor_transforms, xform_entity, fire_entity
+from fire.translator.kernels import identity, digits_only, uppercase
+from fire.translator.util import RecordLayout
 
 """
 EXTENSION_OF_TIME_TRANSFORMS
@@ -24,14 +24,15 @@ _ITEMS = [
     ("payer_city", ("", 40, "\x00", uppercase)),
     ("payer_state", ("", 2, "\x00", uppercase)),
     ("payer_zip_code", ("", 9, "\x00", digits_only)),
-    ("document_indicator", ("A", 1, "\x00", lambda x: x)),
-    ("foreign_entity_indicator", ("", 1, "\x00", lambda x: x)),
-    ("blank_1", ("", 11, "\x00", lambda x: x)),
-    ("blank_2", ("", 2, "\x00", lambda x: x))
+    ("document_indicator", ("A", 1, "\x00", identity)),
+    ("foreign_entity_indicator", ("", 1, "\x00", identity)),
+    ("blank_1", ("", 11, "\x00", identity)),
+    ("blank_2", ("", 2, "\x00", identity))
 ]
 
+_EXTENSION_OF_TIME_LAYOUT = RecordLayout(_ITEMS, 200)
 _EXTENSION_OF_TIME_SORT, _EXTENSION_OF_TIME_TRANSFORMS = \
-    factor_transforms(_ITEMS)
+    _EXTENSION_OF_TIME_LAYOUT.sort_keys, _EXTENSION_OF_TIME_LAYOUT.transforms
 
 def xform(data):
     """
@@ -51,7 +52,7 @@ def xform(data):
         Dictionary containing processed (transformed) data provided as a
         parameter.
     """
-    return xform_entity(_EXTENSION_OF_TIME_TRANSFORMS, data)
+    return _EXTENSION_OF_TIME_LAYOUT.xform(data)
 
 def fire(data):
     """
@@ -69,5 +70,4 @@ def fire(data):
     str
         String formatted to meet IRS Publication 1220
     """
-    return fire_entity(_EXTENSION_OF_TIME_TRANSFORMS,
-                       _EXTENSION_OF_TIME_SORT, data, 200)
+    return _EXTENSION_OF_TIME_LAYOUT.fire(data)
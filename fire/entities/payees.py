@@ -8,8 +8,9 @@ an individual payee)
 """
 from itertools import chain
 
-from fire.translator.util import digits_only, uppercase, rjust_zero
-from fire.translator.util import factor_transforms, xform_entity, fire_entity
+from fire.translator.kernels import identity, digits_only, uppercase, zero_fill
+from fire.translator.util import RecordLayout
+from fire.translator.columns import RecordColumns
 """
 _PAYEE_TRANSFORMS
 -----------------------
@@ -20,51 +21,54 @@ Values in key-value pairs represent metadata in the following format:
 """
 
 _ITEMS = [
-    ("record_type", ("B", 1, "\x00", lambda x: x)),
-    ("payment_year", ("", 4, "\x00", lambda x: x)),
+    ("record_type", ("B", 1, "\x00", identity)),
+    ("payment_year", ("", 4, "\x00", identity)),
     ("corrected_return_indicator", ("", 1, "\x00", uppercase)),
     ("payees_name_control", ("", 4, "\x00", uppercase)),
-    ("type_of_tin", ("1", 1, "\x00", lambda x: x)),
+    ("type_of_tin", ("1", 1, "\x00", identity)),
     ("payees_tin", ("000000000", 9, "\x00", digits_only)),
-    ("payers_account_number_for_payee", ("", 20, "\x00", lambda x: x)),
-    ("payers_office_code", ("", 4, "\x00", lambda x: x)),
-    ("blank_1", ("", 10, "\x00", lambda x: x))
+    ("payers_account_number_for_payee", ("", 20, "\x00", identity)),
+    ("payers_office_code", ("", 4, "\x00", identity)),
+    ("blank_1", ("", 10, "\x00", identity))
 ]
 
 for field in chain((x for x in range(1, 10)), \
                    (chr(x) for x in range(ord('A'), ord('H')))):
     _ITEMS.append((f"payment_amount_{field}",
-                   ("000000000000", 12, "\x00", lambda x: rjust_zero(x, 12))))
+                   ("000000000000", 12, "\x00", zero_fill(12))))
 
 _ITEMS += [
-    ("foreign_country_indicator", ("", 1, "\x00", lambda x: x)),
+    ("foreign_country_indicator", ("", 1, "\x00", identity)),
     ("first_payee_name_line", ("", 40, "\x00", uppercase)),
     ("second_payee_name_line", ("", 40, "\x00", uppercase)),
-    ("blank_2", ("", 40, "\x00", lambda x: x)),
-    ("payee_mailing_address", ("", 40, "\x00", lambda x: x)),
-    ("blank_3", ("", 40, "\x00", lambda x: x)),
-    ("payee_city", ("", 40, "\x00", lambda x: x)),
-    ("payee_state", ("", 2, "\x00", lambda x: x)),
-    ("payee_zip_code", ("", 9, "\x00", lambda x: x)),
-    ("blank_4", ("", 1, "\x00", lambda x: x)),
+    ("blank_2", ("", 40, "\x00", identity)),
+    ("payee_mailing_address", ("", 40, "\x00", identity)),
+    ("blank_3", ("", 40, "\x00", identity)),
+    ("payee_city", ("", 40, "\x00", identity)),
+    ("payee_state", ("", 2, "\x00", identity)),
+    ("payee_zip_code", ("", 9, "\x00", identity)),
+    ("blank_4", ("", 1, "\x00", identity)),
     ("record_sequence_number",
-     ("00000003", 8, "\x00", lambda x: rjust_zero(x, 8))),
-    ("blank_5", ("", 36, "\x00", lambda x: x)),
-    ("second_tin_notice", ("", 1, "\x00", lambda x: x)),
-    ("blank_6", ("", 2, "\x00", lambda x: x)),
-    ("direct_sales_indicator", ("", 1, "\x00", lambda x: x)),
-    ("fatca_filing_requirement_indicator", ("", 1, "\x00", lambda x: x)),
-    ("blank_7", ("", 114, "\x00", lambda x: x)),
-    ("special_data_entries", ("", 60, "\x00", lambda x: x)),
-    ("state_income_tax_withheld", ("", 12, "\x00", lambda x: x)),
-    ("local_income_tax_withheld", ("", 12, "\x00", lambda x: x)),
-    ("combined_federal_state_code", ("", 2, "\x00", lambda x: x)),
-    ("blank_8", ("", 2, "\x00", lambda x: x))
+     ("00000003", 8, "\x00", zero_fill(8))),
+    ("blank_5", ("", 36, "\x00", identity)),
+    ("second_tin_notice", ("", 1, "\x00", identity)),
+    ("blank_6", ("", 2, "\x00", identity)),
+    ("direct_sales_indicator", ("", 1, "\x00", identity)),
+    ("fatca_filing_requirement_indicator", ("", 1, "\x00", identity)),
+    ("blank_7", ("", 114, "\x00", identity)),
+    ("special_data_entries", ("", 60, "\x00", identity)),
+    ("state_income_tax_withheld", ("", 12, "\x00", identity)),
+    ("local_income_tax_withheld", ("", 12, "\x00", identity)),
+    ("combined_federal_state_code", ("", 2, "\x00", identity)),
+    ("blank_8", ("", 2, "\x00", identity))
 ]
 
-_PAYEE_SORT, _PAYEE_TRANSFORMS = factor_transforms(_ITEMS)
+_PAYEE_LAYOUT = RecordLayout(_ITEMS)
+_AMOUNT_KEYS = [key for key, _ in _ITEMS if key.startswith("payment_amount_")]
+_PAYEE_SORT, _PAYEE_TRANSFORMS = \
+    _PAYEE_LAYOUT.sort_keys, _PAYEE_LAYOUT.transforms
 
-def xform(data):
+def xform(data, storage="dict"):
     """
     Applies transformation functions definted in _PAYEE_TRANSFORMS to data
     supplied as parameter.
@@ -75,17 +79,27 @@ def xform(data):
         Array of dict elements containing Payee data.
         Expects element of the array to have keys that exist in the
         _PAYEE_TRANSFORMS dict (not required to have all keys).
+    storage : str
+        optional in-memory representation of the transformed payees: "dict"
+        (the default) or "slots", for compact records with one slot per
+        field (see util.SlottedRecord), which take a fraction of the memory,
+        or "columnar" to store all payees column by column in a single
+        RecordColumns, for very large payers.
 
     Returns
     ----------
-    dict
-        Dictionary containing processed (transformed) data provided as a
-        parameter.
+    list or RecordColumns
+        List of dicts (or records) containing processed (transformed) data
+        provided as a parameter.
     """
-    payees = []
-    for payee in data:
-        payees.append(xform_entity(_PAYEE_TRANSFORMS, payee))
-    return payees
+    if storage == "dict":
+        return [_PAYEE_LAYOUT.xform(payee) for payee in data]
+    if storage == "slots":
+        return [_PAYEE_LAYOUT.xform_record(payee) for payee in data]
+    if storage == "columnar":
+        return RecordColumns(_PAYEE_LAYOUT, map(_PAYEE_LAYOUT.xform, data),
+                             integer_keys=_AMOUNT_KEYS)
+    raise ValueError(f"Unknown payee storage: {storage}")
 
 def fire(data):
     """
@@ -96,13 +110,40 @@ def fire(data):
     ----------
     data : array[dict]
         Expects data elements to have all keys specified in _PAYEE_TRANSFORMS.
+        The records returned by xform(data, "slots") and
+        xform(data, "columnar") are also accepted, as is any other store that
+        renders its records with a fire() method (such as the payees returned
+        by cache.RenderCache.xform).
 
     Returns
     ----------
     str
         String formatted to meet IRS Publication 1220
     """
-    payees_string = ""
-    for payee in data:
-        payees_string += fire_entity(_PAYEE_TRANSFORMS, _PAYEE_SORT, payee)
-    return payees_string
+    if hasattr(data, "fire"):
+        return data.fire()
+    return _PAYEE_LAYOUT.fire_all(data)
+
+def iter_fire(data, chunk_size=1000):
+    """
+    Yields the same records as fire(data), as strings of at most chunk_size
+    records each, so that the records of a large payer are never held as a
+    single string.
+
+    Parameters
+    ----------
+    data : array[dict]
+        Payees, in any of the forms accepted by fire().
+    chunk_size : int
+        optional number of records per string
+
+    Returns
+    ----------
+    generator of str
+        Strings formatted to meet IRS Publication 1220
+    """
+    for start in range(0, len(data), chunk_size):
+        if hasattr(data, "fire"):
+            yield data.fire(start, start + chunk_size)
+        else:
+            yield _PAYEE_LAYOUT.fire_all(data[start:start + chunk_size])
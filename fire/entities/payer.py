@@ -3,8 +3,8 @@ Module: entities.payer
 Representation of a "payer" record, including transformation functions
 and support functions for conversion into different formats.
 """
-from fire.translator.util import digits_only, uppercase, rjust_zero
-from fire.translator.util import factor_transforms, xform_entity, fire_entity
+from fire.translator.kernels import identity, digits_only, uppercase, zero_fill
+from fire.translator.util import RecordLayout
 
 """
 _PAYER_TRANSFORMS
@@ -16,33 +16,35 @@ Values in key-value pairs represent metadata in the following format:
 """
 
 _ITEMS = [
-    ("record_type", ("A", 1, "\x00", lambda x: x)),
+    ("record_type", ("A", 1, "\x00", identity)),
     ("payment_year", ("", 4, "\x00", digits_only)),
-    ("combined_fed_state", ("", 1, "\x00", lambda x: x)),
-    ("blank_1", ("", 5, "\x00", lambda x: x)),
+    ("combined_fed_state", ("", 1, "\x00", identity)),
+    ("blank_1", ("", 5, "\x00", identity)),
     ("payer_tin", ("", 9, "\x00", digits_only)),
     ("payer_name_control", ("", 4, "\x00", uppercase)),
-    ("last_filing_indicator", ("", 1, "\x00", lambda x: x)),
+    ("last_filing_indicator", ("", 1, "\x00", identity)),
     ("type_of_return", ("A", 2, "\x00", uppercase)),
-    ("amount_codes", ("7", 16, "\x00", lambda x: x)),
-    ("blank_2", ("", 8, "\x00", lambda x: x)),
-    ("foreign_entity_indicator", ("", 1, "\x00", lambda x: x)),
+    ("amount_codes", ("7", 16, "\x00", identity)),
+    ("blank_2", ("", 8, "\x00", identity)),
+    ("foreign_entity_indicator", ("", 1, "\x00", identity)),
     ("first_payer_name", ("", 40, "\x00", uppercase)),
     ("second_payer_name", ("", 40, "\x00", uppercase)),
-    ("transfer_agent_control", ("0", 1, "\x00", lambda x: x)),
+    ("transfer_agent_control", ("0", 1, "\x00", identity)),
     ("payer_shipping_address", ("", 40, "\x00", uppercase)),
     ("payer_city", ("", 40, "\x00", uppercase)),
     ("payer_state", ("", 2, "\x00", uppercase)),
     ("payer_zip_code", ("", 9, "\x00", digits_only)),
     ("payer_telephone_number_and_ext", ("", 15, "\x00", digits_only)),
-    ("blank_3", ("", 260, "\x00", lambda x: x)),
+    ("blank_3", ("", 260, "\x00", identity)),
     ("record_sequence_number",
-     ("00000002", 8, "\x00", lambda x: rjust_zero(x, 8))),
-    ("blank_4", ("", 241, "\x00", lambda x: x)),
-    ("blank_5", ("", 2, "\x00", lambda x: x))
+     ("00000002", 8, "\x00", zero_fill(8))),
+    ("blank_4", ("", 241, "\x00", identity)),
+    ("blank_5", ("", 2, "\x00", identity))
 ]
 
-_PAYER_SORT, _PAYER_TRANSFORMS = factor_transforms(_ITEMS)
+_PAYER_LAYOUT = RecordLayout(_ITEMS)
+_PAYER_SORT, _PAYER_TRANSFORMS = \
+    _PAYER_LAYOUT.sort_keys, _PAYER_LAYOUT.transforms
 
 def xform(data):
     """
@@ -62,7 +64,7 @@ def xform(data):
         Dictionary containing processed (transformed) data provided as a
         parameter.
     """
-    return xform_entity(_PAYER_TRANSFORMS, data)
+    return _PAYER_LAYOUT.xform(data)
 
 def fire(data):
     """
@@ -79,4 +81,4 @@ def fire(data):
     str
         String formatted to meet IRS Publication 1220
     """
-    return fire_entity(_PAYER_TRANSFORMS, _PAYER_SORT, data)
+    return _PAYER_LAYOUT.fire(data)
@@ -5,8 +5,8 @@ and support functions for conversion into different formats.
 """
 from itertools import chain
 
-from fire.translator.util import rjust_zero
-from fire.translator.util import factor_transforms, xform_entity, fire_entity
+from fire.translator.kernels import identity, zero_fill
+from fire.translator.util import RecordLayout
 
 """
 _STATE_TOTALS_TRANSFORMS
@@ -18,28 +18,30 @@ Values in key-value pairs represent metadata in the following format:
 """
 
 _ITEMS = [
-    ("record_type", ("K", 1, "\x00", lambda x: x)),
-    ("number_of_payees", ("", 8, "0", lambda x: x)),
-    ("blank_1", ("", 6, "\x00", lambda x: x)),
+    ("record_type", ("K", 1, "\x00", identity)),
+    ("number_of_payees", ("", 8, "0", identity)),
+    ("blank_1", ("", 6, "\x00", identity)),
 ]
 
 for field in chain((x for x in range(1, 10)), \
                    (chr(x) for x in range(ord('A'), ord('H')))):
     _ITEMS.append((f"payment_amount_{field}",
-                   (18*"0", 18, "0", lambda x: rjust_zero(x, 18))))
+                   (18*"0", 18, "0", zero_fill(18))))
 
 _ITEMS += [
-    ("blank_2", ("", 196, "\x00", lambda x: x)),
-    ("record_sequence_number", ("", 8, "0", lambda x: x)),
-    ("blank_3", ("", 199, "\x00", lambda x: x)),
-    ("state_income_tax_withheld", ("", 18, "\x00", lambda x: x)),
-    ("local_income_tax_withheld", ("", 18, "\x00", lambda x: x)),
-    ("blank_4", ("", 4, "\x00", lambda x: x)),
-    ("combined_federal_state_code", ("", 2, "\x00", lambda x: x)),
-    ("blank_5", ("", 2, "\x00", lambda x: x))
+    ("blank_2", ("", 196, "\x00", identity)),
+    ("record_sequence_number", ("", 8, "0", identity)),
+    ("blank_3", ("", 199, "\x00", identity)),
+    ("state_income_tax_withheld", ("", 18, "\x00", identity)),
+    ("local_income_tax_withheld", ("", 18, "\x00", identity)),
+    ("blank_4", ("", 4, "\x00", identity)),
+    ("combined_federal_state_code", ("", 2, "\x00", identity)),
+    ("blank_5", ("", 2, "\x00", identity))
 ]
 
-_STATE_TOTALS_SORT, _STATE_TOTALS_TRANSFORMS = factor_transforms(_ITEMS)
+_STATE_TOTALS_LAYOUT = RecordLayout(_ITEMS)
+_STATE_TOTALS_SORT, _STATE_TOTALS_TRANSFORMS = \
+    _STATE_TOTALS_LAYOUT.sort_keys, _STATE_TOTALS_LAYOUT.transforms
 
 def xform(data):
     """
@@ -62,7 +64,7 @@ def xform(data):
     """
     state_totals = []
     for state_total in data:
-        state_totals.append(xform_entity(_STATE_TOTALS_TRANSFORMS, state_total))
+        state_totals.append(_STATE_TOTALS_LAYOUT.xform(state_total))
     return state_totals
 
 def fire(data):
@@ -81,11 +83,5 @@ def fire(data):
     str
         String formatted to meet IRS Publication 1220
     """
-    state_totals_string = ""
-    for state_total in data:
-        state_totals_string += fire_entity(
-            _STATE_TOTALS_TRANSFORMS,
-            _STATE_TOTALS_SORT,
-            state_total
-        )
-    return state_totals_string
+    return "".join([_STATE_TOTALS_LAYOUT.fire(state_total)
+                    for state_total in data])
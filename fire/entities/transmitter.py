@@ -4,8 +4,8 @@ Module: entities.transmitter
 Representation of a "transmitter" record, including transformation functions
 and support functions for conversion into different formats.
 """
-from fire.translator.util import digits_only, uppercase, rjust_zero
-from fire.translator.util import factor_transforms, xform_entity, fire_entity
+from fire.translator.kernels import identity, digits_only, uppercase, zero_fill
+from fire.translator.util import RecordLayout
 
 """
 _TRANSMITTER_TRANSFORMS
@@ -17,14 +17,14 @@ Values in key-value pairs represent metadata in the following format:
 """
 
 _ITEMS = [
-    ("record_type", ("T", 1, "\x00", lambda x: x)),
+    ("record_type", ("T", 1, "\x00", identity)),
     ("payment_year", ("0000", 4, "0", digits_only)),
     ("prior_year_data_indicator", ("", 1, "\x00", uppercase)),
     ("transmitter_tin", ("000000000", 9, "0", digits_only)),
     ("transmitter_control_code", ("", 5, "\x00", uppercase)),
-    ("blank_1", ("", 7, "\x00", lambda x: x)),
-    ("test_file_indicator", ("T", 1, "\x00", lambda x: x)),
-    ("foreign_entity_indicator", ("", 1, "\x00", lambda x: x)),
+    ("blank_1", ("", 7, "\x00", identity)),
+    ("test_file_indicator", ("T", 1, "\x00", identity)),
+    ("foreign_entity_indicator", ("", 1, "\x00", identity)),
     ("transmitter_name", ("", 40, "\x00", uppercase)),
     ("transmitter_name_contd", ("", 40, "\x00", uppercase)),
     ("company_name", ("", 40, "\x00", uppercase)),
@@ -33,32 +33,34 @@ _ITEMS = [
     ("company_city", ("", 40, "\x00", uppercase)),
     ("company_state", ("", 2, "\x00", uppercase)),
     ("company_zip_code", ("", 9, "\x00", digits_only)),
-    ("blank_2", ("", 15, "\x00", lambda x: x)),
+    ("blank_2", ("", 15, "\x00", identity)),
     ("total_number_of_payees",
-     ("00000000", 8, "0", lambda x: rjust_zero(x, 8))),
-    ("contact_name", ("", 40, "\x00", lambda x: x)),
+     ("00000000", 8, "0", zero_fill(8))),
+    ("contact_name", ("", 40, "\x00", identity)),
     ("contact_telephone_number_and_ext",
      ("", 15, "\x00", digits_only)),
-    ("contact_email_address", ("", 50, "\x00", lambda x: x)),
-    ("blank_3", ("", 91, "\x00", lambda x: x)),
-    ("record_sequence_number", ("", 8, "\x00", lambda x: x)),
-    ("blank_4", ("", 10, "\x00", lambda x: x)),
+    ("contact_email_address", ("", 50, "\x00", identity)),
+    ("blank_3", ("", 91, "\x00", identity)),
+    ("record_sequence_number", ("", 8, "\x00", identity)),
+    ("blank_4", ("", 10, "\x00", identity)),
     ("vendor_indicator", ("I", 1, "\x00", uppercase)),
     ("vendor_name", ("", 40, "\x00", uppercase)),
-    ("vendor_mailing_address", ("", 40, "\x00", lambda x: x)),
+    ("vendor_mailing_address", ("", 40, "\x00", identity)),
     ("vendor_city", ("", 40, "\x00", uppercase)),
     ("vendor_state", ("", 2, "\x00", uppercase)),
-    ("vendor_zip_code", ("", 9, "\x00", lambda x: x)),
+    ("vendor_zip_code", ("", 9, "\x00", identity)),
     ("vendor_contact_name", ("", 40, "\x00", uppercase)),
     ("vendor_contact_telephone_and_ext",
      ("", 15, "\x00", digits_only)),
-    ("blank_5", ("", 35, "\x00", lambda x: x)),
+    ("blank_5", ("", 35, "\x00", identity)),
     ("vendor_foreign_entity_indicator", ("", 1, "\x00", uppercase)),
-    ("blank_6", ("", 8, "\x00", lambda x: x)),
-    ("blank_7", ("", 2, "\x00", lambda x: x))
+    ("blank_6", ("", 8, "\x00", identity)),
+    ("blank_7", ("", 2, "\x00", identity))
 ]
 
-_TRANSMITTER_SORT, _TRANSMITTER_TRANSFORMS = factor_transforms(_ITEMS)
+_TRANSMITTER_LAYOUT = RecordLayout(_ITEMS)
+_TRANSMITTER_SORT, _TRANSMITTER_TRANSFORMS = \
+    _TRANSMITTER_LAYOUT.sort_keys, _TRANSMITTER_LAYOUT.transforms
 
 def xform(data):
     """
@@ -78,7 +80,7 @@ def xform(data):
         Dictionary containing processed (transformed) data provided as a
         parameter.
     """
-    return xform_entity(_TRANSMITTER_TRANSFORMS, data)
+    return _TRANSMITTER_LAYOUT.xform(data)
 
 def fire(data):
     """
@@ -96,4 +98,4 @@ def fire(data):
     str
         String formatted to meet IRS Publication 1220
     """
-    return fire_entity(_TRANSMITTER_TRANSFORMS, _TRANSMITTER_SORT, data)
+    return _TRANSMITTER_LAYOUT.fire(data)
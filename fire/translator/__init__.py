@@ -2,4 +2,4 @@
 Module entrypoint
 """
 
-from .translator import cli
+from .cli import cli
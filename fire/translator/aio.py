@@ -0,0 +1,198 @@
+"""
+Module: Aio
+asyncio variant of the translator pipeline, for callers running on an event
+loop (such as an async web backend). Nothing in it blocks the loop: the
+input file is read and parsed, validated, rendered and written in an
+executor, and the loop gets control back between payers.
+
+Rendering follows the parallel module: the number of records in each
+payer's block is computed up front, so each block can be rendered on its
+own, in an executor, with its final record sequence numbers. A few blocks
+are rendered ahead while earlier ones are written, and memory use is
+bounded by the blocks in flight rather than the whole output.
+
+CPU-bound work run in the loop's default executor (a thread pool) still
+competes with the loop for the GIL. Pass a ProcessPoolExecutor as executor
+to render and validate in other processes instead.
+"""
+import asyncio
+import json
+from collections import deque
+
+from fire.entities import transmitter
+from .output import AtomicFile, compressed_writer, member_name
+from .output import _encode  # pylint: disable=protected-access
+from .parallel import count_payer_records, render_payer_block, \
+                      render_transmission_records
+from .user_data import validate_user_data, default_output_path
+from .validation import SCHEMA_PATH
+
+RECORD_LENGTH = 750
+
+# Payer blocks rendered ahead of the one being written
+DEFAULT_PREFETCH = 4
+
+async def run_async(input_path, output_path, executor=None, compression=None,
+                    compression_level=None, prefetch=DEFAULT_PREFETCH):
+    """
+    Asynchronous equivalent of translator.run(): reads, validates and
+    translates the user input file at input_path, and writes the output to
+    output_path.
+
+    Parameters
+    ----------
+    input_path : str
+        system path for file containing the user input JSON data
+    output_path : str
+        optional system path for the output to be generated
+    executor : concurrent.futures.Executor
+        optional executor that validation and rendering run in. Defaults to
+        the loop's default executor.
+    compression : str
+        optional "gzip" or "zip" to compress the output (see
+        output.write_output)
+    compression_level : int
+        optional compression level, from 0 to 9
+    prefetch : int
+        optional number of payer blocks rendered ahead of the one being
+        written
+
+    Returns
+    ----------
+    dict
+        'output_path', 'record_count', 'payer_count' and 'payee_count', as
+        returned by stream.run_stream
+    """
+    user_data = await read_user_data(input_path)
+    await validate_user_data_async(user_data, executor=executor)
+    if output_path is None:
+        output_path = default_output_path(
+            input_path, transmitter.xform(user_data["transmitter"])["payment_year"],
+            compression)
+
+    record_count = _count_records(user_data)
+    await write_output_async(
+        iter_fire_blocks(user_data, executor, prefetch), output_path,
+        compression, compression_level, size=record_count*RECORD_LENGTH)
+    return dict(output_path=output_path, record_count=record_count,
+                payer_count=len(user_data["payers"]),
+                payee_count=sum(len(user_payer["payees"])
+                                for user_payer in user_data["payers"]))
+
+async def read_user_data(path):
+    """
+    Asynchronous equivalent of translator.extract_user_data(): reads and
+    parses the JSON input file at path in the loop's default executor.
+    """
+    def read():
+        with open(path, mode='r', encoding='utf-8') as file:
+            return json.load(file)
+    return await asyncio.get_running_loop().run_in_executor(None, read)
+
+async def validate_user_data_async(data, schema_path=SCHEMA_PATH,
+                                   executor=None):
+    """
+    Asynchronous equivalent of translator.validate_user_data(), run in
+    executor (by default, the loop's default executor).
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, validate_user_data, data, schema_path)
+
+def _count_records(data):
+    return 2 + sum(count_payer_records(user_payer)
+                   for user_payer in data["payers"])
+
+async def iter_fire_blocks(data, executor=None, prefetch=DEFAULT_PREFETCH):
+    """
+    Asynchronously renders user data into the format required by IRS
+    Publication 1220, one payer block at a time. Joined, the blocks are
+    identical to the output of get_fire_format.
+
+    Parameters
+    ----------
+    data : dict
+        User data, as returned by read_user_data (validated).
+    executor : concurrent.futures.Executor
+        optional executor that payer blocks are rendered in. Defaults to the
+        loop's default executor.
+    prefetch : int
+        optional number of payer blocks rendered ahead of the one being
+        yielded
+
+    Returns
+    ----------
+    async generator of str
+        The transmitter record, each payer's block of records and the end of
+        transmission record, in order
+    """
+    loop = asyncio.get_running_loop()
+    user_payers = data["payers"]
+    record_counts = [count_payer_records(user_payer)
+                     for user_payer in user_payers]
+    transmitter_string, end_of_transmission_string = \
+        render_transmission_records(
+            data["transmitter"], len(user_payers),
+            sum(len(user_payer["payees"]) for user_payer in user_payers),
+            1 + sum(record_counts))
+    yield transmitter_string
+
+    pending = deque()
+    start_number = 2
+    try:
+        for user_payer, record_count in zip(user_payers, record_counts):
+            pending.append(loop.run_in_executor(
+                executor, render_payer_block, user_payer, start_number,
+                record_count))
+            start_number += record_count
+            if len(pending) > prefetch:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for future in pending:
+            future.cancel()
+    yield end_of_transmission_string
+
+async def write_output_async(blocks, path, compression=None, level=None,
+                             size=None):
+    """
+    Asynchronous equivalent of output.write_output(): atomically writes
+    FIRE-formatted strings, as they come from an async iterable, to the file
+    at path. Encoding and writing run in the loop's default executor, and
+    the loop gets control back between blocks.
+
+    Parameters
+    ----------
+    blocks : async iterable of str
+        FIRE-formatted data, such as iter_fire_blocks(data).
+    path : str
+        Path of file to be written. Its directory must exist.
+    compression : str
+        optional "gzip" or "zip" (see output.write_output)
+    level : int
+        optional compression level, from 0 to 9
+    size : int
+        optional size of the uncompressed data in bytes, if known
+    """
+    loop = asyncio.get_running_loop()
+    output = AtomicFile(path, size=size if compression is None else None)
+    await loop.run_in_executor(None, output.__enter__)
+    try:
+        writer_context = compressed_writer(output.file, compression, level,
+                                           member_name(path), size)
+        file = await loop.run_in_executor(None, writer_context.__enter__)
+        try:
+            async for block in blocks:
+                await loop.run_in_executor(None, _write_block, file, block)
+        except BaseException as ex:
+            writer_context.__exit__(type(ex), ex, ex.__traceback__)
+            raise
+        await loop.run_in_executor(None, writer_context.__exit__,
+                                   None, None, None)
+    except BaseException:
+        output.discard()
+        raise
+    await loop.run_in_executor(None, output.commit)
+
+def _write_block(file, block):
+    file.write(_encode(block))
@@ -0,0 +1,138 @@
+"""
+Module: Batch
+Translates many input files in one process, so that imports, the schema
+validator and record layouts are set up once rather than once per filing.
+"""
+import os
+import os.path
+import glob
+from collections import Counter
+from time import perf_counter
+
+from .stream import run_stream
+from .translator import run
+
+def collect_inputs(patterns, manifest_path=None):
+    """
+    Expands the given directories, glob patterns and file paths (plus the
+    entries of an optional manifest file) into a list of input files.
+
+    Parameters
+    ----------
+    patterns : iterable of str
+        Directories (all .json files directly inside them are used), glob
+        patterns or file paths.
+    manifest_path : str
+        optional system path for a text file listing one input per line.
+        Blank lines and lines starting with '#' are ignored; relative paths
+        are relative to the manifest's directory.
+
+    Returns
+    ----------
+    list of str
+        Input file paths, without duplicates, in the order given
+    """
+    patterns = list(patterns)
+    if manifest_path is not None:
+        manifest_dirname = os.path.dirname(os.path.abspath(manifest_path))
+        with open(manifest_path, mode='r', encoding='utf-8') as manifest:
+            for line in manifest:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    patterns.append(os.path.join(manifest_dirname, line))
+
+    input_paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(pattern, "*.json")))
+        elif glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern))
+        else:
+            matches = [pattern]
+        for match in matches:
+            if match not in input_paths:
+                input_paths.append(match)
+    return input_paths
+
+def batch_output_path(input_path, output_dir=None):
+    """
+    Returns the output path for an input file in a batch: the input's file
+    name with an .ascii extension, in output_dir or next to the input.
+    """
+    dirname, basename = os.path.split(os.path.abspath(input_path))
+    stem = os.path.splitext(basename)[0]
+    return os.path.join(output_dir or dirname, f"{stem}.ascii")
+
+def run_batch(input_paths, output_dir=None, workers=None, stream=False):
+    """
+    Translates each input file to a FIRE-formatted output file. A failure in
+    one filing is recorded in the summary and does not stop the others.
+    Inputs whose output paths are the same (such as a/x.json and b/x.json
+    with an output_dir) are all failed without being translated, rather
+    than overwriting each other's output.
+
+    Parameters
+    ----------
+    input_paths : list of str
+        system paths for files containing user input JSON data
+    output_dir : str
+        optional directory for the output files (see batch_output_path)
+    workers : int
+        optional number of processes to translate files with. By default,
+        files are translated one after another in the current process.
+    stream : bool
+        optional bool to use the streaming translator for each file
+
+    Returns
+    ----------
+    dict
+        'results': list of dicts, one per input file, with 'input_path',
+                   'output_path', 'seconds' and 'error' (None on success)
+        'succeeded', 'failed': number of filings in each state
+        'seconds': total wall time
+    """
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    output_paths = [batch_output_path(input_path, output_dir)
+                    for input_path in input_paths]
+    path_counts = Counter(map(os.path.abspath, output_paths))
+    jobs = [(input_path, output_path) for input_path, output_path
+            in zip(input_paths, output_paths)
+            if path_counts[os.path.abspath(output_path)] == 1]
+
+    start = perf_counter()
+    if workers is None or workers == 1:
+        job_results = [_run_one(*job, stream) for job in jobs]
+    else:
+        # pylint: disable=import-outside-toplevel
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            job_results = list(executor.map(_run_one, *zip(*jobs),
+                                            [stream]*len(jobs)))
+
+    job_results = iter(job_results)
+    results = [next(job_results)
+               if path_counts[os.path.abspath(output_path)] == 1
+               else dict(input_path=input_path, output_path=output_path,
+                         seconds=0.0,
+                         error=f"ValueError: {output_path} is also the "
+                               "output path of another input")
+               for input_path, output_path in zip(input_paths, output_paths)]
+    failed = sum(1 for result in results if result["error"] is not None)
+
+    return dict(results=results, succeeded=len(results) - failed,
+                failed=failed, seconds=perf_counter() - start)
+
+def _run_one(input_path, output_path, stream):
+    # pylint: disable=broad-except
+    start = perf_counter()
+    error = None
+    try:
+        if stream:
+            run_stream(input_path, output_path)
+        else:
+            run(input_path, output_path)
+    except Exception as ex:
+        error = f"{type(ex).__name__}: {ex}"
+    return dict(input_path=input_path, output_path=output_path,
+                seconds=perf_counter() - start, error=error)
@@ -0,0 +1,357 @@
+"""
+Module: Cache
+On-disk cache of rendered payee ("B") records, so that translating a filing
+again after a small change only transforms and renders the payees that
+changed.
+
+Records are stored in a SQLite database, keyed by a hash of the payee's input
+data, the payer's combined_fed_state field (which determines the payee's
+combined_federal_state_code), the version of the payee layout and the schema.
+Of a rendered B record, only the record_sequence_number depends on the rest
+of the filing, and it is patched in when a cached record is reused. The
+payer, end of payer, state totals, transmitter and end of transmission
+records are always computed anew, reading the payment amounts from the cached
+records.
+
+A record is only stored once its payee has passed validation against the
+same schema, so payees found in the cache need not be validated again (see
+validation.validate_incremental).
+
+The cache file can be deleted at any time; it is rebuilt on the next run.
+"""
+import hashlib
+import json
+import sqlite3
+
+from fire.entities import payees
+from .validation import SCHEMA_PATH
+
+# Bump when a change to the payee transforms renders the same input
+# differently. Changes to the field definitions (names, defaults, lengths and
+# fill characters) are detected by layout_version() without this.
+CACHE_VERSION = 1
+
+# Number of keys looked up per SQL query
+_LOOKUP_BATCH_SIZE = 500
+
+_LAYOUT = payees._PAYEE_LAYOUT  # pylint: disable=protected-access
+
+def layout_version(layout=_LAYOUT, schema_path=SCHEMA_PATH):
+    """
+    Returns a digest of CACHE_VERSION, the layout's field definitions and the
+    contents of the schema file. Cached records rendered with a different
+    layout version are never reused.
+    """
+    fields = [(key, default, length, fill_char) for key, (default, length,
+              fill_char, _) in layout.transforms.items()]
+    digest = hashlib.sha256(json.dumps([CACHE_VERSION, fields]).encode("utf-8"))
+    with open(schema_path, mode='rb') as schema_file:
+        digest.update(schema_file.read())
+    return digest.hexdigest()
+
+class RenderCache:
+    """
+    SQLite-backed store of rendered payee records. Use as a context manager,
+    or call close() when done.
+
+    Attributes
+    ----------
+    self.path : str
+        System path of the database file. It is created if it does not exist.
+    self.schema_path : str
+        System path of the schema that payees are validated against.
+    self.hits : int
+        Number of payees whose rendered record was found in the cache.
+    self.misses : int
+        Number of payees that had to be transformed and rendered.
+
+    Methods
+    ----------
+    bytes key(payee, combined_fed_state):
+        Returns the cache key of a payee's input data.
+    list lookup(data):
+        Returns the cached records of the payees of a user data document.
+    CachedPayees xform(data, combined_fed_state, records=None):
+        Equivalent to payees.xform(data), reusing cached records.
+    dict get_many(keys):
+        Returns the cached records found for the given keys.
+    put_many(items):
+        Stores (key, record) pairs.
+    close():
+        Closes the database.
+    """
+    def __init__(self, path, schema_path=SCHEMA_PATH):
+        self.path = path
+        self.schema_path = schema_path
+        self.hits = 0
+        self.misses = 0
+        self._hash = hashlib.blake2b(
+            layout_version(schema_path=schema_path).encode("ascii"),
+            digest_size=20)
+        self._connection = sqlite3.connect(path)
+        # Commits go to the write-ahead log without waiting for the disk: a
+        # crash may lose recent entries, which are simply rendered again.
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS payee_records "
+                                 "(key BLOB PRIMARY KEY, record TEXT NOT NULL) "
+                                 "WITHOUT ROWID")
+        self._connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Closes the database.
+        """
+        self._connection.close()
+
+    def key(self, payee, combined_fed_state):
+        """
+        Returns the cache key of a payee: a hash of the layout version, the
+        payer's combined_fed_state and the payee's input data.
+
+        Parameters
+        ----------
+        payee : dict
+            Payee data, as in the user input (before payees.xform).
+        combined_fed_state : str
+            The payer's combined_fed_state field.
+        """
+        digest = self._hash.copy()
+        digest.update(b"1" if combined_fed_state == '1' else b"0")
+        digest.update(json.dumps(payee, sort_keys=True,
+                                 separators=(",", ":")).encode("utf-8"))
+        return digest.digest()
+
+    def lookup(self, data):
+        """
+        Looks up the payees of every payer of a user data document.
+
+        Parameters
+        ----------
+        data : dict
+            User data, as loaded from the input file.
+
+        Returns
+        ----------
+        list of list
+            One list per payer, holding for each of its payees the cached
+            record (str), or None if the payee is not in the cache. Payees
+            with a cached record have been validated before.
+        """
+        result = []
+        for current_payer in data["payers"]:
+            keys = [self.key(payee, current_payer.get("combined_fed_state"))
+                    for payee in current_payer["payees"]]
+            found = self.get_many(keys)
+            result.append([found.get(key) for key in keys])
+        return result
+
+    def xform(self, data, combined_fed_state, records=None):
+        """
+        Equivalent to payees.xform(data), except that payees found in the
+        cache are returned as CachedPayee records holding their rendered
+        record, rather than being transformed.
+
+        Parameters
+        ----------
+        data : array[dict]
+            Payee data, as in the user input.
+        combined_fed_state : str
+            The payer's combined_fed_state field.
+        records : list
+            optional cached records of the payees, as returned for their
+            payer by lookup(). By default, the payees are looked up.
+
+        Returns
+        ----------
+        CachedPayees
+            List of CachedPayee records (cache hits) and dicts (misses).
+        """
+        if records is None:
+            keys = [self.key(payee, combined_fed_state) for payee in data]
+            found = self.get_many(keys)
+            records = [found.get(key) for key in keys]
+
+        result = CachedPayees(self)
+        for payee, record in zip(data, records):
+            if record is None:
+                result.add_new(self.key(payee, combined_fed_state),
+                               _LAYOUT.xform(payee))
+            else:
+                result.append(CachedPayee(record))
+        self.misses += len(result.new_keys)
+        self.hits += len(result) - len(result.new_keys)
+        return result
+
+    def get_many(self, keys):
+        """
+        Returns a dict of the cached records found for the given keys.
+        """
+        found = {}
+        for start in range(0, len(keys), _LOOKUP_BATCH_SIZE):
+            batch = keys[start:start + _LOOKUP_BATCH_SIZE]
+            found.update(self._connection.execute(
+                "SELECT key, record FROM payee_records WHERE key IN "
+                f"({','.join('?'*len(batch))})", batch))
+        return found
+
+    def put_many(self, items):
+        """
+        Stores the given (key, record) pairs, replacing existing records,
+        and commits them.
+        """
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO payee_records (key, record) "
+                "VALUES (?, ?)", items)
+
+class CachedPayees(list):
+    """
+    List of a payer's payees as returned by RenderCache.xform: CachedPayee
+    records for cache hits and dicts for misses, in input order. It can be
+    used in place of the list returned by payees.xform.
+
+    Attributes
+    ----------
+    self.cache : RenderCache
+        Cache that rendered records of new payees are stored in.
+    self.new_keys : dict
+        Cache keys of the payees that were not in the cache, keyed by their
+        position in the list.
+
+    Methods
+    ----------
+    add_new(key, record):
+        Appends a payee that is not in the cache.
+    str fire(start, stop):
+        Renders a range of the payees, storing the newly rendered records in
+        the cache.
+    """
+    def __init__(self, cache):
+        super().__init__()
+        self.cache = cache
+        self.new_keys = {}
+
+    def add_new(self, key, record):
+        """
+        Appends a payee record (dict) that is not in the cache yet, with its
+        cache key.
+        """
+        self.new_keys[len(self)] = key
+        self.append(record)
+
+    def fire(self, start=0, stop=None):
+        """
+        Returns the payees from start up to (but not including) stop, or all
+        payees by default, formatted to the IRS Publication 1220
+        specification and concatenated in order. Cached records are reused
+        with their record_sequence_number patched, and the other payees are
+        rendered and added to the cache.
+        """
+        rendered = []
+        new_records = []
+        for index in range(*slice(start, stop).indices(len(self))):
+            record = self[index]
+            if index in self.new_keys:
+                record_string = _LAYOUT.fire(record)
+                new_records.append((self.new_keys[index], record_string))
+                rendered.append(record_string)
+            else:
+                rendered.append(record.fire())
+        if new_records:
+            self.cache.put_many(new_records)
+        return "".join(rendered)
+
+class CachedPayee:
+    """
+    Payee record read from the cache. Fields are decoded from the rendered
+    record on access; fields that are set (such as record_sequence_number)
+    are kept aside and patched into the record by fire().
+
+    Attributes
+    ----------
+    self.record : str
+        Rendered record, as stored in the cache.
+
+    Methods
+    ----------
+    str fire():
+        Returns the rendered record, with any fields set since patched in.
+    list keys():
+        Returns the field names, in record order.
+    dict to_dict():
+        Returns the record as a dict.
+    """
+    __slots__ = ("record", "_changes")
+
+    def __init__(self, record):
+        self.record = record
+        self._changes = None
+
+    def __getitem__(self, key):
+        if self._changes and key in self._changes:
+            return self._changes[key]
+        offset, length = _LAYOUT.offsets[key]
+        return self.record[offset:offset + length] \
+            .rstrip(_LAYOUT.transforms[key][2])
+
+    def __setitem__(self, key, value):
+        if key not in _LAYOUT.offsets:
+            raise KeyError(key)
+        if self._changes is None:
+            self._changes = {}
+        self._changes[key] = value
+
+    def __contains__(self, key):
+        return key in _LAYOUT.offsets
+
+    def get(self, key, default=None):
+        """
+        Returns the value of a field, or default if there is no such field.
+        """
+        return self[key] if key in _LAYOUT.offsets else default
+
+    def keys(self):
+        """
+        Returns the field names, in record order.
+        """
+        return list(_LAYOUT.sort_keys)
+
+    def to_dict(self):
+        """
+        Returns the record as a dict, e.g. for json.dumps.
+        """
+        return {key: self[key] for key in _LAYOUT.sort_keys}
+
+    def __eq__(self, other):
+        if isinstance(other, CachedPayee):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    __hash__ = None
+
+    def fire(self):
+        """
+        Returns the rendered record, with the fields set since it was read
+        from the cache patched in.
+        """
+        record = self.record
+        if self._changes:
+            for key, value in self._changes.items():
+                offset, length = _LAYOUT.offsets[key]
+                padded = value.ljust(length, _LAYOUT.transforms[key][2])
+                if len(padded) != length:
+                    raise Exception(f"Generated a record string of incorrect length: \
+                    Expected: {length} -- Actual: {len(padded)} \
+                    -- Key: {key} -- Value: {value}")
+                record = record[:offset] + padded + record[offset + length:]
+        return record
+
+    def __repr__(self):
+        return f"CachedPayee({self.to_dict()!r})"
@@ -0,0 +1,289 @@
+"""
+Module: CLI
+Command line interface for the translator. Running `fire-1099 INPUT_PATH`
+translates a single filing; other commands (such as `fire-1099 batch`) are
+available as subcommands.
+
+The translator itself (and with it jsonschema) is only imported once a
+command runs, so that `fire-1099 --help` starts quickly.
+"""
+import json
+
+import click
+
+class DefaultCommandGroup(click.Group):
+    """
+    Command group that falls back to a default command when the first
+    argument is not the name of a command, so that `fire-1099 INPUT_PATH`
+    keeps working alongside subcommands.
+    """
+    def __init__(self, *args, default_command=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_command = default_command
+
+    def parse_args(self, ctx, args):
+        if args and args[0] not in self.commands and \
+                args[0] not in self.get_help_option_names(ctx):
+            args.insert(0, self.default_command)
+        return super().parse_args(ctx, args)
+
+@click.group(cls=DefaultCommandGroup, default_command='translate')
+def cli():
+    """
+    Generate 1099 filings formatted for the IRS FIRE system.
+
+    \b
+    Run `fire-1099 INPUT_PATH` to translate a single filing, or see the
+    commands below.
+    """
+
+@cli.command()
+@click.argument('input_path', type=click.Path(exists=True))
+@click.option('--output', type=click.Path(),
+              help='system path for the output to be generated')
+@click.option('--debug', is_flag=True,
+              help='toggle debug/verbose mode')
+@click.option('--stream', is_flag=True,
+              help='stream records to the output file with bounded memory')
+@click.option('--workers', type=click.IntRange(min=1),
+              help='number of processes to render payers with')
+@click.option('--profile', is_flag=True,
+              help='print wall time, CPU time and peak memory of each stage')
+@click.option('--profile-stats', type=click.Path(dir_okay=False),
+              help='run cProfile over the render stage and write its stats '
+                   'to this path (implies --profile)')
+@click.option('--storage', type=click.Choice(['dict', 'slots', 'columnar']),
+              default='dict', show_default=True,
+              help='in-memory representation of payee records; "slots" and '
+                   '"columnar" use less memory')
+@click.option('--cache', type=click.Path(dir_okay=False),
+              help='system path for a cache of rendered payee records, '
+                   'reused by later runs')
+@click.option('--compress', type=click.Choice(['gzip', 'zip']),
+              help='compress the output as it is written (not with --stream)')
+@click.option('--compression-level', type=click.IntRange(min=0, max=9),
+              help='compression level, from 0 (fastest) to 9 (smallest) '
+                   '[default: 6]')
+def translate(input_path, output, debug, stream, workers, profile,
+              profile_stats, storage, cache, compress, compression_level):
+    """
+    Convert a JSON input file into the format required by IRS Publication 1220
+
+    \b
+    input_path: system path for file containing the user input JSON data
+    """
+    # pylint: disable=import-outside-toplevel
+    if compression_level is not None and compress is None:
+        raise click.UsageError("--compression-level requires --compress")
+    if stream:
+        if debug or workers or profile or profile_stats or storage != 'dict' \
+                or cache or compress:
+            raise click.UsageError("--debug, --workers, --profile, --storage, "
+                                   "--cache and --compress cannot be combined "
+                                   "with --stream")
+        from .stream import run_stream
+        run_stream(input_path, output)
+    else:
+        if debug and workers:
+            raise click.UsageError("--debug cannot be combined with --workers")
+        if workers and (storage != 'dict' or cache):
+            raise click.UsageError("--storage and --cache cannot be combined "
+                                   "with --workers")
+        if cache and storage != 'dict':
+            raise click.UsageError("--cache cannot be combined with --storage")
+        from .translator import run
+
+        profiler = None
+        if profile or profile_stats:
+            from .profiling import StageProfiler
+            profiler = StageProfiler(
+                cprofile_stages=["render"] if profile_stats else [],
+                stats_path=profile_stats)
+        run(input_path, output, debug, workers, profiler, storage, cache,
+            compress, compression_level)
+        if profiler is not None:
+            click.echo(profiler.report(), err=True)
+
+@cli.command()
+@click.argument('inputs', nargs=-1)
+@click.option('--manifest', type=click.Path(exists=True, dir_okay=False),
+              help='text file listing one input path per line')
+@click.option('--output-dir', type=click.Path(file_okay=False),
+              help='directory for the outputs (default: next to each input)')
+@click.option('--workers', type=click.IntRange(min=1),
+              help='number of processes to translate files with')
+@click.option('--stream', is_flag=True,
+              help='stream each filing with bounded memory')
+@click.option('--summary', type=click.Path(dir_okay=False),
+              help='system path for a JSON summary of the batch')
+def batch(inputs, manifest, output_dir, workers, stream, summary):
+    """
+    Convert many JSON input files in one invocation
+
+    \b
+    inputs: directories, glob patterns or paths of input files
+    """
+    # pylint: disable=import-outside-toplevel
+    from .batch import collect_inputs, run_batch
+
+    input_paths = collect_inputs(inputs, manifest)
+    if not input_paths:
+        raise click.UsageError("No input files given")
+
+    result = run_batch(input_paths, output_dir, workers, stream)
+    for item in result["results"]:
+        if item["error"] is None:
+            click.echo(f"ok      {item['seconds']:8.3f}s  "
+                       f"{item['input_path']} -> {item['output_path']}")
+        else:
+            click.echo(f"FAILED  {item['seconds']:8.3f}s  "
+                       f"{item['input_path']}: {item['error']}")
+    click.echo(f"{result['succeeded']} succeeded, {result['failed']} failed "
+               f"in {result['seconds']:.3f}s")
+
+    if summary is not None:
+        with open(summary, mode='w', encoding='utf-8') as summary_file:
+            json.dump(result, summary_file, indent=4)
+    if result["failed"]:
+        raise SystemExit(1)
+
+@cli.command()
+@click.argument('input_path', type=click.Path(exists=True))
+@click.option('--workers', type=click.IntRange(min=1),
+              help='number of processes to validate payees with')
+@click.option('--json', 'as_json', is_flag=True,
+              help='print the errors as a JSON array')
+def validate(input_path, workers, as_json):
+    """
+    Check a JSON input file against the schema and report every error
+
+    \b
+    input_path: system path for file containing the user input JSON data
+    """
+    # pylint: disable=import-outside-toplevel
+    from .user_data import extract_user_data
+    from .validation import collect_errors, format_path
+
+    errors = collect_errors(extract_user_data(input_path), workers=workers)
+    if as_json:
+        click.echo(json.dumps([dict(path=list(error.path), message=error.message,
+                                    validator=error.validator)
+                               for error in errors], indent=4))
+    else:
+        for error in errors:
+            click.echo(f"{format_path(error.path)}: {error.message}")
+        click.echo(f"{len(errors)} error{'s' if len(errors) != 1 else ''}")
+    if errors:
+        raise SystemExit(1)
+
+@cli.command()
+@click.argument('input_path', type=click.Path(exists=True))
+@click.option('--output', type=click.Path(),
+              help='system path the numbered output paths are derived from, '
+                   'e.g. out.ascii gives out.001.ascii, out.002.ascii...')
+@click.option('--max-records', type=click.IntRange(min=5),
+              help='largest number of records per output file')
+@click.option('--max-bytes', type=click.IntRange(min=5*750),
+              help='largest size of an output file, in bytes')
+@click.option('--workers', type=click.IntRange(min=1),
+              help='number of processes to write files with')
+def split(input_path, output, max_records, max_bytes, workers):
+    """
+    Convert a JSON input file into several complete FIRE files within a size
+    limit
+
+    \b
+    input_path: system path for file containing the user input JSON data
+    """
+    # pylint: disable=import-outside-toplevel
+    if max_records is None and max_bytes is None:
+        raise click.UsageError("--max-records or --max-bytes is required")
+    from .split import run_split
+
+    for part in run_split(input_path, output, max_records, max_bytes, workers):
+        click.echo(f"{part['output_path']}: {part['payer_count']} payers, "
+                   f"{part['payee_count']} payees, {part['record_count']} records")
+
+@cli.command(name='csv')
+@click.argument('payees_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--payers', 'payers_path', required=True,
+              type=click.Path(exists=True, dir_okay=False),
+              help='JSON file with the transmitter and payers (without payees)')
+@click.option('--columns', type=click.Path(exists=True, dir_okay=False),
+              help='JSON object mapping CSV column names to payee fields')
+@click.option('--payer-column',
+              help='CSV column holding the payer TIN of each payee; rows '
+                   'must be grouped by payer')
+@click.option('--output', type=click.Path(),
+              help='system path for the output to be generated')
+def csv_command(payees_path, payers_path, columns, payer_column, output):
+    """
+    Convert payees from a CSV file, streaming them row by row
+
+    \b
+    payees_path: system path for the CSV file of payees, with a header row
+    """
+    # pylint: disable=import-outside-toplevel
+    from .csv_input import run_csv, load_column_map
+
+    column_map = load_column_map(columns) if columns is not None else None
+    run_csv(payees_path, payers_path, output, column_map, payer_column)
+
+@cli.command()
+@click.argument('old_path', type=click.Path(exists=True, dir_okay=False))
+@click.argument('new_path', type=click.Path(exists=True, dir_okay=False))
+def diff(old_path, new_path):
+    """
+    Compare the payee records of two FIRE-formatted files
+
+    \b
+    Payees are matched on payer TIN, payee TIN and account number, and
+    reported as added (+), removed (-) or changed (~), field by field. Exits
+    with status 1 if any payees differ.
+    """
+    # pylint: disable=import-outside-toplevel
+    from .diff import diff_files
+
+    counts = dict(added=0, removed=0, changed=0)
+    symbols = dict(added="+", removed="-", changed="~")
+    for item in diff_files(old_path, new_path):
+        counts[item.status] += 1
+        index = item.new_index if item.new_index is not None else item.old_index
+        click.echo(f"{symbols[item.status]} payer {item.key[0]} payee "
+                   f"{item.key[1]} account {item.key[2]!r} (record {index + 1})")
+        for field, old_value, new_value in item.changes:
+            click.echo(f"    {field}: {old_value!r} -> {new_value!r}")
+    click.echo(f"{counts['added']} added, {counts['removed']} removed, "
+               f"{counts['changed']} changed")
+    if any(counts.values()):
+        raise SystemExit(1)
+
+@cli.command()
+@click.argument('original_path', type=click.Path(exists=True, dir_okay=False))
+@click.argument('revised_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--output', type=click.Path(), required=True,
+              help='system path for the corrections file')
+@click.option('--originals', type=click.Path(),
+              help='system path for a file of original returns for payees '
+                   'that are only in the revised input (default: the '
+                   'corrections path with .originals before its extension)')
+def corrections(original_path, revised_path, output, originals):
+    """
+    Generate corrected returns from the filed and the revised JSON input
+
+    \b
+    original_path: system path for the user input JSON data that was filed
+    revised_path: system path for the revised user input JSON data
+    """
+    # pylint: disable=import-outside-toplevel
+    from .corrections import run_corrections
+
+    summary = run_corrections(original_path, revised_path, output, originals)
+    click.echo(f"{summary['changed']} changed, {summary['replaced']} replaced, "
+               f"{summary['removed']} removed, {summary['added']} added")
+    if summary["output_path"] is None:
+        click.echo("No corrections to file")
+    else:
+        click.echo(f"Corrections written to {summary['output_path']}")
+    if summary["originals_path"] is not None:
+        click.echo(f"Original returns written to {summary['originals_path']}")
@@ -0,0 +1,336 @@
+"""
+Module: Columns
+Column-wise storage for large numbers of records of a single layout. Each
+field is stored as one fixed-width byte array (or, for integer fields, one
+array of 64-bit integers) covering all records, so memory use is a
+predictable number of bytes per record. Fields whose value is the same for
+every record (typically the blanks and defaults) are stored once, and
+columns of consecutive numbers (record sequence numbers) are stored as their
+first value only.
+
+Rendering builds a range of records at once from the columns. It is
+vectorized with NumPy if installed, and falls back to slicing the columns
+otherwise.
+"""
+from array import array
+
+from .util import fire_entity
+
+# Number of records added to the columns at a time by extend()
+_BATCH_SIZE = 4096
+
+def _import_numpy():
+    # pylint: disable=import-outside-toplevel
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+class RecordColumns:
+    """
+    Column-wise store of records of one RecordLayout. Records are appended as
+    dicts (as returned by the layout's xform), and read back, totalled and
+    rendered column by column.
+
+    Attributes
+    ----------
+    self.layout : RecordLayout
+        Layout of the stored records.
+    self.integer_keys : set of str
+        Fields stored as 64-bit integers rather than text. Their values must
+        be digit strings, such as zero-padded payment amounts.
+
+    Methods
+    ----------
+    append(record):
+        Appends a record (dict with all of the layout's fields).
+    extend(records):
+        Appends each of the records.
+    list values(key, start, stop):
+        Returns the values of a field for a range of records, as in the
+        dicts.
+    array integers(key):
+        Returns an integer field's values, or None if they are all equal.
+    constant(key):
+        Returns the value shared by all records, if the field has no column.
+    int sum(key):
+        Returns the sum of an integer field over all records.
+    set_values(key, values):
+        Replaces the values of a field.
+    set_range(key, start):
+        Sets a field to consecutive numbers, starting from start.
+    list to_list():
+        Returns the records as a list of dicts.
+    str fire(start, stop):
+        Renders a range of records as fixed-width records.
+    """
+    def __init__(self, layout, records=(), integer_keys=()):
+        self.layout = layout
+        self.integer_keys = set(integer_keys)
+        self._count = 0
+        self._specs = []
+        self._spec_of = {}
+        # Value shared by all records, for fields without a column
+        self._constants = {}
+        # bytearray of fixed-width values, or array of integers
+        self._columns = {}
+        # First value, for fields holding consecutive numbers
+        self._ranges = {}
+        for key in layout.sort_keys:
+            default, length, fill_char, _ = layout.transforms[key]
+            is_integer = key in self.integer_keys
+            self._specs.append((key, length, fill_char, is_integer))
+            self._spec_of[key] = self._specs[-1]
+            self._constants[key] = int(default) if is_integer else default
+        self.extend(records)
+
+    def __len__(self):
+        return self._count
+
+    def append(self, record):
+        """
+        Appends a record: a dict with all of the layout's fields, as returned
+        by the layout's xform.
+        """
+        self._append_batch([record])
+
+    def extend(self, records):
+        """
+        Appends each of the records. Records are added to the columns in
+        batches, one field at a time.
+        """
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= _BATCH_SIZE:
+                self._append_batch(batch)
+                batch = []
+        if batch:
+            self._append_batch(batch)
+
+    def _append_batch(self, records):
+        for key, length, fill_char, is_integer in self._specs:
+            values = [record[key] for record in records]
+            if max(map(len, values)) > length:
+                # Let fire_entity report the record with the value too long
+                for record in records:
+                    fire_entity(self.layout.transforms, self.layout.sort_keys,
+                                record, self.layout.length)
+            if is_integer:
+                values = [int(value) for value in values]
+            column = self._columns.get(key)
+            if column is None:
+                if key not in self._ranges and \
+                        values.count(self._constants[key]) == len(values):
+                    continue
+                column = self._materialize(key)
+            if is_integer:
+                column.extend(values)
+            else:
+                column += _encode(key, "".join([value.ljust(length, fill_char)
+                                                for value in values]))
+        self._count += len(records)
+
+    def values(self, key, start=0, stop=None):
+        """
+        Returns the values of a field for the records from start up to (but
+        not including) stop, or all records by default, as strings formatted
+        as in the dicts returned by the layout's xform.
+        """
+        _, length, fill_char, is_integer = self._spec(key)
+        start, stop, _ = slice(start, stop).indices(self._count)
+        if key in self._ranges:
+            first = self._ranges[key]
+            return [f"{number:0>{length}}"
+                    for number in range(first + start, first + stop)]
+        column = self._columns.get(key)
+        if column is None:
+            constant = self._constants[key]
+            value = f"{constant:0>{length}}" if is_integer else constant
+            return [value]*max(stop - start, 0)
+        if is_integer:
+            return [f"{value:0>{length}}" for value in column[start:stop]]
+        text = column[start*length:stop*length].decode("ascii")
+        return [text[offset:offset + length].rstrip(fill_char)
+                for offset in range(0, len(text), length)]
+
+    def integers(self, key):
+        """
+        Returns the values of an integer field as an array of 64-bit
+        integers, or None if every record has the same value (see sum).
+        """
+        self._spec(key)
+        return self._columns.get(key)
+
+    def constant(self, key):
+        """
+        Returns the value shared by all records (an int for integer fields),
+        or None if the field's values are stored as a column or range.
+        """
+        self._spec(key)
+        if key in self._columns or key in self._ranges:
+            return None
+        return self._constants[key]
+
+    def sum(self, key):
+        """
+        Returns the sum of an integer field over all records.
+        """
+        column = self.integers(key)
+        if column is None:
+            return self._constants[key]*self._count
+        numpy = _import_numpy()
+        if numpy is not None and column:
+            return int(numpy.frombuffer(column, dtype=numpy.int64).sum())
+        return sum(column)
+
+    def set_values(self, key, values):
+        """
+        Replaces the values of a field with the given values, one per record.
+        """
+        _, length, fill_char, is_integer = self._spec(key)
+        column = array("q") if is_integer else bytearray()
+        count = 0
+        for value in values:
+            if len(value) > length:
+                raise Exception(f"Generated a record string of incorrect length: \
+                    Expected: {length} -- Actual: {len(value)} \
+                    -- Key: {key} -- Value: {value}")
+            if is_integer:
+                column.append(int(value))
+            else:
+                column += _encode(key, value.ljust(length, fill_char))
+            count += 1
+        if count != self._count:
+            raise ValueError(f"Expected {self._count} values for {key}, "
+                             f"got {count}")
+        self._ranges.pop(key, None)
+        self._columns[key] = column
+
+    def set_range(self, key, start):
+        """
+        Sets a field to consecutive numbers (zero-padded to the field's
+        length), starting from start for the first record. Only the first
+        value is stored. Only text fields can hold ranges.
+        """
+        if self._spec(key)[3]:
+            raise ValueError(f"Integer field {key} cannot hold a range")
+        self._columns.pop(key, None)
+        self._ranges[key] = start
+
+    def to_list(self):
+        """
+        Returns the records as a list of dicts, equal to the dicts they were
+        appended as (after any set_values and set_range).
+        """
+        columns = [self.values(key) for key in self.layout.sort_keys]
+        return [dict(zip(self.layout.sort_keys, values))
+                for values in zip(*columns)]
+
+    def fire(self, start=0, stop=None):
+        """
+        Returns the records from start up to (but not including) stop, or
+        all records by default, formatted to the IRS Publication 1220
+        specification and concatenated in order.
+
+        Returns
+        ----------
+        str
+            Fixed-width records
+        """
+        start, stop, _ = slice(start, stop).indices(self._count)
+        if stop <= start:
+            return ""
+        numpy = _import_numpy()
+        if numpy is not None:
+            return self._fire_numpy(numpy, start, stop)
+
+        fields = [(self._field_text(key, length, fill_char, start, stop), length)
+                  for key, length, fill_char, _ in self._specs]
+        return "".join(["".join([text[i*length:(i + 1)*length]
+                                 for text, length in fields])
+                        for i in range(stop - start)])
+
+    def _fire_numpy(self, numpy, start, stop):
+        # Fill every row with the constant fields first, in a single pass,
+        # then overwrite the blocks of the fields that vary.
+        template = []
+        for key, length, fill_char, is_integer in self._specs:
+            constant = self._constants[key]
+            value = f"{constant:0>{length}}" if is_integer else constant
+            template.append(value.ljust(length, fill_char))
+        output = numpy.empty((stop - start, self.layout.length),
+                             dtype=numpy.uint8)
+        output[:] = numpy.frombuffer(_encode("", "".join(template)),
+                                     dtype=numpy.uint8)
+
+        for key, length, _, is_integer in self._specs:
+            column = self._columns.get(key)
+            if column is None and key not in self._ranges:
+                continue
+            offset = self.layout.offsets[key][0]
+            block = output[:, offset:offset + length]
+            if key in self._ranges:
+                block[:] = _digits(numpy, self._ranges[key] + numpy.arange(
+                    start, stop, dtype=numpy.int64), key, length)
+            elif is_integer:
+                block[:] = _digits(numpy, numpy.frombuffer(
+                    column, dtype=numpy.int64)[start:stop], key, length)
+            else:
+                block[:] = numpy.frombuffer(column, dtype=numpy.uint8) \
+                    [start*length:stop*length].reshape(-1, length)
+        return str(output.data, "ascii")
+
+    def _field_text(self, key, length, fill_char, start, stop):
+        # A field's values for a range of records, padded and concatenated
+        column = self._columns.get(key)
+        if column is not None and key not in self.integer_keys:
+            return column[start*length:stop*length].decode("ascii")
+        text = "".join([value.ljust(length, fill_char)
+                        for value in self.values(key, start, stop)])
+        if len(text) != length*(stop - start):
+            raise Exception(f"Generated a record string of incorrect length: \
+                    Expected: {length} -- Key: {key}")
+        return text
+
+    def _materialize(self, key):
+        # Replaces a constant or range field with a column holding its values
+        # for the records appended so far.
+        _, length, fill_char, is_integer = self._spec(key)
+        if is_integer:
+            if key in self._ranges:
+                start = self._ranges.pop(key)
+                column = array("q", range(start, start + self._count))
+            else:
+                column = array("q", [self._constants[key]])*self._count
+        elif key in self._ranges:
+            values = self.values(key)
+            del self._ranges[key]
+            column = bytearray(_encode(key, "".join(
+                value.ljust(length, fill_char) for value in values)))
+        else:
+            column = bytearray(_encode(key, self._constants[key].ljust(
+                length, fill_char)))*self._count
+        self._columns[key] = column
+        return column
+
+    def _spec(self, key):
+        return self._spec_of[key]
+
+def _encode(key, value):
+    try:
+        return value.encode("ascii")
+    except UnicodeEncodeError:
+        raise Exception(f"Columnar storage requires ASCII values \
+                    -- Key: {key} -- Value: {value}") from None
+
+def _digits(numpy, values, key, length):
+    # Renders non-negative integers as a (records x length) matrix of ASCII
+    # digits, zero-padded on the left.
+    if values.size and (values.min() < 0 or
+                        (length < 19 and values.max() >= 10**length)):
+        raise Exception(f"Generated a record string of incorrect length: \
+                    Expected: {length} -- Key: {key}")
+    powers = 10**numpy.arange(length - 1, -1, -1, dtype=numpy.int64)
+    return (values[:, None] // powers % 10 + ord("0")).astype(numpy.uint8)
@@ -0,0 +1,294 @@
+"""
+Module: Corrections
+Generation of corrected returns from two versions of a filing's input: the
+data that was originally filed and the revised data. Payees are matched on
+their payer's TIN, their own TIN and the payer's account number for the
+payee, using a dictionary of the original payees, so matching is linear in
+the number of payees.
+
+Following IRS Publication 1220, a payee whose data changed is filed again in
+full with corrected_return_indicator "G", and a payee that was filed in error
+(present in the original data only) is filed with "G" and all payment
+amounts set to zero.
+
+A payee whose TIN or account number changed no longer matches its filed
+return, and is corrected in two transactions: the filed return is filed with
+"G" and zero amounts, and the revised one with "C". Such a replacement is
+recognized when, under the same payer, a filed payee and a revised payee that
+are otherwise unmatched share the payee TIN (the account number changed) or a
+non-empty account number (the TIN changed). As Publication 1220 requires,
+"G" and "C" records are filed under separate payer ("A") records. The payer,
+end of payer, state totals and end of transmission records of the
+corrections file are computed from the corrected payees only, except that
+the amount codes of a "G" payer record also include those of the returns it
+corrects, so that returns corrected to zero amounts keep their amount codes.
+
+Other payees that are only present in the revised data were never filed.
+They are not corrections, and must be filed as original returns, in a
+separate file (see build_corrections).
+"""
+import os.path
+from collections import deque
+
+from fire.entities import transmitter, payer, payees, end_of_payer, \
+                          end_of_transmission
+from .totals import AMOUNT_CODES
+from .translator import insert_generated_values, get_fire_format, \
+                        write_1099_file, load_full_schema
+from .user_data import extract_user_data, validate_user_data
+
+CORRECTED_RETURN_INDICATOR = "G"
+
+# Indicator of the second transaction of a two-transaction correction
+SECOND_TRANSACTION_INDICATOR = "C"
+
+# Payee fields that are not compared between the original and revised data
+_IGNORED_FIELDS = ("corrected_return_indicator", "record_sequence_number")
+
+_AMOUNT_KEYS = payees._AMOUNT_KEYS  # pylint: disable=protected-access
+
+def run_corrections(original_path, revised_path, output_path,
+                    originals_path=None):
+    """
+    Generates a corrections file from the originally filed input and the
+    revised input.
+
+    Parameters
+    ----------
+    original_path : str
+        system path for the user input JSON data that was filed
+    revised_path : str
+        system path for the revised user input JSON data
+    output_path : str
+        system path for the corrections file. It is only written if there
+        are corrections.
+    originals_path : str
+        optional system path for a file of original returns for the payees
+        that are only in the revised data (see default_originals_path). It
+        is only written if there are such payees.
+
+    Returns
+    ----------
+    dict
+        'changed', 'replaced', 'removed', 'added': numbers of payees
+        'output_path': path of the corrections file, or None
+        'originals_path': path of the original returns file, or None
+    """
+    original = extract_user_data(original_path)
+    revised = extract_user_data(revised_path)
+    validate_user_data(original)
+    validate_user_data(revised)
+
+    corrections, additions, summary = build_corrections(original, revised)
+    summary["output_path"] = summary["originals_path"] = None
+    if corrections["payers"]:
+        insert_corrections_values(corrections)
+        write_1099_file(get_fire_format(corrections), output_path)
+        summary["output_path"] = output_path
+    if summary["added"]:
+        if originals_path is None:
+            originals_path = default_originals_path(output_path)
+        additions = load_full_schema(additions)
+        insert_generated_values(additions)
+        write_1099_file(get_fire_format(additions), originals_path)
+        summary["originals_path"] = originals_path
+    return summary
+
+def default_originals_path(output_path):
+    """
+    Returns the path that original returns are written to when no path is
+    given: the corrections file's path with ".originals" before its
+    extension, e.g. corrections.originals.ascii.
+    """
+    root, extension = os.path.splitext(output_path)
+    return f"{root}.originals{extension}"
+
+def insert_corrections_values(corrections):
+    """
+    Inserts system-generated values into the corrections returned by
+    build_corrections, as insert_generated_values does, keeping in the
+    amount_codes of each payer record the amount codes of the filed returns
+    it corrects. _Note: this edits the dict object provided as a parameter
+    in-place._
+    """
+    filed_codes = [current_payer["amount_codes"]
+                   for current_payer in corrections["payers"]]
+    insert_generated_values(corrections)
+    for current_payer, codes in zip(corrections["payers"], filed_codes):
+        _add_amount_codes(current_payer, codes)
+
+def build_corrections(original, revised):
+    """
+    Compares the originally filed user data with the revised user data.
+
+    Parameters
+    ----------
+    original : dict
+        User data that was filed (validated).
+    revised : dict
+        Revised user data (validated).
+
+    Returns
+    ----------
+    tuple
+        (corrections, additions, summary):
+        corrections: master schema (as returned by load_full_schema) of the
+        corrected payees, to be passed to insert_corrections_values. The
+        amount_codes of each "G" payer record are those of the filed returns
+        it corrects.
+        additions: user data of the payees that are only in the revised data
+        (and do not replace a filed payee), under their revised payers, to be
+        filed as original returns.
+        summary: dict with the numbers of 'changed', 'replaced', 'removed'
+        and 'added' payees.
+    """
+    summary = dict(changed=0, replaced=0, removed=0, added=0)
+    # Payees filed, keyed by payer TIN, then by (payee TIN, account number).
+    # Duplicate keys are matched in order.
+    filed = {}
+    filed_payers = {}
+    for payer_data in original["payers"]:
+        payer_record = payer.xform(payer_data)
+        filed_payers.setdefault(payer_record["payer_tin"], payer_record)
+        payer_index = filed.setdefault(payer_record["payer_tin"], {})
+        for payee in payees.xform(payer_data["payees"]):
+            payer_index.setdefault(_key(payee), deque()).append(payee)
+
+    corrections = dict(transmitter=transmitter.xform(revised["transmitter"]),
+                       payers=[],
+                       end_of_transmission=end_of_transmission.xform({}))
+    corrected_payers = {}
+    # Revised payees without a filed payee of the same key, keyed by payer
+    # TIN: lists of (revised payer, user data, payee record)
+    unmatched = {}
+    for payer_data in revised["payers"]:
+        payer_record = payer.xform(payer_data)
+        payer_index = filed.get(payer_record["payer_tin"], {})
+        corrected = []
+        filed_codes = set()
+        for payee_data, payee in zip(payer_data["payees"],
+                                     payees.xform(payer_data["payees"])):
+            matches = payer_index.get(_key(payee))
+            if not matches:
+                unmatched.setdefault(payer_record["payer_tin"], []).append(
+                    (payer_data, payee_data, payee))
+            else:
+                filed_payee = matches.popleft()
+                if _changed(filed_payee, payee):
+                    payee["corrected_return_indicator"] = \
+                        CORRECTED_RETURN_INDICATOR
+                    corrected.append(payee)
+                    filed_codes.update(_amount_codes(filed_payee))
+        summary["changed"] += len(corrected)
+        if corrected:
+            current_payer = _corrected_payer(corrections, corrected_payers,
+                                             payer_record,
+                                             CORRECTED_RETURN_INDICATOR)
+            current_payer["payees"].extend(corrected)
+            _add_amount_codes(current_payer, filed_codes)
+
+    # Payees that were filed but are not in the revised data were filed in
+    # error: they are corrected to zero amounts. Those replaced by a revised
+    # payee also have the revised payee filed as the second transaction.
+    replacing = set()
+    for payer_tin, payer_index in filed.items():
+        removed = [payee for matches in payer_index.values() for payee in matches]
+        replacements = _pair_replacements(removed, unmatched.get(payer_tin, []))
+        filed_codes = set()
+        for payee in removed:
+            filed_codes.update(_amount_codes(payee))
+            payee["corrected_return_indicator"] = CORRECTED_RETURN_INDICATOR
+            for amount_key in _AMOUNT_KEYS:
+                payee[amount_key] = "0"*len(payee[amount_key])
+        if removed:
+            summary["removed"] += len(removed) - len(replacements)
+            current_payer = _corrected_payer(corrections, corrected_payers,
+                                             filed_payers[payer_tin],
+                                             CORRECTED_RETURN_INDICATOR)
+            current_payer["payees"].extend(removed)
+            _add_amount_codes(current_payer, filed_codes)
+        for payer_data, payee in replacements:
+            replacing.add(id(payee))
+            payee["corrected_return_indicator"] = SECOND_TRANSACTION_INDICATOR
+            _corrected_payer(corrections, corrected_payers,
+                             payer.xform(payer_data),
+                             SECOND_TRANSACTION_INDICATOR)["payees"].append(payee)
+        summary["replaced"] += len(replacements)
+
+    # The remaining revised payees are filed as original returns
+    additions = _additions(revised, [
+        (payer_data, payee_data)
+        for payer_payees in unmatched.values()
+        for payer_data, payee_data, payee in payer_payees
+        if id(payee) not in replacing])
+    summary["added"] += sum(len(payer_data["payees"])
+                            for payer_data in additions["payers"])
+    return corrections, additions, summary
+
+def _additions(revised, added):
+    # Groups the (revised payer, payee user data) pairs in added under
+    # copies of their payers, in the revised user data
+    additions = dict(revised, payers=[])
+    added_payers = {}
+    for payer_data, payee_data in added:
+        if id(payer_data) not in added_payers:
+            added_payers[id(payer_data)] = dict(payer_data, payees=[])
+            additions["payers"].append(added_payers[id(payer_data)])
+        added_payers[id(payer_data)]["payees"].append(payee_data)
+    return additions
+
+def _pair_replacements(removed, unmatched):
+    # Pairs filed payees that are not in the revised data with revised
+    # payees that replace them: those with the same payee TIN (whose account
+    # number changed), or else the same non-empty account number (whose TIN
+    # changed). Returns the replacements as (revised payer, payee record).
+    by_tin = {}
+    by_account = {}
+    for index, payee in enumerate(removed):
+        by_tin.setdefault(payee["payees_tin"], deque()).append(index)
+        if payee["payers_account_number_for_payee"]:
+            by_account.setdefault(payee["payers_account_number_for_payee"],
+                                  deque()).append(index)
+    paired = set()
+    replacements = []
+    for payer_data, _, payee in unmatched:
+        for candidates in (by_tin.get(payee["payees_tin"]),
+                           by_account.get(payee["payers_account_number_for_payee"])):
+            while candidates and candidates[0] in paired:
+                candidates.popleft()
+            if candidates:
+                paired.add(candidates.popleft())
+                replacements.append((payer_data, payee))
+                break
+    return replacements
+
+def _corrected_payer(corrections, corrected_payers, payer_record, indicator):
+    # Returns the payer's record for payees with the given corrected return
+    # indicator in the corrections, adding it if needed
+    key = (payer_record["payer_tin"], indicator)
+    current_payer = corrected_payers.get(key)
+    if current_payer is None:
+        current_payer = dict(payer_record, amount_codes="", payees=[],
+                             end_of_payer=end_of_payer.xform({}))
+        corrected_payers[key] = current_payer
+        corrections["payers"].append(current_payer)
+    return current_payer
+
+def _add_amount_codes(current_payer, codes):
+    # Adds the given amount codes to the payer record's amount_codes, keeping
+    # them in the order of AMOUNT_CODES
+    codes = set(codes) | set(current_payer["amount_codes"])
+    current_payer["amount_codes"] = "".join(code for code in AMOUNT_CODES
+                                            if code in codes)
+
+def _amount_codes(payee):
+    # Amount codes of the payee record's non-zero payment amounts
+    return {key[len("payment_amount_"):] for key in _AMOUNT_KEYS
+            if int(payee[key])}
+
+def _key(payee):
+    return (payee["payees_tin"], payee["payers_account_number_for_payee"])
+
+def _changed(filed, payee):
+    return any(filed[key] != value for key, value in payee.items()
+               if key not in _IGNORED_FIELDS)
@@ -0,0 +1,203 @@
+"""
+Module: CSV Input
+Streaming input of payees from CSV files, such as those exported by
+accounting systems. The transmitter and payer records are read from a small
+JSON side file, in the same format as a regular input file but without
+payees, and the payees are read from the CSV file one row at a time. Rows
+are turned into the same events as json_stream.iter_user_data produces, so
+they are validated and rendered by stream.write_stream without the full
+document ever being built.
+"""
+import csv
+import json
+import os.path
+
+from fire.entities import payees
+from .output import AtomicFile
+from .stream import write_stream
+from .user_data import default_output_path, extract_user_data
+from .util import digits_only
+from .validation import SCHEMA_PATH, get_incremental_validator
+
+def run_csv(payees_path, payers_path, output_path, column_map=None,
+            payer_column=None, schema_path=None):
+    """
+    Streams payees from a CSV file, with the transmitter and payers from a
+    JSON side file, into a FIRE-formatted file at output_path.
+
+    Parameters
+    ----------
+    payees_path : str
+        system path for the CSV file of payees. Its first row holds the
+        column names.
+    payers_path : str
+        system path for a JSON file with the "transmitter" record and the
+        "payers" (without payees), in the format of a regular input file
+    output_path : str
+        optional system path for the output to be generated
+    column_map : dict
+        optional map of CSV column names to payee field names (see
+        read_payee_rows)
+    payer_column : str
+        optional name of the CSV column holding each payee's payer TIN.
+        Required if there is more than one payer.
+    schema_path : str
+        optional system path for the schema to validate records against
+
+    Returns
+    ----------
+    dict
+        'output_path', 'record_count', 'payer_count' and 'payee_count', as
+        returned by stream.run_stream
+    """
+    validator = get_incremental_validator(schema_path or SCHEMA_PATH)
+    user_data = extract_user_data(payers_path)
+
+    if output_path is None:
+        output = AtomicFile(dirname=os.path.dirname(os.path.abspath(payees_path)))
+    else:
+        output = AtomicFile(output_path)
+    with open(payees_path, mode='r', encoding='utf-8-sig', newline='') as payees_file:
+        with output:
+            events = iter_csv_events(user_data, payees_file, column_map,
+                                     payer_column)
+            summary = write_stream(events, output.file, validator)
+            if output_path is None:
+                output_path = output.path = default_output_path(
+                    payees_path, summary["payment_year"])
+
+    del summary["payment_year"]
+    summary["output_path"] = output_path
+    return summary
+
+def iter_csv_events(user_data, payees_file, column_map=None,
+                    payer_column=None):
+    """
+    Yields user data events (see json_stream.iter_user_data) for the
+    transmitter and payers of user_data, with the payees read from a CSV
+    file. Rows must be grouped by payer: once the rows of a payer have
+    ended, the payer is complete and its records are written. Payers without
+    any rows follow, in their order in user_data, with no payees, as they
+    would be from a JSON input file.
+
+    Parameters
+    ----------
+    user_data : dict
+        User data with the "transmitter" and "payers" records. Any "payees"
+        of the payers are ignored.
+    payees_file : file
+        Text file object of the CSV file, opened with newline=''.
+    column_map : dict
+        optional map of CSV column names to payee field names
+    payer_column : str
+        optional name of the column holding each payee's payer TIN. If not
+        given, there must be exactly one payer, and every row is its payee.
+
+    Returns
+    ----------
+    generator
+        Events, as for json_stream.iter_user_data
+    """
+    # The payees are read from the CSV file, so as in iter_user_data, an
+    # empty list stands in for each payer's "payees" array.
+    payers = [dict(payer_data, payees=[]) for payer_data in user_data["payers"]]
+    if payer_column is None and len(payers) != 1:
+        raise Exception(f"CSV input for {len(payers)} payers requires a "
+                        "payer column")
+    payers_by_tin = {_payer_tin(payer_data): payer_data for payer_data in payers}
+
+    yield "transmitter", user_data["transmitter"]
+    current_tin = None
+    done = set()
+    for payer_tin, payee in read_payee_rows(payees_file, column_map,
+                                            payer_column):
+        if payer_column is None:
+            payer_tin = _payer_tin(payers[0])
+        if payer_tin != current_tin:
+            if current_tin is not None:
+                yield "end_of_payer", payers_by_tin[current_tin]
+                done.add(current_tin)
+            if payer_tin in done:
+                raise Exception(f"CSV rows of payer {payer_tin} are not \
+                    contiguous: rows must be grouped by payer")
+            if payer_tin not in payers_by_tin:
+                raise Exception(f"CSV row for unknown payer {payer_tin}")
+            current_tin = payer_tin
+            yield "payer", payers_by_tin[current_tin]
+        yield "payee", payee
+    if current_tin is not None:
+        yield "end_of_payer", payers_by_tin[current_tin]
+        done.add(current_tin)
+
+    for payer_data in payers:
+        if _payer_tin(payer_data) not in done:
+            yield "payer", payer_data
+            yield "end_of_payer", payer_data
+
+def read_payee_rows(payees_file, column_map=None, payer_column=None):
+    """
+    Reads payees from a CSV file, one row at a time.
+
+    Columns are mapped to payee fields by column_map, or, without a map, by
+    their names. Columns that do not map to a payee field are ignored, and
+    so are empty cells, so that the field's default is used.
+
+    Parameters
+    ----------
+    payees_file : file
+        Text file object of the CSV file, opened with newline=''.
+    column_map : dict
+        optional map of CSV column names to payee field names, i.e. keys of
+        payees._PAYEE_TRANSFORMS
+    payer_column : str
+        optional name of the column holding each payee's payer TIN
+
+    Returns
+    ----------
+    generator of tuple
+        (payer TIN or None, payee dict) for each row
+    """
+    # pylint: disable=protected-access
+    fields = payees._PAYEE_TRANSFORMS
+    reader = csv.reader(payees_file)
+    header = next(reader, None)
+    if header is None:
+        return
+    if column_map is None:
+        column_map = {name: name for name in header if name in fields}
+    else:
+        for name, field in column_map.items():
+            if field not in fields:
+                raise Exception(f"Column {name!r} is mapped to unknown payee \
+                    field {field!r}")
+    columns = [(index, column_map[name]) for index, name in enumerate(header)
+               if name in column_map and name != payer_column]
+    payer_index = None
+    if payer_column is not None:
+        if payer_column not in header:
+            raise Exception(f"CSV file has no payer column {payer_column!r}")
+        payer_index = header.index(payer_column)
+
+    for row in reader:
+        if not any(row):
+            continue
+        payee = {field: row[index] for index, field in columns
+                 if index < len(row) and row[index] != ""}
+        payer_tin = None
+        if payer_index is not None:
+            payer_tin = digits_only(row[payer_index]) if payer_index < len(row) else ""
+        yield payer_tin, payee
+
+def _payer_tin(payer_data):
+    return digits_only(payer_data.get("payer_tin", ""))
+
+def load_column_map(path):
+    """
+    Loads a column map (a JSON object of CSV column names to payee field
+    names) from the file at path.
+    """
+    with open(path, mode='r', encoding='utf-8') as map_file:
+        column_map = json.load(map_file)
+    if not isinstance(column_map, dict):
+        raise Exception(f"Column map must be a JSON object: {path}")
+    return column_map
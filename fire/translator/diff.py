@@ -0,0 +1,211 @@
+"""
+Module: Diff
+Record-level comparison of two FIRE-formatted files. Payee ("B") records are
+matched on their payer's TIN, their own TIN and the payer's account number
+for the payee, and reported as added, removed or changed, with changes
+listed field by field using the payee record layout.
+
+Both files are memory-mapped and scanned once. The keys of their payees are
+then split by hash into partitions, written to temporary files when the
+files are large, and the partitions are compared one at a time with a
+dictionary. The time taken is linear in the size of the files, and memory
+use is bounded by the size of a partition rather than of the files.
+"""
+import os
+import os.path
+import tempfile
+import zlib
+from collections import namedtuple
+
+from .reader import FireReader, LAYOUTS, RECORD_LENGTH
+
+# Fields that differ between files without a change to the payee itself
+IGNORED_FIELDS = ("record_sequence_number",)
+
+# Largest number of payees per partition compared in memory at a time
+PARTITION_SIZE = 200_000
+
+# Bytes of partition entries buffered in memory before being written out
+_FLUSH_SIZE = 1 << 16
+
+PayeeDiff = namedtuple("PayeeDiff", ["status", "key", "old_index",
+                                     "new_index", "changes"])
+PayeeDiff.__doc__ = """
+Difference in one payee between two FIRE files.
+
+Attributes
+----------
+status : str
+    "added", "removed" or "changed".
+key : tuple of str
+    (payer TIN, payee TIN, payer's account number for the payee).
+old_index : int
+    Position of the payee's record in the old file, or None if added.
+new_index : int
+    Position of the payee's record in the new file, or None if removed.
+changes : list of tuple
+    (field name, old value, new value) of each changed field, in record
+    order. Empty unless status is "changed".
+"""
+
+def diff_files(old_path, new_path, ignored_fields=IGNORED_FIELDS):
+    """
+    Compares the payee records of two FIRE files.
+
+    Differences are yielded one partition of payees at a time: within a
+    partition, changed and removed payees come in old file order, followed
+    by added payees in new file order. If a key occurs more than once in a
+    file, its occurrences are matched in order.
+
+    Parameters
+    ----------
+    old_path : str
+        System path of the old FIRE file.
+    new_path : str
+        System path of the new FIRE file.
+    ignored_fields : iterable of str
+        optional payee fields whose differences are not reported. By
+        default, record_sequence_number.
+
+    Returns
+    ----------
+    generator of PayeeDiff
+        One item per added, removed or changed payee.
+    """
+    layout = LAYOUTS["B"]
+    compared = [key for key in layout.sort_keys if key not in ignored_fields]
+    # Contiguous byte ranges of the compared fields, for a quick comparison
+    # of whole records before decoding any field.
+    spans = []
+    for key in compared:
+        offset, length = layout.offsets[key]
+        if spans and spans[-1][1] == offset:
+            spans[-1] = (spans[-1][0], offset + length)
+        else:
+            spans.append((offset, offset + length))
+
+    with FireReader(old_path) as old, FireReader(new_path) as new:
+        with tempfile.TemporaryDirectory(prefix="fire-diff") as temp_dir:
+            count = max(1, -(-max(len(old), len(new)) // PARTITION_SIZE))
+            old_partitions = _partition(old, count, os.path.join(temp_dir, "old"))
+            new_partitions = _partition(new, count, os.path.join(temp_dir, "new"))
+
+            for partition in range(count):
+                old_keys = _load_partition(old_partitions.read(partition))
+                new_keys = _load_partition(new_partitions.read(partition))
+                for key, old_indexes in old_keys.items():
+                    new_indexes = new_keys.pop(key, [])
+                    for old_index, new_index in zip(old_indexes, new_indexes):
+                        changes = _compare(old.data, new.data, old_index, new_index,
+                                           spans, compared)
+                        if changes:
+                            yield PayeeDiff("changed", _decode_key(key), old_index,
+                                            new_index, changes)
+                    for old_index in old_indexes[len(new_indexes):]:
+                        yield PayeeDiff("removed", _decode_key(key), old_index,
+                                        None, [])
+                    for new_index in new_indexes[len(old_indexes):]:
+                        yield PayeeDiff("added", _decode_key(key), None,
+                                        new_index, [])
+                for key, new_indexes in new_keys.items():
+                    for new_index in new_indexes:
+                        yield PayeeDiff("added", _decode_key(key), None,
+                                        new_index, [])
+
+def _compare(old_data, new_data, old_index, new_index, spans, compared):
+    old_start = old_index*RECORD_LENGTH
+    new_start = new_index*RECORD_LENGTH
+    for start, end in spans:
+        if old_data[old_start + start:old_start + end] != \
+                new_data[new_start + start:new_start + end]:
+            break
+    else:
+        return []
+
+    layout = LAYOUTS["B"]
+    changes = []
+    for key in compared:
+        offset, length = layout.offsets[key]
+        old_value = old_data[old_start + offset:old_start + offset + length]
+        new_value = new_data[new_start + offset:new_start + offset + length]
+        if old_value != new_value:
+            fill_char = layout.transforms[key][2]
+            changes.append((key, old_value.decode("latin-1").rstrip(fill_char),
+                            new_value.decode("latin-1").rstrip(fill_char)))
+    return changes
+
+# A partition entry is a payee's key followed by the position of its record
+_PAYER_TIN = LAYOUTS["A"].offsets["payer_tin"]
+_PAYEE_TIN = LAYOUTS["B"].offsets["payees_tin"]
+_ACCOUNT_NUMBER = LAYOUTS["B"].offsets["payers_account_number_for_payee"]
+_KEY_LENGTH = _PAYER_TIN[1] + _PAYEE_TIN[1] + _ACCOUNT_NUMBER[1]
+_ENTRY_LENGTH = _KEY_LENGTH + 8
+
+def _partition(reader, count, path_prefix):
+    data = reader.data
+    partitions = _Partitions(count, path_prefix)
+    payer_tin = bytes(_PAYER_TIN[1])
+    for index, record_type in enumerate(data[0::RECORD_LENGTH]):
+        start = index*RECORD_LENGTH
+        if record_type == 0x42:  # "B"
+            key = payer_tin + \
+                data[start + _PAYEE_TIN[0]:start + _PAYEE_TIN[0] + _PAYEE_TIN[1]] + \
+                data[start + _ACCOUNT_NUMBER[0]:
+                     start + _ACCOUNT_NUMBER[0] + _ACCOUNT_NUMBER[1]]
+            partitions.add(zlib.crc32(key) % count,
+                           key + index.to_bytes(8, "little"))
+        elif record_type == 0x41:  # "A"
+            payer_tin = data[start + _PAYER_TIN[0]:
+                             start + _PAYER_TIN[0] + _PAYER_TIN[1]]
+    return partitions
+
+def _load_partition(entries):
+    keys = {}
+    for start in range(0, len(entries), _ENTRY_LENGTH):
+        key = entries[start:start + _KEY_LENGTH]
+        index = int.from_bytes(entries[start + _KEY_LENGTH:
+                                       start + _ENTRY_LENGTH], "little")
+        indexes = keys.get(key)
+        if indexes is None:
+            keys[key] = [index]
+        else:
+            indexes.append(index)
+    return keys
+
+def _decode_key(key):
+    fill_char = "\x00"
+    payee_tin_end = _PAYER_TIN[1] + _PAYEE_TIN[1]
+    return (key[:_PAYER_TIN[1]].decode("latin-1").rstrip(fill_char),
+            key[_PAYER_TIN[1]:payee_tin_end].decode("latin-1").rstrip(fill_char),
+            key[payee_tin_end:].decode("latin-1").rstrip(fill_char))
+
+class _Partitions:
+    # Entries of each partition, buffered in memory and appended to a
+    # temporary file per partition once the buffer is full.
+    def __init__(self, count, path_prefix):
+        self._buffers = [bytearray() for _ in range(count)]
+        self._paths = [f"{path_prefix}.{partition}" for partition in range(count)]
+
+    def add(self, partition, entry):
+        """
+        Appends an entry (bytes) to a partition, flushing the partition's
+        buffer to its file once it is full.
+        """
+        buffer = self._buffers[partition]
+        buffer += entry
+        if len(buffer) >= _FLUSH_SIZE:
+            with open(self._paths[partition], mode='ab') as file:
+                file.write(buffer)
+            buffer.clear()
+
+    def read(self, partition):
+        """
+        Returns all entries added to a partition, from its file and buffer,
+        in the order they were added.
+        """
+        path = self._paths[partition]
+        buffer = self._buffers[partition]
+        if not os.path.exists(path):
+            return bytes(buffer)
+        with open(path, mode='rb') as file:
+            return file.read() + buffer
@@ -0,0 +1,192 @@
+"""
+Module: JSON Stream
+Incremental reader for user input files. Rather than loading the whole
+document with json.load, the reader walks the top-level object and the
+"payers" array itself, and only decodes one transmitter, payer field or
+payee object at a time. Memory use is therefore bounded by the size of the
+largest single payee, not by the size of the input file.
+"""
+import json
+
+_WHITESPACE = " \t\n\r"
+
+class JSONStreamReader:
+    """
+    Reads JSON tokens and values from a text file object, refilling an
+    internal buffer as needed.
+
+    Attributes
+    ----------
+    self.file : file
+        Text file object the document is read from.
+    self.chunk_size : int
+        Number of characters read from the file per refill.
+    """
+    def __init__(self, file, chunk_size=65536):
+        self.file = file
+        self.chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """
+        Reads the next chunk from the file into the buffer, discarding
+        characters that have already been consumed. Returns False at EOF.
+        """
+        if self._eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """
+        Returns the next non-whitespace character without consuming it, or
+        an empty string at the end of the input.
+        """
+        while True:
+            while self._pos < len(self._buffer) and \
+                    self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        """
+        Consumes the next non-whitespace character, which must be *char*.
+        """
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed JSON input: expected '{char}', "
+                             f"found '{found}'")
+        self._pos += 1
+
+    def value(self):
+        """
+        Decodes and returns the next complete JSON value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A value ending exactly at the end of the buffer may be a number
+            # cut off mid-way; read more before trusting it.
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def members(self):
+        """
+        Iterates over the keys of the JSON object starting at the current
+        position. The caller must consume each key's value (via value() or a
+        nested reader call) before advancing the iterator.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self.expect("}")
+            return
+
+    def elements(self):
+        """
+        Iterates over the elements of the JSON array starting at the current
+        position. As with members(), each element must be consumed by the
+        caller before advancing the iterator.
+        """
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield None
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self.expect("]")
+            return
+
+def iter_user_data(file, chunk_size=65536):
+    """
+    Parses a user input file incrementally and yields events describing its
+    contents, in document order:
+
+    * ("transmitter", dict) -- the transmitter record
+    * ("payer", dict) -- a payer header, before its first payee. Contains
+      the payer fields that appear before "payees" in the input.
+    * ("payee", dict) -- a single payee of the current payer
+    * ("end_of_payer", dict) -- the complete payer header, once all of the
+      payer's fields have been read. As its payees have already been
+      yielded, an empty list stands in for its "payees" array.
+    * ("document", object) -- the top-level object, once it has been read,
+      for its shape to be validated. If "payers" is an array, an empty list
+      stands in for it, as its payers have already been yielded. A document
+      that is not an object is yielded as it is, as the only event.
+
+    Parameters
+    ----------
+    file : file
+        Text file object containing the user input JSON data
+    chunk_size : int
+        optional number of characters read from the file at a time
+
+    Returns
+    ----------
+    generator
+        Events as described above
+    """
+    reader = JSONStreamReader(file, chunk_size)
+    if reader.peek() not in ("{", ""):
+        yield "document", reader.value()
+        return
+    document = {}
+    for key in reader.members():
+        if key == "payers" and reader.peek() == "[":
+            for _ in reader.elements():
+                yield from _iter_payer(reader)
+            document["payers"] = []
+        else:
+            # Payers that are not an array are kept as they are, for
+            # validation to reject
+            document[key] = reader.value()
+            if key == "transmitter":
+                yield "transmitter", document[key]
+    yield "document", document
+
+def _iter_payer(reader):
+    header = {}
+    started = False
+    for key in reader.members():
+        if key == "payees" and reader.peek() == "[":
+            yield "payer", dict(header)
+            started = True
+            for _ in reader.elements():
+                yield "payee", reader.value()
+            header["payees"] = []
+        else:
+            # Payees that are not an array are kept as they are, for
+            # validation to reject
+            header[key] = reader.value()
+    if not started:
+        yield "payer", dict(header)
+    yield "end_of_payer", header
@@ -0,0 +1,98 @@
+"""
+Module: Kernels
+Field transform kernels: the functions that entity layouts apply to every
+user-supplied field value (see RecordLayout.xform). They run once per field
+of every record, so each one is built to do as little work per call as
+possible: regular expressions and str.translate tables are compiled once,
+lookup tables are built at import time, and common inputs (values that are
+already all digits) take a fast path that returns them unchanged.
+
+Every kernel returns exactly what the equivalent straightforward
+implementation would; spec/bench_kernels.py checks this and times each kernel
+against it.
+"""
+import re
+
+_NON_DIGITS = re.compile("[^0-9]+")
+
+# str.translate table deleting every ASCII character but the digits.
+# Translating is faster than a regex substitution, but any non-ASCII
+# characters are left for _NON_DIGITS to remove.
+_DELETE_ASCII_NON_DIGITS = str.maketrans(
+    {chr(code): None for code in range(128) if not "0" <= chr(code) <= "9"})
+
+def _strip_non_digits(value):
+    digits = value.translate(_DELETE_ASCII_NON_DIGITS)
+    if digits.isascii():
+        return digits
+    return _NON_DIGITS.sub("", digits)
+
+def identity(value):
+    """
+    Returns value unchanged
+    """
+    return value
+
+# Returns the string with all alpha characters in uppercase. The unbound
+# str.upper saves a Python-level call per value.
+uppercase = str.upper  # pylint: disable=invalid-name
+
+def digits_only(value):
+    """
+    Removes all non-digit characters
+    """
+    # isdigit() alone also accepts non-ASCII digits, such as "²"
+    if value.isascii() and value.isdigit():
+        return value
+    return _strip_non_digits(value)
+
+def rjust_zero(value, length):
+    """
+    right-justifies *value* and pads with zeros to *length*
+    """
+    return digits_only(value).rjust(length, "0")
+
+_ZERO_FILL_KERNELS = {}
+
+def zero_fill(length):
+    """
+    Returns a one-argument kernel equivalent to rjust_zero(value, length).
+    Kernels are created once per length and shared by every field of that
+    length.
+    """
+    kernel = _ZERO_FILL_KERNELS.get(length)
+    if kernel is None:
+        def kernel(value):
+            if value.isascii() and value.isdigit():
+                return value.rjust(length, "0")
+            return _strip_non_digits(value).rjust(length, "0")
+        kernel.__name__ = kernel.__qualname__ = f"zero_fill_{length}"
+        kernel.__doc__ = f"Equivalent to rjust_zero(value, {length})"
+        _ZERO_FILL_KERNELS[length] = kernel
+    return kernel
+
+# IRS FIRE Combined Federal/State Filing (CF/SF) codes of the participating
+# states, as specified in IRS Pub 1220
+STATE_CODES = dict(
+    AL=1, AZ=4, AR=5, CA=6, CO=7, CT=8,
+    DE=10, GA=13, HI=15, ID=16, IN=18, KS=20, LA=22,
+    ME=23, MD=24, MA=25, MI=26, MN=27, MS=28, MO=29, MT=30,
+    NE=31, NJ=34, NM=35, NC=37, ND=38,
+    OH=39, OK=40, SC=45, WI=55
+)
+
+def combined_fed_state_code(state_abbrev):
+    """
+    Returns the IRS FIRE Combined Federal/State Filing (CF/SF) code for the given state.
+
+    Parameters
+    ----------
+    state_abbrev: string
+        State abbreviation, as specified in IRS Pub 1220 (e.g. California = CA)
+
+    Returns
+    ----------
+    Returns the IRS state code; None if the specified state is not
+    participating in the CF/SF program
+    """
+    return STATE_CODES.get(state_abbrev)
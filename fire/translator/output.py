@@ -0,0 +1,260 @@
+"""
+Module: Output
+Atomic writing of output files. Output is written to a temporary file in the
+destination directory, which is preallocated to its final size when that is
+known, filled in ASCII in fixed-size chunks, flushed to disk and then
+renamed into place. An output file therefore either does not exist or is
+complete: a failure (or a killed process) never leaves a partial file at the
+destination path.
+
+Output may also be compressed as it is written, into a gzip file or a zip
+archive holding a single member, so that large files are written to disk
+once, in their compressed form.
+"""
+import contextlib
+import os
+import os.path
+import secrets
+
+# Number of characters encoded and written at a time (a multiple of the
+# record length)
+CHUNK_SIZE = 750*8192
+
+# Supported compression formats, with the extension added to default output
+# paths
+COMPRESSION_EXTENSIONS = {"gzip": ".gz", "zip": ".zip"}
+
+# zlib's default: much faster than level 9, and hardly larger on FIRE data
+DEFAULT_COMPRESSION_LEVEL = 6
+
+class AtomicFile:
+    """
+    Context manager for a binary, seekable temporary file that replaces the
+    file at self.path when the context exits without an exception, and is
+    removed otherwise.
+
+    Attributes
+    ----------
+    self.path : str
+        Destination path. May be set (or changed) inside the context, e.g.
+        when the file name depends on the data written; it must be in the
+        same directory as the temporary file.
+    self.file : file
+        Temporary file object, opened for binary reading and writing.
+    self.size : int
+        optional final size of the file in bytes. When given, disk space for
+        the file is allocated up front, so that running out of space fails
+        before any data is written.
+
+    Methods
+    ----------
+    commit():
+        Flushes the temporary file to disk and renames it to self.path.
+    discard():
+        Closes and removes the temporary file.
+    """
+    def __init__(self, path=None, dirname=None, size=None):
+        if path is None and dirname is None:
+            raise ValueError("Either path or dirname is required")
+        self.path = path
+        self.size = size
+        self._dirname = dirname if dirname is not None else \
+            os.path.dirname(os.path.abspath(path))
+        self.file = None
+        self._temp_path = None
+
+    def __enter__(self):
+        prefix = "." + (os.path.basename(self.path) if self.path else "fire")
+        handle, self._temp_path = _create_temp_file(self._dirname, prefix)
+        self.file = os.fdopen(handle, mode='wb+')
+        try:
+            if self.size:
+                _preallocate(self.file, self.size)
+        except BaseException:
+            self.discard()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+
+    def commit(self):
+        """
+        Flushes the temporary file to disk and atomically renames it to
+        self.path, replacing any existing file.
+        """
+        try:
+            if self.path is None:
+                raise ValueError("No output path was set")
+            if self.size is not None and self.file.tell() != self.size:
+                # The preallocated size was wrong: drop any unwritten tail
+                self.file.truncate()
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+            os.replace(self._temp_path, self.path)
+        except BaseException:
+            self.discard()
+            raise
+        _fsync_directory(os.path.dirname(os.path.abspath(self.path)))
+
+    def discard(self):
+        """
+        Closes and removes the temporary file.
+        """
+        if not self.file.closed:
+            self.file.close()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+def write_output(data, path, compression=None, level=None):
+    """
+    Atomically writes FIRE-formatted data to the file at path. The file is
+    preallocated to the size of the data, strings are encoded as ASCII one
+    chunk at a time (so a large string is never copied as a whole), and
+    the file is flushed to disk and renamed into place.
+
+    Parameters
+    ----------
+    data : str, bytes, memoryview or iterable of str
+        FIRE-formatted data, such as the output of get_fire_format,
+        get_fire_buffer(...).getbuffer() or iter_fire_records.
+    path : str
+        Path of file to be written. Its directory must exist.
+    compression : str
+        optional "gzip" or "zip": the data is compressed as it is written
+        (see compressed_writer). By default, it is written uncompressed.
+    level : int
+        optional compression level, from 0 (none) to 9 (smallest). Defaults
+        to DEFAULT_COMPRESSION_LEVEL.
+
+    Raises
+    ----------
+    Exception
+        If the data contains characters that are not ASCII.
+    """
+    if isinstance(data, str):
+        size, chunks = len(data), _str_chunks(data)
+    elif isinstance(data, (bytes, bytearray, memoryview)):
+        size, chunks = memoryview(data).nbytes, [data]
+    else:
+        size, chunks = None, data
+
+    # The compressed size is not known up front
+    with AtomicFile(path, size=size if compression is None else None) as output:
+        with compressed_writer(output.file, compression, level,
+                               member_name(path), size) as file:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = _encode(chunk)
+                file.write(chunk)
+
+@contextlib.contextmanager
+def compressed_writer(file, compression, level=None, name=None, size=None):
+    """
+    Context manager for a binary file object that compresses what is
+    written to it into file.
+
+    Parameters
+    ----------
+    file : file
+        Binary file object the compressed data is written to. It is left
+        open.
+    compression : str
+        "gzip", "zip", or None to write to file as is.
+    level : int
+        optional compression level, from 0 to 9. Defaults to
+        DEFAULT_COMPRESSION_LEVEL.
+    name : str
+        optional file name recorded in the gzip header, or name of the zip
+        archive's member. Required for zip.
+    size : int
+        optional uncompressed size, if known. Without it, zip members are
+        written with ZIP64 extensions, so that they may exceed 4 GiB.
+    """
+    # pylint: disable=import-outside-toplevel
+    if level is None:
+        level = DEFAULT_COMPRESSION_LEVEL
+    if compression is None:
+        yield file
+    elif compression == "gzip":
+        import gzip
+        with gzip.GzipFile(filename=name or "", mode='wb', compresslevel=level,
+                           fileobj=file) as gzip_file:
+            yield gzip_file
+    elif compression == "zip":
+        import zipfile
+        # Members whose size is unknown may exceed 4 GiB (and deflate may
+        # grow incompressible data slightly, as zipfile itself allows for)
+        force_zip64 = size is None or size*1.05 > zipfile.ZIP64_LIMIT
+        with zipfile.ZipFile(file, mode='w', compression=zipfile.ZIP_DEFLATED,
+                             compresslevel=level) as archive:
+            with archive.open(name, mode='w',
+                              force_zip64=force_zip64) as member_file:
+                yield member_file
+    else:
+        raise ValueError(f"Unknown compression {compression!r}: expected one \
+            of {', '.join(COMPRESSION_EXTENSIONS)}")
+
+def member_name(path):
+    """
+    Returns the name of the uncompressed file within a compressed output
+    file at path: its base name without any .gz or .zip extension.
+    """
+    name = os.path.basename(path)
+    for extension in COMPRESSION_EXTENSIONS.values():
+        if name.endswith(extension) and len(name) > len(extension):
+            return name[:-len(extension)]
+    return name
+
+def _str_chunks(data):
+    for start in range(0, len(data), CHUNK_SIZE):
+        yield data[start:start + CHUNK_SIZE]
+
+def _encode(chunk):
+    try:
+        return chunk.encode("ascii")
+    except UnicodeEncodeError as ex:
+        raise Exception(f"FIRE output must be ASCII: found {chunk[ex.start]!r} \
+                    in {chunk[max(0, ex.start - 20):ex.start + 20]!r}") from None
+
+def _preallocate(file, size):
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(file.fileno(), 0, size)
+            return
+        except OSError:
+            # Not supported by every file system; fall back to truncate
+            pass
+    file.truncate(size)
+
+def _create_temp_file(dirname, prefix):
+    # Like tempfile.mkstemp, but the file gets the permissions a regular
+    # open() would give it (0o666 less the umask, applied by the OS) rather
+    # than owner-only ones, without touching the process-wide umask.
+    flags = os.O_RDWR | os.O_CREAT | os.O_EXCL | getattr(os, "O_NOFOLLOW", 0) \
+        | getattr(os, "O_BINARY", 0)
+    for _ in range(100):
+        path = os.path.join(dirname, f"{prefix}{secrets.token_hex(4)}.tmp")
+        try:
+            return os.open(path, flags, 0o666), path
+        except FileExistsError:
+            continue
+    raise FileExistsError(f"No usable temporary file name in {dirname}")
+
+def _fsync_directory(dirname):
+    # Makes the rename itself durable. Directories cannot be opened (and
+    # need not be synced) on every platform.
+    try:
+        handle = os.open(dirname, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(handle)
+    except OSError:
+        pass
+    finally:
+        os.close(handle)
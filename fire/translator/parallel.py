@@ -0,0 +1,164 @@
+"""
+Module: Parallel
+Renders payers in a process pool. Each payer's block of records (A, B...,
+C, K...) depends on the other payers only through its record sequence
+numbers, so the number of records in every block is computed up front, the
+starting sequence number of each block is taken from the prefix sums of
+those counts, and the blocks are rendered independently and stitched
+together in order.
+"""
+import os
+from itertools import accumulate
+
+from fire.entities import transmitter, payer, payees, end_of_payer, \
+                          state_totals, end_of_transmission
+from .totals import insert_payer_generated_values
+from .util import SequenceGenerator, combined_fed_state_code
+
+def get_fire_format_parallel(data, workers=None):
+    """
+    Returns the user data converted into the string format required by the
+    IRS FIRE electronic filing system, rendering each payer in a separate
+    worker process. The result is identical to calling load_full_schema,
+    insert_generated_values and get_fire_format in turn.
+
+    Parameters
+    ----------
+    data : dict
+        User data, as returned by extract_user_data (not the master schema).
+    workers : int
+        optional number of worker processes. Defaults to the number of CPUs;
+        with 1, payers are rendered in the current process.
+
+    Returns
+    ----------
+    str
+        FIRE-formatted string containing data provided as the input parameter.
+    """
+    user_payers = data["payers"]
+    record_counts = [count_payer_records(user_payer)
+                     for user_payer in user_payers]
+    # The transmitter record is sequence number 1.
+    start_numbers = [start + 2 for start
+                     in accumulate([0] + record_counts[:-1])]
+    payee_count = sum(len(user_payer["payees"]) for user_payer in user_payers)
+    last_number = 1 + sum(record_counts)
+
+    if workers == 1 or len(user_payers) <= 1:
+        blocks = list(map(render_payer_block, user_payers, start_numbers,
+                          record_counts))
+    else:
+        # Imported here as it pulls in multiprocessing, which single-process
+        # runs never need.
+        # pylint: disable=import-outside-toplevel
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Hand out several small payers per task to amortize the round trip
+        chunksize = max(1, len(user_payers) // (4*(workers or os.cpu_count())))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            blocks = list(executor.map(render_payer_block, user_payers,
+                                       start_numbers, record_counts,
+                                       chunksize=chunksize))
+
+    transmitter_string, end_of_transmission_string = \
+        render_transmission_records(data["transmitter"], len(user_payers),
+                                    payee_count, last_number)
+    return "".join([transmitter_string] + blocks + [end_of_transmission_string])
+
+def render_transmission_records(transmitter_data, payer_count, payee_count,
+                                last_number):
+    """
+    Renders the transmitter ("T") and end of transmission ("F") records of a
+    filing whose payer blocks have been rendered separately.
+
+    Parameters
+    ----------
+    transmitter_data : dict
+        Transmitter from the user data.
+    payer_count : int
+        Number of payers (A records) in the filing.
+    payee_count : int
+        Number of payees (B records) in the filing.
+    last_number : int
+        Record sequence number of the last record of the last payer block
+        (1 if there are no payers).
+
+    Returns
+    ----------
+    tuple of str
+        (transmitter record, end of transmission record)
+    """
+    transmitter_record = transmitter.xform(transmitter_data)
+    transmitter_record["total_number_of_payees"] = f"{payee_count:0>8}"
+    transmitter_record["record_sequence_number"] = "00000001"
+
+    end_of_transmission_record = end_of_transmission.xform({})
+    end_of_transmission_record["total_number_of_payees"] = f"{payee_count:0>8}"
+    end_of_transmission_record["number_of_a_records"] = f"{payer_count:0>8}"
+    end_of_transmission_record["record_sequence_number"] = \
+        f"{last_number + 1:0>8}"
+
+    return (transmitter.fire(transmitter_record),
+            end_of_transmission.fire(end_of_transmission_record))
+
+def count_payer_records(user_payer):
+    """
+    Returns the number of records in a payer's block: its A and C records,
+    one B record per payee and, for CF/SF payers, one K record per
+    participating state among its payees.
+
+    Parameters
+    ----------
+    user_payer : dict
+        Payer from the user data, including its payees.
+
+    Returns
+    ----------
+    int
+        Number of records in the payer's block
+    """
+    record_count = 2 + len(user_payer["payees"])
+    if user_payer.get("combined_fed_state", "") == '1':
+        states = {payee.get("payee_state", "") for payee in user_payer["payees"]}
+        record_count += sum(1 for state in states
+                            if combined_fed_state_code(state))
+    return record_count
+
+def render_payer_block(user_payer, start_number, record_count=None):
+    """
+    Renders a single payer's block of records (A, B..., C, K...), numbering
+    the records from start_number.
+
+    Parameters
+    ----------
+    user_payer : dict
+        Payer from the user data, including its payees.
+    start_number : int
+        Record sequence number of the payer's A record.
+    record_count : int
+        optional expected number of records, as returned by
+        count_payer_records. An exception is raised if the block differs.
+
+    Returns
+    ----------
+    str
+        FIRE-formatted records for the payer
+    """
+    current_payer = payer.xform(user_payer)
+    current_payer["payees"] = payees.xform(user_payer["payees"])
+    current_payer["end_of_payer"] = end_of_payer.xform({})
+    seq = SequenceGenerator(start_number - 1)
+    insert_payer_generated_values(current_payer, seq)
+
+    if record_count is not None and \
+            seq.get_current() - start_number + 1 != record_count:
+        raise Exception(f"Rendered payer block has unexpected record count: \
+                    {seq.get_current() - start_number + 1} \
+                    -- Expected: {record_count}")
+
+    block = [payer.fire(current_payer),
+             payees.fire(current_payer["payees"]),
+             end_of_payer.fire(current_payer["end_of_payer"])]
+    if current_payer["combined_fed_state"] == '1':
+        block.append(state_totals.fire(current_payer.get("state_totals", [])))
+    return "".join(block)
@@ -0,0 +1,153 @@
+"""
+Module: Profiling
+Per-stage timing for translator.run. A profiler is any object with a
+stage(name) method returning a context manager; run enters one context per
+stage (see STAGES). StageProfiler records wall time, CPU time and peak
+memory for each stage, and can run cProfile over selected stages.
+"""
+from collections import namedtuple
+from contextlib import contextmanager
+from time import perf_counter, process_time
+
+# Stages of translator.run, in order. With workers, "merge" and
+# "generated_values" happen inside the workers as part of "render".
+STAGES = ["extract", "validate", "merge", "generated_values", "render", "write"]
+
+StageStats = namedtuple("StageStats",
+                        ["name", "wall_time", "cpu_time", "peak_memory"])
+StageStats.__doc__ = """
+Measurements for one stage: wall_time and cpu_time in seconds, and
+peak_memory in bytes (the peak allocated during the stage, above what was
+allocated when it began), or None if memory was not traced.
+"""
+
+class NullProfiler:
+    """
+    Profiler that records nothing. Used by run when no profiler is given.
+    """
+    @contextmanager
+    def stage(self, _name):
+        """
+        Context manager for a stage; does nothing.
+        """
+        yield
+
+class StageProfiler:
+    """
+    Records wall time, CPU time and peak memory for each stage run under it.
+
+    Attributes
+    ----------
+    self.stages : list of StageStats
+        Measurements for the stages run so far, in order.
+    self.memory : bool
+        Whether peak memory is traced (with tracemalloc). Tracing slows
+        allocation-heavy stages down, so timings are best compared between
+        runs with the same setting.
+    self.cprofile_stages : set of str
+        Names of the stages to run cProfile over.
+    self.stats_path : str
+        System path the cProfile stats are written to (see pstats.Stats).
+    self.hooks : list of callable
+        Functions called with each stage's StageStats once it completes.
+
+    Methods
+    ----------
+    context manager stage(name):
+        Measures the code run inside the context as the stage *name*.
+    str report():
+        Returns a table of the measurements.
+    """
+    def __init__(self, memory=True, cprofile_stages=(), stats_path=None,
+                 hooks=None):
+        if cprofile_stages and stats_path is None:
+            raise ValueError("stats_path is required to profile stages with "
+                             "cProfile")
+        self.stages = []
+        self.memory = memory
+        self.cprofile_stages = set(cprofile_stages)
+        self.stats_path = stats_path
+        self.hooks = list(hooks or [])
+        self._profile = None
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Measures the code run inside the context as the stage *name*, then
+        calls the hooks with its StageStats. Stages that raise are recorded
+        too.
+        """
+        # pylint: disable=import-outside-toplevel
+        started_tracing = False
+        if self.memory:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                if hasattr(tracemalloc, "reset_peak"):
+                    tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                started_tracing = True
+            start_memory = tracemalloc.get_traced_memory()[0]
+
+        profile = None
+        if name in self.cprofile_stages:
+            if self._profile is None:
+                import cProfile
+                self._profile = cProfile.Profile()
+            profile = self._profile
+
+        start_wall, start_cpu = perf_counter(), process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            wall_time = perf_counter() - start_wall
+            cpu_time = process_time() - start_cpu
+
+            peak_memory = None
+            if self.memory:
+                peak_memory = max(0, tracemalloc.get_traced_memory()[1] -
+                                  start_memory)
+                if started_tracing:
+                    tracemalloc.stop()
+            if profile is not None:
+                profile.dump_stats(self.stats_path)
+
+            stats = StageStats(name, wall_time, cpu_time, peak_memory)
+            self.stages.append(stats)
+            for hook in self.hooks:
+                hook(stats)
+
+    def report(self):
+        """
+        Returns the measurements as a table, one line per stage plus a total.
+
+        Returns
+        ----------
+        str
+            Table of the measurements
+        """
+        lines = [f"{'stage':<18} {'wall (s)':>10} {'cpu (s)':>10} "
+                 f"{'peak memory':>14}"]
+        for stats in self.stages:
+            lines.append(f"{stats.name:<18} {stats.wall_time:>10.3f} "
+                         f"{stats.cpu_time:>10.3f} "
+                         f"{_format_bytes(stats.peak_memory):>14}")
+        peaks = [stats.peak_memory for stats in self.stages
+                 if stats.peak_memory is not None]
+        lines.append(f"{'total':<18} "
+                     f"{sum(stats.wall_time for stats in self.stages):>10.3f} "
+                     f"{sum(stats.cpu_time for stats in self.stages):>10.3f} "
+                     f"{_format_bytes(max(peaks) if peaks else None):>14}")
+        if self.stats_path is not None:
+            lines.append(f"cProfile stats for {', '.join(sorted(self.cprofile_stages))} "
+                         f"written to {self.stats_path}")
+        return "\n".join(lines)
+
+def _format_bytes(count):
+    if count is None:
+        return "-"
+    return f"{count / 2**20:.1f} MiB"
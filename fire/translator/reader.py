@@ -0,0 +1,284 @@
+"""
+Module: Reader
+Reads FIRE-formatted files, such as those written by the translator. The
+file is memory-mapped rather than read, and records are decoded lazily: a
+field is only sliced out of the file (at the offset given by the entity's
+record layout) when it is accessed. An index of the records by type, payer
+TIN and payee TIN is built on first use with a single pass over the file,
+after which finding a payer or payee takes a dictionary lookup.
+"""
+import mmap
+from bisect import bisect_right
+
+# pylint: disable=protected-access
+from fire.entities import transmitter, payer, payees, end_of_payer, \
+                          state_totals, end_of_transmission
+
+RECORD_LENGTH = 750
+
+# Record layouts, keyed by record type (the first character of a record)
+LAYOUTS = {
+    "T": transmitter._TRANSMITTER_LAYOUT,
+    "A": payer._PAYER_LAYOUT,
+    "B": payees._PAYEE_LAYOUT,
+    "C": end_of_payer._END_OF_PAYER_LAYOUT,
+    "K": state_totals._STATE_TOTALS_LAYOUT,
+    "F": end_of_transmission._END_OF_TRANSMISSION_LAYOUT,
+}
+
+class FireRecord:
+    """
+    A single record of a FIRE file. Fields are decoded when accessed, with
+    record[key], and returned as they were before rendering, i.e. without
+    the blank fill characters that pad them to their fixed length.
+
+    Attributes
+    ----------
+    self.index : int
+        Position of the record in the file, starting at 0.
+    self.record_type : str
+        Record type: "T", "A", "B", "C", "K" or "F".
+    self.layout : RecordLayout
+        Layout of the record type.
+
+    Methods
+    ----------
+    bytes raw():
+        Returns the record as it appears in the file.
+    list keys():
+        Returns the field names, in record order.
+    get(key, default=None):
+        Returns the value of a field, or default if there is no such field.
+    dict to_dict():
+        Decodes every field of the record.
+    """
+    __slots__ = ("index", "record_type", "layout", "_data", "_offset")
+
+    def __init__(self, data, index):
+        self._data = data
+        self._offset = index*RECORD_LENGTH
+        self.index = index
+        self.record_type = chr(data[self._offset])
+        try:
+            self.layout = LAYOUTS[self.record_type]
+        except KeyError:
+            raise Exception(f"Unknown record type {self.record_type!r} in \
+                    record {index + 1}") from None
+
+    def __getitem__(self, key):
+        offset, length = self.layout.offsets[key]
+        start = self._offset + offset
+        value = self._data[start:start + length].decode("latin-1")
+        # Zero-filled fields hold right-justified numbers: their fill is
+        # part of the value.
+        fill_char = self.layout.transforms[key][2]
+        return value if fill_char == "0" else value.rstrip(fill_char)
+
+    def __contains__(self, key):
+        return key in self.layout.offsets
+
+    def get(self, key, default=None):
+        """
+        Returns the value of a field, or default if there is no such field.
+        """
+        return self[key] if key in self.layout.offsets else default
+
+    def keys(self):
+        """
+        Returns the field names, in record order.
+        """
+        return list(self.layout.sort_keys)
+
+    def raw(self):
+        """
+        Returns the record as it appears in the file.
+        """
+        return bytes(self._data[self._offset:self._offset + RECORD_LENGTH])
+
+    def to_dict(self):
+        """
+        Returns all fields of the record as a dict.
+        """
+        return {key: self[key] for key in self.layout.sort_keys}
+
+    def __repr__(self):
+        return f"FireRecord({self.index}, {self.record_type!r})"
+
+class FireReader:
+    """
+    Reads a FIRE-formatted file. Use as a context manager, or call close()
+    when done.
+
+    Attributes
+    ----------
+    self.path : str
+        System path of the file.
+    self.data : mmap
+        Read-only contents of the file (an empty bytes object if the file is
+        empty).
+    self.record_types : str
+        Type of every record in the file, in order (e.g. "TABBCKF"). Built
+        on first use.
+
+    Methods
+    ----------
+    FireRecord record(index):
+        Returns the record at the given position.
+    generator records(record_type=None):
+        Yields the records, optionally only those of one type.
+    list payers():
+        Returns the payer (A) records.
+    list payees(payer_index):
+        Returns the payee (B) records of the payer whose A record is at
+        payer_index.
+    list find_payers(tin):
+        Returns the payer records with the given TIN.
+    list find_payees(tin, payer_tin=None):
+        Returns the payee records with the given TIN, optionally only those
+        of payers with payer_tin.
+    FireRecord payer_of(record):
+        Returns the payer record that a B, C or K record belongs to.
+    close():
+        Closes the file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, mode='rb')
+        try:
+            size = self._file.seek(0, 2)
+            if size % RECORD_LENGTH:
+                raise Exception(f"File size {size} is not a multiple of the \
+                    record length {RECORD_LENGTH}: {path}")
+            self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) \
+                if size else b""
+        except BaseException:
+            self._file.close()
+            raise
+        self._count = size // RECORD_LENGTH
+        self._record_types = None
+        self._payer_starts = None
+        self._payers_by_tin = None
+        self._payees_by_tin = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Closes the file.
+        """
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self._file.close()
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def record_types(self):
+        """
+        Type of every record in the file, in order (e.g. "TABBCKF").
+        """
+        self._build_index()
+        return self._record_types
+
+    def record(self, index):
+        """
+        Returns the record at the given position (starting at 0; negative
+        positions count from the end).
+        """
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(f"Record index out of range: {index}")
+        return FireRecord(self.data, index)
+
+    def records(self, record_type=None):
+        """
+        Yields the records in file order, or only those of record_type.
+        """
+        if record_type is None:
+            for index in range(self._count):
+                yield FireRecord(self.data, index)
+            return
+        self._build_index()
+        index = self._record_types.find(record_type)
+        while index >= 0:
+            yield FireRecord(self.data, index)
+            index = self._record_types.find(record_type, index + 1)
+
+    def payers(self):
+        """
+        Returns the payer (A) records, in file order.
+        """
+        self._build_index()
+        return [FireRecord(self.data, index) for index in self._payer_starts]
+
+    def payees(self, payer_index):
+        """
+        Returns the payee (B) records following the A record at payer_index.
+        """
+        self._build_index()
+        index = payer_index + 1
+        result = []
+        while index < self._count and self._record_types[index] == "B":
+            result.append(FireRecord(self.data, index))
+            index += 1
+        return result
+
+    def find_payers(self, tin):
+        """
+        Returns the payer records with the given TIN (digits only).
+        """
+        self._build_index()
+        return [FireRecord(self.data, index)
+                for index in self._payers_by_tin.get(tin, [])]
+
+    def find_payees(self, tin, payer_tin=None):
+        """
+        Returns the payee records with the given TIN (digits only), in file
+        order. If payer_tin is given, only payees of those payers are
+        returned.
+        """
+        self._build_index()
+        result = [FireRecord(self.data, index)
+                  for index in self._payees_by_tin.get(tin, [])]
+        if payer_tin is not None:
+            result = [record for record in result
+                      if self.payer_of(record)["payer_tin"] == payer_tin]
+        return result
+
+    def payer_of(self, record):
+        """
+        Returns the payer (A) record that a B, C or K record belongs to.
+        """
+        self._build_index()
+        position = bisect_right(self._payer_starts, record.index) - 1
+        if position < 0:
+            raise Exception(f"Record {record.index + 1} does not belong to a \
+                    payer")
+        return FireRecord(self.data, self._payer_starts[position])
+
+    def _build_index(self):
+        if self._record_types is not None:
+            return
+        self._record_types = bytes(self.data[0::RECORD_LENGTH]).decode("latin-1")
+        payer_offset, payer_length = LAYOUTS["A"].offsets["payer_tin"]
+        payee_offset, payee_length = LAYOUTS["B"].offsets["payees_tin"]
+
+        self._payer_starts = []
+        self._payers_by_tin = {}
+        self._payees_by_tin = {}
+        for index, record_type in enumerate(self._record_types):
+            if record_type == "B":
+                start = index*RECORD_LENGTH + payee_offset
+                tin = self.data[start:start + payee_length].decode("latin-1")
+                self._payees_by_tin.setdefault(tin, []).append(index)
+            elif record_type == "A":
+                start = index*RECORD_LENGTH + payer_offset
+                tin = self.data[start:start + payer_length].decode("latin-1")
+                self._payer_starts.append(index)
+                self._payers_by_tin.setdefault(tin, []).append(index)
@@ -0,0 +1,168 @@
+"""
+Module: Split
+Splits a filing into several complete transmissions, each within a limit on
+the number of records (or bytes) per file. Record sequence numbers and the
+payee counts of the transmitter and end of transmission records are 8 digits
+long, and FIRE limits the size of uploaded files, so very large filings must
+be sent as several files.
+
+Payers are packed into parts greedily, in input order. A payer whose block
+of records does not fit into a part on its own is split into several payers
+with the same payer record, each with a share of the payees; their end of
+payer and state totals records are computed from their own payees. Every
+part is a regular user data document, translated with its own transmitter
+and end of transmission records and its own sequence numbers.
+"""
+import os.path
+
+from fire.entities import transmitter
+from .output import write_output
+from .parallel import count_payer_records, get_fire_format_parallel
+from .user_data import extract_user_data, validate_user_data, \
+                       default_output_path
+
+# Most records a transmission can hold: record sequence numbers are 8 digits
+MAX_RECORDS = 99_999_999
+
+RECORD_LENGTH = 750
+
+def split_user_data(data, max_records):
+    """
+    Splits user data into parts whose FIRE output has at most max_records
+    records each.
+
+    Parameters
+    ----------
+    data : dict
+        User data, as returned by extract_user_data.
+    max_records : int
+        Largest number of records per part, including the transmitter and
+        end of transmission records.
+
+    Returns
+    ----------
+    list of dict
+        User data documents, one per part, with the transmitter of data and
+        a share of its payers. Their output, concatenated without the T and F
+        records, holds the same payees in the same order as the output of
+        data.
+
+    Raises
+    ----------
+    ValueError
+        If max_records is too small to hold a payer with a single payee.
+    """
+    if not 0 < max_records <= MAX_RECORDS:
+        raise ValueError(f"Records per part must be between 1 and {MAX_RECORDS}")
+    # Room left for payer blocks once the T and F records are counted
+    capacity = max_records - 2
+
+    parts = [[]]
+    used = 0
+    for user_payer in data["payers"]:
+        record_count = count_payer_records(user_payer)
+        pieces = [(user_payer, record_count)]
+        if record_count > capacity:
+            user_payees = user_payer["payees"]
+            # Each piece has an A and C record, and at most as many K records
+            # as the whole payer.
+            state_count = record_count - 2 - len(user_payees)
+            chunk_size = capacity - 2 - state_count
+            if chunk_size < 1:
+                raise ValueError(f"{max_records} records per part cannot hold \
+                    a payer with {state_count} state totals records")
+            pieces = []
+            for start in range(0, len(user_payees), chunk_size):
+                piece = dict(user_payer,
+                             payees=user_payees[start:start + chunk_size])
+                pieces.append((piece, count_payer_records(piece)))
+
+        for piece, piece_count in pieces:
+            if used + piece_count > capacity and parts[-1]:
+                parts.append([])
+                used = 0
+            parts[-1].append(piece)
+            used += piece_count
+    return [dict(data, payers=part) for part in parts]
+
+def split_output_paths(output_path, count):
+    """
+    Returns the output paths of count parts: output_path with the part's
+    number (from 1, zero-padded to 3 digits) inserted before its extension,
+    e.g. output.ascii becomes output.001.ascii, output.002.ascii...
+    """
+    stem, extension = os.path.splitext(output_path)
+    return [f"{stem}.{number:03d}{extension}" for number in range(1, count + 1)]
+
+def run_split(input_path, output_path, max_records=None, max_bytes=None,
+              workers=None):
+    """
+    Translates the user input file at input_path into one or more FIRE files
+    within the given limit. Parts are translated and written concurrently,
+    in worker processes.
+
+    Parameters
+    ----------
+    input_path : str
+        system path for file containing the user input JSON data
+    output_path : str
+        optional system path the part paths are derived from (see
+        split_output_paths). Defaults to translator.default_output_path.
+    max_records : int
+        optional largest number of records per file
+    max_bytes : int
+        optional largest size of a file, in bytes. At least one of
+        max_records and max_bytes is required; if both are given, the
+        tighter limit applies. Files never hold more than MAX_RECORDS
+        records, however large the limit.
+    workers : int
+        optional number of worker processes. Defaults to the number of CPUs;
+        with 1, parts are written one after another in the current process.
+
+    Returns
+    ----------
+    list of dict
+        One dict per part, with 'output_path', 'record_count',
+        'payer_count' and 'payee_count'
+    """
+    limits = [limit for limit in (
+        max_records, max_bytes // RECORD_LENGTH if max_bytes is not None else None)
+              if limit is not None]
+    if not limits:
+        raise ValueError("Either max_records or max_bytes is required")
+
+    user_data = extract_user_data(input_path)
+    validate_user_data(user_data)
+    parts = split_user_data(user_data, min(*limits, MAX_RECORDS))
+
+    if output_path is None:
+        output_path = default_output_path(
+            input_path, transmitter.xform(user_data["transmitter"])["payment_year"])
+    output_paths = split_output_paths(output_path, len(parts))
+
+    if workers == 1 or len(parts) == 1:
+        return list(map(write_part, parts, output_paths))
+    # Imported here as it pulls in multiprocessing, which single-process
+    # runs never need.
+    # pylint: disable=import-outside-toplevel
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(write_part, parts, output_paths))
+
+def write_part(data, output_path):
+    """
+    Translates one part (a user data document) and writes it to
+    output_path.
+
+    Returns
+    ----------
+    dict
+        'output_path', 'record_count', 'payer_count' and 'payee_count'
+    """
+    ascii_string = get_fire_format_parallel(data, workers=1)
+    write_output(ascii_string, output_path)
+    return dict(output_path=output_path,
+                record_count=len(ascii_string) // RECORD_LENGTH,
+                payer_count=len(data["payers"]),
+                payee_count=sum(len(user_payer["payees"])
+                                for user_payer in data["payers"]))
@@ -0,0 +1,283 @@
+"""
+Module: Stream
+Streaming variant of the translator pipeline. Payers and payees are parsed
+incrementally from the input file, and each record is rendered and written
+to the output file as soon as it is known. Peak memory therefore does not
+grow with the number of payees.
+
+Records whose contents depend on data that comes later in the input (the
+transmitter "T" record and each payer "A" record) are written as
+placeholders and overwritten in place once their values are known, which is
+possible because every record has the same fixed length. For the same
+reason, streamed output cannot be compressed as it is written.
+"""
+import os
+import os.path
+
+from fire.entities import transmitter, payer, payees, end_of_payer, \
+                          state_totals, end_of_transmission
+from .json_stream import iter_user_data
+from .output import AtomicFile
+from .totals import PayerTotals
+from .user_data import default_output_path
+from .util import SequenceGenerator, combined_fed_state_code
+from .validation import SCHEMA_PATH, get_incremental_validator
+
+RECORD_LENGTH = 750
+
+def run_stream(input_path, output_path, schema_path=None):
+    """
+    Streams the user input file at input_path into a FIRE-formatted file at
+    output_path. This is the streaming equivalent of translator.run().
+
+    Parameters
+    ----------
+    input_path : str
+        system path for file containing the user input JSON data
+    output_path : str
+        optional system path for the output to be generated
+    schema_path : str
+        optional system path for the schema to validate records against
+
+    Returns
+    ----------
+    dict
+        'output_path': path of the generated file
+        'record_count': number of records written
+        'payer_count': number of payers (A records) written
+        'payee_count': number of payees (B records) written
+    """
+    validator = get_incremental_validator(schema_path or SCHEMA_PATH)
+
+    output_dirname = os.path.dirname(os.path.abspath(output_path or input_path))
+    if output_path is None:
+        # The default file name depends on the payment year, which is only
+        # known once the transmitter has been read.
+        output = AtomicFile(dirname=output_dirname)
+    else:
+        output = AtomicFile(output_path)
+    with open(input_path, mode='r', encoding='utf-8') as input_file:
+        with output:
+            summary = write_stream(iter_user_data(input_file), output.file,
+                                   validator)
+            if output_path is None:
+                output_path = output.path = default_output_path(
+                    input_path, summary["payment_year"])
+
+    del summary["payment_year"]
+    summary["output_path"] = output_path
+    return summary
+
+def write_stream(events, file, validator=None):
+    """
+    Renders a stream of user data events (see json_stream.iter_user_data)
+    into FIRE-formatted records, writing each one to file as soon as it is
+    known.
+
+    Parameters
+    ----------
+    events : iterable of tuple
+        User data events, in document order.
+    file : file
+        Binary file object opened for writing and seeking.
+    validator : object
+        optional validator with validate_document, validate_transmitter,
+        validate_payer and validate_payee methods, called as each record is
+        read.
+
+    Returns
+    ----------
+    dict
+        'record_count', 'payer_count', 'payee_count' and 'payment_year'
+    """
+    writer = _StreamWriter(file)
+    transmitter_data = None
+    for kind, record in _validated_events(events, validator):
+        if kind == "transmitter":
+            transmitter_data = record
+        elif kind == "payer":
+            writer.start_payer(record)
+        elif kind == "payee":
+            writer.write_payee(record)
+        elif kind == "end_of_payer":
+            writer.end_payer(record)
+
+    if transmitter_data is None:
+        raise ValueError("Input data does not contain a transmitter record")
+    return writer.finish(transmitter_data)
+
+def _validated_events(events, validator):
+    # Yields the events, each after its record is validated with validator,
+    # if any
+    if validator is None:
+        yield from events
+        return
+    payer_index = 0
+    payee_index = 0
+    for kind, record in events:
+        if kind == "document":
+            validator.validate_document(record)
+        elif kind == "transmitter":
+            validator.validate_transmitter(record)
+        elif kind == "payer":
+            payee_index = 0
+        elif kind == "payee":
+            validator.validate_payee(record, payer_index, payee_index)
+            payee_index += 1
+        elif kind == "end_of_payer":
+            validator.validate_payer(record, payer_index)
+            payer_index += 1
+        yield kind, record
+
+class _StreamWriter:
+    """
+    Renders the records of a stream of user data events, and writes them
+    with a _RecordWriter. The transmitter and payer records are reserved
+    when their position is reached and overwritten once their totals are
+    known.
+    """
+    def __init__(self, file):
+        self.writer = _RecordWriter(file)
+        self.seq = SequenceGenerator()
+        self.payer_count = 0
+        self.payee_count = 0
+        # State of the current payer
+        self.totals = None
+        self.combined_fed_state = None
+        self.payer_index = None
+
+        # Placeholder for the transmitter record; rewritten by finish().
+        self.writer.reserve()
+        self.seq.get_next()
+
+    def start_payer(self, record):
+        """
+        Reserves the record of a payer whose payees come next. record holds
+        the payer's fields read so far.
+        """
+        # If the payer's CF/SF flag has not been read yet, state totals are
+        # tracked in case it turns up after the payees.
+        self.combined_fed_state = record.get("combined_fed_state", "")
+        self.totals = PayerTotals(self.combined_fed_state,
+                                  track_states="combined_fed_state" not in record)
+        self.payer_index = self.writer.reserve()
+        self.seq.get_next()
+
+    def write_payee(self, record):
+        """
+        Writes a payee record of the current payer.
+        """
+        payee = payees.xform([record])[0]
+        self.totals.add(payee)
+        payee["record_sequence_number"] = self.seq.get_next()
+        self.writer.write(payees.fire([payee]))
+
+    def end_payer(self, record):
+        """
+        Writes the current payer's record, now that its totals are known,
+        and appends its end of payer and state totals records. record holds
+        all the payer's fields.
+        """
+        current_payer = payer.xform(record)
+        if current_payer["combined_fed_state"] != self.combined_fed_state:
+            self.totals.combined_fed_state = \
+                current_payer["combined_fed_state"] == '1'
+            self.writer.patch_state_codes(self.payer_index + 1,
+                                          self.totals.payee_count,
+                                          self.totals.combined_fed_state)
+        current_payer["end_of_payer"] = end_of_payer.xform({})
+        self.totals.insert(current_payer)
+        # Every record written takes the next sequence number, so a record's
+        # sequence number is its index plus one
+        current_payer["record_sequence_number"] = f"{self.payer_index + 1:0>8}"
+        self.writer.overwrite(self.payer_index, payer.fire(current_payer))
+
+        current_payer["end_of_payer"]["record_sequence_number"] = \
+            self.seq.get_next()
+        self.writer.write(end_of_payer.fire(current_payer["end_of_payer"]))
+        for state_total in current_payer.get("state_totals", []):
+            state_total["record_sequence_number"] = self.seq.get_next()
+        if current_payer["combined_fed_state"] == '1':
+            self.writer.write(state_totals.fire(
+                current_payer.get("state_totals", [])))
+
+        self.payer_count += 1
+        self.payee_count += self.totals.payee_count
+
+    def finish(self, transmitter_data):
+        """
+        Writes the transmitter record over its placeholder and appends the
+        end of transmission record. Returns the summary of write_stream.
+        """
+        transmitter_record = transmitter.xform(transmitter_data)
+        transmitter_record["total_number_of_payees"] = f"{self.payee_count:0>8}"
+        transmitter_record["record_sequence_number"] = "00000001"
+        self.writer.overwrite(0, transmitter.fire(transmitter_record))
+
+        end_of_transmission_record = end_of_transmission.xform({})
+        end_of_transmission_record["total_number_of_payees"] = \
+            f"{self.payee_count:0>8}"
+        end_of_transmission_record["number_of_a_records"] = \
+            f"{self.payer_count:0>8}"
+        end_of_transmission_record["record_sequence_number"] = self.seq.get_next()
+        self.writer.write(end_of_transmission.fire(end_of_transmission_record))
+
+        return dict(record_count=self.seq.get_current(),
+                    payer_count=self.payer_count,
+                    payee_count=self.payee_count,
+                    payment_year=transmitter_record["payment_year"])
+
+# pylint: disable=protected-access
+_PAYEE_STATE_OFFSET, _ = payees._PAYEE_LAYOUT.offsets["payee_state"]
+_PAYEE_CODE_OFFSET, _ = \
+    payees._PAYEE_LAYOUT.offsets["combined_federal_state_code"]
+
+class _RecordWriter:
+    """
+    Appends fixed-length records to a binary file, and allows previously
+    reserved records to be overwritten in place.
+    """
+    def __init__(self, file):
+        self.file = file
+        self.count = 0
+
+    def write(self, records):
+        """
+        Appends one or more records, given as a single string.
+        """
+        self.file.write(records.encode("ascii"))
+        self.count += len(records) // RECORD_LENGTH
+
+    def reserve(self):
+        """
+        Appends a blank placeholder record and returns its index.
+        """
+        index = self.count
+        self.write(RECORD_LENGTH*"\x00")
+        return index
+
+    def overwrite(self, index, record):
+        """
+        Replaces the record at the given index.
+        """
+        self.file.seek(index*RECORD_LENGTH)
+        self.file.write(record.encode("ascii"))
+        self.file.seek(0, os.SEEK_END)
+
+    def patch_state_codes(self, index, count, combined_fed_state):
+        """
+        Rewrites the combined_federal_state_code field of count consecutive
+        payee records, starting at the given index. Used when a payer's
+        CF/SF flag is only known after its payees have been written.
+        """
+        for i in range(index, index + count):
+            self.file.seek(i*RECORD_LENGTH + _PAYEE_STATE_OFFSET)
+            state = self.file.read(2).decode("ascii")
+            state_code = combined_fed_state_code(state)
+            if combined_fed_state and state_code:
+                code = f"{state_code:0>2}"
+            else:
+                code = "\x00\x00"
+            self.file.seek(i*RECORD_LENGTH + _PAYEE_CODE_OFFSET)
+            self.file.write(code.encode("ascii"))
+        self.file.seek(0, os.SEEK_END)
@@ -0,0 +1,448 @@
+"""
+Module: Totals
+Running computation of the payer-level values derived from payee records:
+end_of_payer ("C") payment totals, the payer's amount codes, and the state
+totals ("K") records used by the Combined Federal/State Filing program.
+insert_payer_generated_values inserts them, with the record sequence
+numbers, into a payer's records; it is shared by the translator and the
+parallel renderer.
+"""
+from itertools import chain
+from operator import itemgetter
+
+from fire.entities import state_totals
+from .columns import RecordColumns
+from .util import combined_fed_state_code
+
+AMOUNT_CODES = ["1", "2", "3", "4", "5", "6", "7", "8", "9",
+                "A", "B", "C", "D", "E", "F", "G"]
+
+# NumPy is imported by has_numpy() the first time a payer is large enough to
+# use it, so that small runs never pay for the import. None until then, or if
+# NumPy is not installed.
+numpy = None
+_NUMPY_CHECKED = False
+
+# Below this many payees, the cost of building arrays outweighs the gain from
+# vectorizing the sums.
+NUMPY_MIN_PAYEES = 64
+
+# Largest number of payees whose 12-digit amounts can be summed in an int64
+# column without overflowing.
+_NUMPY_MAX_PAYEES = 9_000_000
+
+_AMOUNT_KEYS = [f"payment_amount_{code}" for code in AMOUNT_CODES]
+
+_get_amounts = itemgetter(*_AMOUNT_KEYS)
+
+def has_numpy():
+    """
+    Returns True if NumPy is installed. NumPy is imported on the first call.
+    """
+    # pylint: disable=global-statement, import-outside-toplevel, redefined-outer-name
+    global numpy, _NUMPY_CHECKED
+    if not _NUMPY_CHECKED:
+        _NUMPY_CHECKED = True
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+    return numpy is not None
+
+def _group_states(states):
+    # Numbers the participating states in order of first appearance. Returns
+    # the groups, as {state: (group, state code)}, and the group of each
+    # state in states (-1 for states that don't participate).
+    groups = {}
+    group_of_payee = []
+    state_codes = {}
+    for state in states:
+        if state not in state_codes:
+            state_codes[state] = combined_fed_state_code(state)
+            if state_codes[state]:
+                groups[state] = (len(groups), state_codes[state])
+        group_of_payee.append(groups[state][0] if state in groups else -1)
+    return groups, group_of_payee
+
+def _participating_groups(group_of_payee):
+    # Returns the groups of participating payees as a NumPy array, with the
+    # boolean mask selecting those payees
+    group_ids = numpy.array(group_of_payee)
+    participating = group_ids >= 0
+    return group_ids[participating], participating
+
+def _column_group_sums(payees, key, group_of_payee, counts, numpy_groups):
+    # Returns the sums of a RecordColumns amount column per state group.
+    # numpy_groups is None, or the result of _participating_groups.
+    column = payees.integers(key)
+    if column is None:
+        constant = payees.constant(key)
+        return [constant*group_count for group_count in counts]
+    if numpy_groups is not None:
+        group_ids, participating = numpy_groups
+        group_sums = numpy.zeros(len(counts), dtype=numpy.int64)
+        numpy.add.at(group_sums, group_ids, numpy.frombuffer(
+            column, dtype=numpy.int64)[participating])
+        return group_sums.tolist()
+    group_sums = [0]*len(counts)
+    for group, amount in zip(group_of_payee, column):
+        if group >= 0:
+            group_sums[group] += amount
+    return group_sums
+
+def compute_totals(payees, combined_fed_state, engine=None, seq=None):
+    """
+    Computes the totals for a payer's payees in one go. This is equivalent
+    to calling PayerTotals.add() for each payee, including the insertion of
+    payees' combined_federal_state_code, but can use NumPy to parse the
+    payment amounts into a (payees x 16) matrix and sum its columns.
+
+    If a sequence generator is given, the payees' record_sequence_number
+    values are inserted in the same pass.
+
+    Parameters
+    ----------
+    payees : list of dict
+        Payee records, as returned by payees.xform(). Payees stored as
+        RecordColumns are totalled column by column (see
+        PayerTotals.add_columns), regardless of engine.
+    combined_fed_state : str
+        The payer's combined_fed_state field
+    engine : str
+        optional: "numpy" or "python". By default, NumPy is used if it is
+        installed and there are at least NUMPY_MIN_PAYEES payees.
+    seq : SequenceGenerator
+        optional generator for the payees' record sequence numbers
+
+    Returns
+    ----------
+    PayerTotals
+        Totals for the given payees
+    """
+    if isinstance(payees, RecordColumns):
+        totals = PayerTotals(combined_fed_state)
+        totals.add_columns(payees, seq)
+        return totals
+
+    if engine is None:
+        use_numpy = NUMPY_MIN_PAYEES <= len(payees) <= _NUMPY_MAX_PAYEES \
+            and has_numpy()
+    elif engine == "numpy":
+        if not has_numpy():
+            raise ImportError("The numpy totals engine requires numpy")
+        use_numpy = 0 < len(payees) <= _NUMPY_MAX_PAYEES
+    elif engine == "python":
+        use_numpy = False
+    else:
+        raise ValueError(f"Unknown totals engine: {engine}")
+
+    totals = PayerTotals(combined_fed_state)
+    if use_numpy:
+        matrix = _amount_matrix(payees)
+        if matrix is not None:
+            totals.add_matrix(payees, matrix, seq)
+            return totals
+    for payee in payees:
+        totals.add(payee)
+        if seq is not None:
+            payee["record_sequence_number"] = seq.get_next()
+    return totals
+
+def insert_payer_generated_values(current_payer, seq):
+    """
+    Inserts all system-generated values for a single payer in one pass over
+    its payees: payer and end_of_payer totals, state totals records and
+    payee state codes (for CF/SF payers), and the record sequence numbers of
+    the payer, its payees, end_of_payer and state totals records.
+    _Note: this edits the input parameter in-place._
+
+    Parameters
+    ----------
+    current_payer : dict
+        Payer record, including its payees and end_of_payer record.
+    seq : SequenceGenerator
+        Generator for the record sequence numbers, positioned just before
+        the payer record.
+    """
+    current_payer["record_sequence_number"] = seq.get_next()
+    totals = compute_totals(current_payer["payees"],
+                            current_payer["combined_fed_state"], seq=seq)
+    totals.insert(current_payer)
+    current_payer["end_of_payer"]["record_sequence_number"] = seq.get_next()
+    for state_total in current_payer.get("state_totals", []):
+        state_total["record_sequence_number"] = seq.get_next()
+
+def _amount_matrix(payees):
+    """
+    Parses the payees' payment amounts into a (payees x 16) int64 matrix.
+    The amounts are joined into a single buffer, each one followed by a
+    separator, and parsed as fixed-width digits. Returns None if any amount
+    is not a plain digit string of the same width as the others.
+    """
+    width = len(payees[0]["payment_amount_1"])
+    if not 0 < width <= 18:
+        return None
+    try:
+        raw = ",".join(chain.from_iterable(map(_get_amounts, payees)))
+        data = numpy.frombuffer((raw + ",").encode("ascii"), dtype=numpy.uint8)
+    except UnicodeEncodeError:
+        return None
+    cells_count = len(payees)*len(AMOUNT_CODES)
+    if data.size != cells_count*(width + 1):
+        return None
+    cells = data.reshape(cells_count, width + 1)
+    if (cells[:, width] != ord(",")).any():
+        return None
+    digits = cells[:, :width] - ord("0")
+    if (digits > 9).any():
+        return None
+    powers = 10**numpy.arange(width - 1, -1, -1, dtype=numpy.int64)
+    return (digits.astype(numpy.int64) @ powers).reshape(len(payees),
+                                                           len(AMOUNT_CODES))
+
+class PayerTotals:
+    """
+    Accumulates totals for a single payer one payee at a time, so that the
+    payees do not need to be held in memory to compute them.
+
+    Attributes
+    ----------
+    self.combined_fed_state : bool
+        Whether the payer participates in the CF/SF program.
+    self.track_states : bool
+        Whether state totals are accumulated even if the payer does not (yet)
+        participate in the CF/SF program.
+    self.payee_count : int
+        Number of payees added so far.
+    self.totals : list of int
+        Running payment totals, one per code in AMOUNT_CODES.
+    self.states : dict
+        Running state totals for CF/SF, keyed by state abbreviation.
+
+    Methods
+    ----------
+    add(payee):
+        Adds a single (transformed) payee record to the totals.
+    add_matrix(payees, matrix, seq=None):
+        Adds many payees at once, given their amounts as a NumPy matrix.
+    add_columns(payees, seq=None):
+        Adds all payees of a RecordColumns store, column by column.
+    insert(current_payer):
+        Writes the accumulated totals into the payer record.
+    insert_payer_totals(current_payer):
+        Writes amount_codes and the end_of_payer totals only.
+    insert_state_totals(current_payer):
+        Writes the state_totals records only.
+    """
+    def __init__(self, combined_fed_state, track_states=False):
+        self.combined_fed_state = combined_fed_state == '1'
+        self.track_states = track_states
+        self.payee_count = 0
+        self.totals = [0 for _ in AMOUNT_CODES]
+        self.states = {}
+
+    def add(self, payee):
+        """
+        Adds the payee's payment amounts to the payer and state totals. If
+        the payer participates in the CF/SF program, also inserts the payee's
+        combined_federal_state_code. _Note: this edits the payee in-place._
+
+        Parameters
+        ----------
+        payee : dict
+            Payee record, as returned by payees.xform()
+        """
+        self.payee_count += 1
+        amounts = []
+        for i, code in enumerate(AMOUNT_CODES):
+            try:
+                amount = int(payee["payment_amount_" + code])
+            except ValueError:
+                amount = None
+            else:
+                self.totals[i] += amount
+            amounts.append(amount)
+
+        if not (self.combined_fed_state or self.track_states):
+            return
+
+        state = payee["payee_state"]
+        state_code = combined_fed_state_code(state)
+        if not state_code:
+            # Payee's state not participating in CF/SF program; skip this payee
+            return
+        if self.combined_fed_state:
+            payee["combined_federal_state_code"] = f"{state_code:0>2}"
+
+        if state not in self.states:
+            self.states[state] = dict(number_of_payees=0,
+                                      combined_federal_state_code=state_code)
+        state_total = self.states[state]
+        state_total["number_of_payees"] += 1
+        for code, amount in zip(AMOUNT_CODES, amounts):
+            if amount is not None:
+                payment_bucket = f"payment_amount_{code}"
+                state_total[payment_bucket] = \
+                    state_total.get(payment_bucket, 0) + amount
+
+    def add_matrix(self, payees, matrix, seq=None):
+        """
+        Adds many payees at once, given their payment amounts as a
+        (payees x 16) NumPy integer matrix. Totals are computed as column
+        sums, and state totals by grouping rows on the payee's state. If a
+        sequence generator is given, record sequence numbers are inserted
+        into the payees as well.
+        _Note: like add(), this edits the payees in-place._
+        """
+        self.payee_count += len(payees)
+        for i, total in enumerate(matrix.sum(axis=0).tolist()):
+            self.totals[i] += total
+
+        if not (self.combined_fed_state or self.track_states):
+            if seq is not None:
+                for payee in payees:
+                    payee["record_sequence_number"] = seq.get_next()
+            return
+
+        groups, group_of_payee = self._group_payees(payees, seq)
+        if not groups:
+            return
+
+        group_ids, participating = _participating_groups(group_of_payee)
+        sums = numpy.zeros((len(groups), len(AMOUNT_CODES)), dtype=numpy.int64)
+        numpy.add.at(sums, group_ids, matrix[participating])
+        counts = numpy.bincount(group_ids, minlength=len(groups))
+        self._add_state_sums(groups, counts.tolist(), sums.tolist())
+
+    def add_columns(self, payees, seq=None):
+        """
+        Adds all payees of a RecordColumns store. Totals are sums of the
+        amount columns, and state totals are grouped on the payee_state
+        column. If a sequence generator is given, the payees' record sequence
+        numbers are set as a range. For CF/SF payers, the
+        combined_federal_state_code column is replaced.
+        _Note: like add(), this edits the payees in-place._
+        """
+        count = len(payees)
+        self.payee_count += count
+        if seq is not None:
+            payees.set_range("record_sequence_number", seq.counter + 1)
+            seq.counter += count
+
+        for i, key in enumerate(_AMOUNT_KEYS):
+            self.totals[i] += payees.sum(key)
+
+        if not (self.combined_fed_state or self.track_states):
+            return
+
+        groups, group_of_payee = _group_states(payees.values("payee_state"))
+        if not groups:
+            return
+
+        if self.combined_fed_state:
+            codes = [f"{state_code:0>2}" for _, state_code in groups.values()]
+            payees.set_values("combined_federal_state_code", [
+                codes[group] if group >= 0 else value for group, value
+                in zip(group_of_payee, payees.values("combined_federal_state_code"))])
+
+        counts = [0]*len(groups)
+        for group in group_of_payee:
+            if group >= 0:
+                counts[group] += 1
+        numpy_groups = _participating_groups(group_of_payee) \
+            if has_numpy() else None
+        code_sums = [_column_group_sums(payees, key, group_of_payee, counts,
+                                        numpy_groups)
+                     for key in _AMOUNT_KEYS]
+        self._add_state_sums(groups, counts, list(zip(*code_sums)))
+
+    def _group_payees(self, payees, seq):
+        # Numbers the states of participating payees in order of first
+        # appearance, so that state totals records come out in the same order
+        # as with add(), inserting the payees' record sequence numbers and, for
+        # CF/SF payers, combined_federal_state_code as it goes. Returns the
+        # groups, as {state: (group, state code)}, and each payee's group (-1
+        # for payees in states that don't participate).
+        groups = {}
+        group_of_payee = []
+        state_codes = {}
+        for payee in payees:
+            if seq is not None:
+                payee["record_sequence_number"] = seq.get_next()
+            state = payee["payee_state"]
+            if state not in state_codes:
+                state_codes[state] = combined_fed_state_code(state)
+            state_code = state_codes[state]
+            if not state_code:
+                group_of_payee.append(-1)
+                continue
+            if self.combined_fed_state:
+                payee["combined_federal_state_code"] = f"{state_code:0>2}"
+            if state not in groups:
+                groups[state] = (len(groups), state_code)
+            group_of_payee.append(groups[state][0])
+        return groups, group_of_payee
+
+    def _add_state_sums(self, groups, counts, sums):
+        # Adds the payee counts and payment sums of each state group (as
+        # returned by _group_payees) to the state totals. sums holds one row
+        # of amounts per group, in the order of AMOUNT_CODES.
+        for state, (group, state_code) in groups.items():
+            if state not in self.states:
+                self.states[state] = dict(
+                    number_of_payees=0, combined_federal_state_code=state_code)
+            state_total = self.states[state]
+            state_total["number_of_payees"] += counts[group]
+            for key, amount in zip(_AMOUNT_KEYS, sums[group]):
+                state_total[key] = state_total.get(key, 0) + amount
+
+    def insert(self, current_payer):
+        """
+        Inserts the accumulated values into the payer record: amount_codes,
+        the end_of_payer totals and, for CF/SF payers with participating
+        payees, the state_totals records.
+        _Note: this edits the input parameter in-place._
+
+        Parameters
+        ----------
+        current_payer : dict
+            Payer record, as returned by payer.xform(), with an end_of_payer
+            record under the "end_of_payer" key.
+        """
+        self.insert_payer_totals(current_payer)
+        self.insert_state_totals(current_payer)
+
+    def insert_payer_totals(self, current_payer):
+        """
+        Inserts amount_codes and the end_of_payer totals into the payer
+        record. _Note: this edits the input parameter in-place._
+        """
+        payer_code_string = ""
+        for total, code in zip(self.totals, AMOUNT_CODES):
+            if total != 0:
+                payer_code_string += code
+                current_payer["end_of_payer"]["payment_amount_" + code] = \
+                    f"{total:0>18}"
+        current_payer["amount_codes"] = payer_code_string
+        current_payer["end_of_payer"]["number_of_payees"] = \
+            f"{self.payee_count:0>8}"
+
+    def insert_state_totals(self, current_payer):
+        """
+        Inserts the state_totals records into the payer record, if the payer
+        participates in the CF/SF program and any of its payees are in
+        participating states. _Note: this edits the input parameter in-place._
+        """
+        if self.combined_fed_state and self.states:
+            records = []
+            for state in self.states.values():
+                record = {}
+                for key, value in state.items():
+                    if key == "number_of_payees":
+                        record[key] = f"{value:0>8}"
+                    elif key == "combined_federal_state_code":
+                        record[key] = f"{value:0>2}"
+                    else:
+                        record[key] = f"{value:0>18}"
+                records.append(record)
+            current_payer["state_totals"] = state_totals.xform(records)
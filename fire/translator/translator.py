@@ -7,32 +7,28 @@ Support notes:
 * 1099-MISC files only.
 * Singly payer only. For multiple payers, use multiple input files.
 """
-import os.path
 import json
-from time import gmtime, strftime
-import click
-from jsonschema import validate
 
 from fire.entities import transmitter, payer, payees, end_of_payer, \
                           state_totals, end_of_transmission
-from .util import SequenceGenerator, combined_fed_state_code
-
-@click.command()
-@click.argument('input_path', type=click.Path(exists=True))
-@click.option('--output', type=click.Path(),
-              help='system path for the output to be generated')
-@click.option('--debug', is_flag=True,
-              help='toggle debug/verbose mode')
-def cli(input_path, output, debug):
-    """
-    Convert a JSON input file into the format required by IRS Publication 1220
-
-    \b
-    input_path: system path for file containing the user input JSON data
-    """
-    run(input_path, output, debug)
-
-def run(input_path, output_path, debug):
+from .columns import RecordColumns
+from .output import write_output
+from .parallel import get_fire_format_parallel
+from .profiling import NullProfiler
+from .totals import compute_totals, insert_payer_generated_values
+from .user_data import default_output_path, extract_user_data, \
+                        validate_user_data
+from .util import SequenceGenerator, RecordBuffer, combined_fed_state_code
+from .validation import SCHEMA_PATH, get_validator, validate, \
+                         validate_headers, validate_incremental  # pylint: disable=unused-import
+
+# Largest number of payee records rendered into a single string by
+# iter_fire_records
+PAYEE_CHUNK_SIZE = 1000
+
+def run(input_path, output_path, debug=False, workers=None, profiler=None,
+        storage="dict", cache_path=None, compression=None,
+        compression_level=None):
     """
     Sequentially calls helper functions to fully process :
     * Load user JSON data from input file
@@ -49,6 +45,26 @@ def run(input_path, output_path, debug):
         optional system path for the output to be generated
     debug : bool
         optional bool to output debug information
+    workers : int
+        optional number of processes to render payers with. When given, the
+        master schema is never built as a whole, so 'json_data' is None and
+        debug is not supported.
+    profiler : profiler
+        optional profiler (such as profiling.StageProfiler) whose stage(name)
+        context manager is entered for each stage in profiling.STAGES
+    storage : str
+        optional in-memory representation of payee records (see
+        load_full_schema)
+    cache_path : str
+        optional system path for a render cache (see cache.RenderCache).
+        Rendered payee records are reused from, and stored in, the cache.
+        Only supported with dict storage and without workers.
+    compression : str
+        optional "gzip" or "zip" to compress the output as it is written
+        (see output.write_output). The default output path then ends with
+        .gz or .zip.
+    compression_level : int
+        optional compression level, from 0 to 9
 
     Returns
     ----------
@@ -57,67 +73,79 @@ def run(input_path, output_path, debug):
                      gets printed out if you specify debug=True)
         'fire_data': this is the data that gets written out in output_path
     """
-    module_path = os.path.split(os.path.realpath(__file__))[0]
-    schema_path = os.path.join(module_path, '../schema', 'base_schema.json')
-    input_dirname = os.path.dirname(os.path.abspath(input_path))
-
-    user_data = extract_user_data(input_path)
-    validate_user_data(user_data, schema_path)
-
-    master = load_full_schema(user_data)
-    insert_generated_values(master)
+    if profiler is None:
+        profiler = NullProfiler()
+    if cache_path is not None and (workers is not None or storage != "dict"):
+        raise ValueError("The render cache requires dict storage and no workers")
+
+    with profiler.stage("extract"):
+        user_data = extract_user_data(input_path)
+
+    if cache_path is not None:
+        # pylint: disable=import-outside-toplevel
+        from .cache import RenderCache
+        with RenderCache(cache_path) as cache:
+            return _run_cached(input_path, output_path, debug, profiler,
+                               user_data, cache, compression, compression_level)
+
+    with profiler.stage("validate"):
+        validate_user_data(user_data, SCHEMA_PATH)
+
+    if workers is not None:
+        if debug:
+            raise ValueError("debug output is not supported with workers")
+        with profiler.stage("render"):
+            ascii_string = get_fire_format_parallel(user_data, workers)
+        if output_path is None:
+            output_path = default_output_path(
+                input_path, transmitter.xform(user_data["transmitter"])["payment_year"],
+                compression)
+        with profiler.stage("write"):
+            write_1099_file(ascii_string, output_path, compression,
+                            compression_level)
+        return dict(json_data=None, fire_data=ascii_string)
+
+    with profiler.stage("merge"):
+        master = load_full_schema(user_data, storage)
+    return _run_master(input_path, output_path, debug, profiler, master,
+                       compression, compression_level)
+
+def _run_cached(input_path, output_path, debug, profiler, user_data, cache,
+                compression, compression_level):
+    # Payees found in the cache were validated when they were stored. The
+    # lookup walks every payer's payees, so the headers are validated first.
+    with profiler.stage("validate"):
+        validate_headers(user_data, SCHEMA_PATH)
+        cached_records = cache.lookup(user_data)
+        validate_incremental(user_data, SCHEMA_PATH,
+                             known_valid=cached_records)
+    with profiler.stage("merge"):
+        master = load_full_schema(user_data, cache=cache,
+                                  cached_records=cached_records)
+    return _run_master(input_path, output_path, debug, profiler, master,
+                       compression, compression_level)
+
+def _run_master(input_path, output_path, debug, profiler, master,
+                compression, compression_level):
+    with profiler.stage("generated_values"):
+        insert_generated_values(master)
     if debug:
-        print(json.dumps(master, indent=4))
+        print(dump_master(master))
 
-    ascii_string = get_fire_format(master)
+    with profiler.stage("render"):
+        ascii_string = get_fire_format(master)
 
     if output_path is None:
-        output_path = "{}/fire_{}_output_{}".format(input_dirname,
-                                                    master["transmitter"]["payment_year"],
-                                                    strftime("%Y-%m-%d %H_%M_%S", gmtime()))
-    write_1099_file(ascii_string, output_path)
-
-    return dict(json_data=json.dumps(master, indent=4), fire_data=ascii_string)
-
-
-def extract_user_data(path):
-    """
-    Opens file at path specified by input parameter. Reads data as JSON and
-    returns a dict containing that JSON data.
-
-    Parameters
-    ----------
-    path : str
-        system path for file containing the user input JSON data
-
-    Returns
-    ----------
-    dict
-        JSON data loaded from file at input path
-    """
-    user_data = {}
-    with open(path, mode='r', encoding='utf-8') as file:
-        user_data = json.load(file)
-    return user_data
-
-def validate_user_data(data, schema_path):
-    """
-    Validates data (first param) against the base schema (second param)
-
-    Parameters
-    ----------
-    data : dict
-        data to be validated
+        output_path = default_output_path(input_path,
+                                          master["transmitter"]["payment_year"],
+                                          compression)
+    with profiler.stage("write"):
+        write_1099_file(ascii_string, output_path, compression,
+                        compression_level)
 
-    schema_path: str
-        system path for file containing schema to data validate against
+    return dict(json_data=dump_master(master), fire_data=ascii_string)
 
-    """
-    with open(schema_path, mode='r', encoding='utf-8') as schema:
-        schema = json.load(schema)
-        validate(data, schema)
-
-def load_full_schema(data):
+def load_full_schema(data, storage="dict", cache=None, cached_records=None):
     """
     Merges data into the master schema for records, including fields that were
     not specified in the data originally loaded (such as system-generated fields
@@ -127,6 +155,18 @@ def load_full_schema(data):
     ----------
     data : dict
         JSON data to be merged into master schema
+    storage : str
+        optional in-memory representation of payee records: "dict" (the
+        default), "slots" for compact SlottedRecords, or "columnar" to store
+        each payer's payees as one RecordColumns. insert_generated_values and
+        get_fire_format accept all three.
+    cache : RenderCache
+        optional render cache. Payees found in it are not transformed, but
+        kept as their cached records (see cache.RenderCache.xform); storage
+        is then ignored.
+    cached_records : list
+        optional result of cache.lookup(data), if the payees have been
+        looked up already.
 
     Returns
     ----------
@@ -139,13 +179,33 @@ def load_full_schema(data):
     merged_data["transmitter"] = transmitter.xform(data["transmitter"])
     for current_payer in data["payers"]:
         payer_merged_data = payer.xform(current_payer)
-        payer_merged_data["payees"] = payees.xform(current_payer["payees"])
+        if cache is not None:
+            payer_merged_data["payees"] = cache.xform(
+                current_payer["payees"], payer_merged_data["combined_fed_state"],
+                cached_records[len(merged_data["payers"])]
+                if cached_records is not None else None)
+        else:
+            payer_merged_data["payees"] = payees.xform(current_payer["payees"],
+                                                       storage)
         payer_merged_data["end_of_payer"] = end_of_payer.xform({})
         merged_data["payers"].append(payer_merged_data)
     merged_data["end_of_transmission"] = end_of_transmission.xform({})
 
     return merged_data
 
+def dump_master(data):
+    """
+    Returns the master schema as an indented JSON string, with any
+    SlottedRecords (or cached payee records) written as objects and
+    RecordColumns as arrays of them.
+    """
+    return json.dumps(data, indent=4, default=_json_default)
+
+def _json_default(value):
+    if isinstance(value, RecordColumns):
+        return value.to_list()
+    return value.to_dict()
+
 def insert_generated_values(data):
     """
     Inserts system-generated values into the appropriate fields. _Note: this
@@ -154,6 +214,10 @@ def insert_generated_values(data):
     Examples of fields inserted: [all]::record_sequence_number,
     payer::number_of_payees, transmitter::total_number_of_payees, etc.
 
+    This is equivalent to calling insert_payers_totals,
+    insert_transmitter_totals, create_and_insert_state_totals and
+    insert_sequence_numbers in turn, but walks each payer's payees only once.
+
     Parameters
     ----------
     data : dict
@@ -162,10 +226,13 @@ def insert_generated_values(data):
         fields captured.
 
     """
-    insert_payers_totals(data)
+    seq = SequenceGenerator()
+
+    data["transmitter"]["record_sequence_number"] = seq.get_next()
+    for current_payer in data["payers"]:
+        insert_payer_generated_values(current_payer, seq)
     insert_transmitter_totals(data)
-    create_and_insert_state_totals(data)
-    insert_sequence_numbers(data)
+    data["end_of_transmission"]["record_sequence_number"] = seq.get_next()
 
 def insert_sequence_numbers(data):
     """
@@ -217,26 +284,7 @@ def insert_payer_totals(current_payer):
     Inserts required values into a single payer record.
     _Note: this edits the input parameter in-place._
     """
-    codes = ["1", "2", "3", "4", "5", "6", "7", "8", "9",
-             "A", "B", "C", "D", "E", "F", "G"]
-    totals = [0 for _ in range(len(codes))]
-    payer_code_string = ""
-
-    for payee in current_payer["payees"]:
-        for i, code in enumerate(codes):
-            try:
-                totals[i] += int(payee["payment_amount_" + code])
-            except ValueError:
-                pass
-
-    for i, (total, code) in enumerate(zip(totals, codes)):
-        if total != 0:
-            payer_code_string += code
-            current_payer["end_of_payer"]["payment_amount_" + code] = f"{total:0>18}"
-
-    current_payer["amount_codes"] = str(payer_code_string)
-    payee_count = len(current_payer["payees"])
-    current_payer["end_of_payer"]["number_of_payees"] = f"{payee_count:0>8}"
+    compute_totals(current_payer["payees"], "").insert_payer_totals(current_payer)
 
 def insert_transmitter_totals(data):
     """
@@ -279,8 +327,10 @@ def create_and_insert_state_totals(data):
 
     """
     for current_payer in data["payers"]:
-        insert_state_totals(current_payer)
-        insert_payee_state_codes(current_payer)
+        if current_payer["combined_fed_state"] != '1':
+            continue
+        totals = compute_totals(current_payer["payees"], '1')
+        totals.insert_state_totals(current_payer)
 
 def insert_state_totals(current_payer):
     """
@@ -294,48 +344,11 @@ def insert_state_totals(current_payer):
 
     _Note: this edits the input parameter in-place._
     """
-    codes = ["1", "2", "3", "4", "5", "6", "7", "8", "9",
-             "A", "B", "C", "D", "E", "F", "G"]
-    states = {}
-
     if current_payer["combined_fed_state"] != '1':
         return
 
-    for payee in current_payer["payees"]:
-        state = payee["payee_state"]
-        state_code = combined_fed_state_code(state)
-        if not state_code:
-            # Payee's state not participating in CF/SF program; skip this payee
-            continue
-
-        if state not in states:
-            states[state] = dict(number_of_payees=0, combined_federal_state_code=state_code)
-        states[state]['number_of_payees'] += 1
-        for i, code in enumerate(codes):
-            try:
-                payment_bucket = f"payment_amount_{code}"
-                amount = int(payee[payment_bucket])
-                if payment_bucket not in states[state]:
-                    states[state][payment_bucket] = 0
-                states[state][payment_bucket] += amount
-            except ValueError:
-                pass
-
-    if states:
-        # Convert calculated values to strings for output
-        for key in states:
-            state = states[key]
-            state['number_of_payees'] = f"{state['number_of_payees']:0>8}"
-            state['combined_federal_state_code'] = f"{state['combined_federal_state_code']:0>2}"
-            for code in codes:
-                payment_bucket = f"payment_amount_{code}"
-                if payment_bucket in state:
-                    state[payment_bucket] = f"{state[payment_bucket]:0>18}"
-
-        # We couldn't do the below earlier (unlike the other record types)
-        # since the number of K records has to be determined first before
-        # we can xform.
-        current_payer["state_totals"] = state_totals.xform(states.values())
+    totals = compute_totals(current_payer["payees"], '1')
+    totals.insert_state_totals(current_payer)
 
 def insert_payee_state_codes(current_payer):
     """
@@ -378,33 +391,80 @@ def get_fire_format(data):
         FIRE-formatted string containing data provided as the input parameter.
 
     """
-    fire_string = ""
+    return "".join(iter_fire_records(data))
+
+def get_fire_buffer(data):
+    """
+    Returns the input dictionary converted into the format required by the
+    IRS FIRE electronic filing system, assembled in a preallocated buffer
+    rather than as a string. See get_fire_format for the expected input.
 
-    fire_string += transmitter.fire(data["transmitter"])
+    Parameters
+    ----------
+    data : dict
+        Dictionary containing records to be processed into FIRE format.
+
+    Returns
+    ----------
+    RecordBuffer
+        Buffer containing the FIRE-formatted records. Use getbuffer() for a
+        memoryview of its contents, or getvalue() for bytes.
+    """
+    buffer = RecordBuffer(count_records(data))
+    buffer.extend(iter_fire_records(data))
+    return buffer
+
+def iter_fire_records(data):
+    """
+    Yields the FIRE-formatted records for the input dictionary, in file
+    order. Payees are yielded in strings of at most PAYEE_CHUNK_SIZE
+    records, and state totals as one string per payer. See get_fire_format
+    for the expected input.
+    """
+    yield transmitter.fire(data["transmitter"])
     for current_payer in data["payers"]:
-        fire_string += payer.fire(current_payer)
-        fire_string += payees.fire(current_payer["payees"])
-        fire_string += end_of_payer.fire(current_payer["end_of_payer"])
+        yield payer.fire(current_payer)
+        yield from payees.iter_fire(current_payer["payees"], PAYEE_CHUNK_SIZE)
+        yield end_of_payer.fire(current_payer["end_of_payer"])
         if current_payer["combined_fed_state"] == '1':
-            fire_string += state_totals.fire(current_payer["state_totals"])
-    fire_string += end_of_transmission.fire(data["end_of_transmission"])
+            yield state_totals.fire(current_payer.get("state_totals", []))
+    yield end_of_transmission.fire(data["end_of_transmission"])
 
-    return fire_string
+def count_records(data):
+    """
+    Returns the number of records in the FIRE-formatted output for the input
+    dictionary. See get_fire_format for the expected input.
+    """
+    record_count = 2
+    for current_payer in data["payers"]:
+        record_count += 2 + len(current_payer["payees"])
+        if current_payer["combined_fed_state"] == '1':
+            record_count += len(current_payer.get("state_totals", []))
+    return record_count
 
-def write_1099_file(formatted_string, path):
+def write_1099_file(formatted_string, path, compression=None, level=None):
     """
-    Writes the given string to a file at the given path. If the file does not
-    exist, it will be created.
+    Writes the given string to a file at the given path, replacing any
+    existing file. The data is written in ASCII to a temporary file, which
+    is flushed to disk and atomically renamed to path, so the file at path is
+    never left partially written (see output.write_output).
 
     Parameters
     ----------
-    formatted_string : str
-        FIRE-formatted string to be written to disk.
+    formatted_string : str, bytes, memoryview or iterable of str
+        FIRE-formatted data to be written to disk, such as the output of
+        get_fire_format, get_fire_buffer(...).getbuffer() or
+        iter_fire_records.
 
     path: str
         Path of file to be written.
 
+    compression : str
+        optional "gzip" or "zip": the data is compressed as it is written,
+        into a gzip file or a zip archive with a single member.
+
+    level : int
+        optional compression level, from 0 (fastest) to 9 (smallest)
+
     """
-    file = open(path, mode='w+')
-    file.write(formatted_string)
-    file.close()
+    write_output(formatted_string, path, compression, level)
@@ -0,0 +1,85 @@
+"""
+Module: User data
+Reading and validation of the user input JSON data, and the default path of
+the output generated from it. This module only depends on the output and
+validation modules, so that any module of the package can import it.
+"""
+import os.path
+import json
+from time import gmtime, strftime
+
+from .output import COMPRESSION_EXTENSIONS
+from .validation import SCHEMA_PATH, validate, validate_incremental
+
+def default_output_path(input_path, payment_year, compression=None):
+    """
+    Returns the path used for the output file when none is specified: a
+    timestamped file name in the same directory as the input file.
+
+    Parameters
+    ----------
+    input_path : str
+        system path for file containing the user input JSON data
+    payment_year : str
+        payment year of the transmitter record
+    compression : str
+        optional compression of the output ("gzip" or "zip"), whose
+        extension is appended to the file name
+
+    Returns
+    ----------
+    str
+        system path for the output to be generated
+    """
+    input_dirname = os.path.dirname(os.path.abspath(input_path))
+    return "{}/fire_{}_output_{}{}".format(input_dirname, payment_year,
+                                           strftime("%Y-%m-%d %H_%M_%S", gmtime()),
+                                           COMPRESSION_EXTENSIONS.get(compression, ""))
+
+def extract_user_data(path):
+    """
+    Opens file at path specified by input parameter. Reads data as JSON and
+    returns a dict containing that JSON data.
+
+    Parameters
+    ----------
+    path : str
+        system path for file containing the user input JSON data
+
+    Returns
+    ----------
+    dict
+        JSON data loaded from file at input path
+    """
+    user_data = {}
+    with open(path, mode='r', encoding='utf-8') as file:
+        user_data = json.load(file)
+    return user_data
+
+def validate_user_data(data, schema_path=SCHEMA_PATH, incremental=False):
+    """
+    Validates data (first param) against the base schema (second param).
+    The validator for each schema file is built once and cached (see
+    get_validator), so repeated calls skip loading and checking the schema.
+
+    With incremental=True, the transmitter and each payer header are
+    validated once, and payees are validated individually in chunks against
+    the payee sub-schema (see validation.validate_incremental).
+
+    Parameters
+    ----------
+    data : dict
+        data to be validated
+
+    schema_path: str
+        optional system path for file containing schema to data validate
+        against
+
+    incremental: bool
+        optional bool to validate payees one at a time
+
+    """
+    if incremental:
+        validate_incremental(data, schema_path)
+    else:
+        validate(data, schema_path)
@@ -3,7 +3,12 @@ Module: Util
 Defines a set of classes and functions shared by other modules within
 the fire-1099 application.
 """
-import re
+import sys
+from operator import attrgetter, itemgetter
+
+# pylint: disable=unused-import
+from .kernels import identity, digits_only, uppercase, rjust_zero, \
+                     zero_fill, combined_fed_state_code
 
 # SequenceGenerator: generates sequential integer numbers
 class SequenceGenerator:
@@ -15,7 +20,9 @@ class SequenceGenerator:
     Attributes
     ----------
     self.counter : int
-        Maintains the last-used sequence number.
+        Maintains the last-used sequence number. Starts at the optional
+        constructor argument (0 by default), so the first number returned
+        is counter + 1.
 
     Methods
     ----------
@@ -23,8 +30,8 @@ class SequenceGenerator:
         Increments the sequence number represented by self.counter, and returns
         it in the format specified by IRS Publication 1220.
     """
-    def __init__(self):
-        self.counter = 0
+    def __init__(self, counter=0):
+        self.counter = counter
 
     def get_next(self):
         """
@@ -51,6 +58,70 @@ class SequenceGenerator:
         """
         return self.counter
 
+class RecordBuffer:
+    """
+    Assembles fixed-length records into a preallocated bytearray. Since every
+    record has the same length, the size of the output is known up front, and
+    appending a record never copies the records that precede it.
+
+    Attributes
+    ----------
+    self.record_length : int
+        Length of each record, in bytes.
+    self.count : int
+        Number of records appended so far.
+
+    Methods
+    ----------
+    append(records):
+        Appends one or more records, given as a single string.
+    extend(iterable):
+        Appends each string of records in iterable.
+    memoryview getbuffer():
+        Returns a read-only view of the records appended so far.
+    bytes getvalue():
+        Returns a copy of the records appended so far.
+    """
+    def __init__(self, record_count, record_length=750):
+        self.record_length = record_length
+        self.count = 0
+        self._buffer = bytearray(record_count*record_length)
+        self._pos = 0
+
+    def append(self, records):
+        """
+        Appends one or more ASCII records, given as a single string whose
+        length is a multiple of the record length.
+        """
+        encoded = records.encode("ascii")
+        end = self._pos + len(encoded)
+        if len(encoded) % self.record_length or end > len(self._buffer):
+            raise Exception(f"Cannot append {len(encoded)} bytes of records \
+                    at offset {self._pos} -- Capacity: {len(self._buffer)}")
+        self._buffer[self._pos:end] = encoded
+        self._pos = end
+        self.count += len(encoded) // self.record_length
+
+    def extend(self, iterable):
+        """
+        Appends each string of records in iterable.
+        """
+        for records in iterable:
+            self.append(records)
+
+    def getbuffer(self):
+        """
+        Returns a read-only memoryview of the records appended so far,
+        without copying them.
+        """
+        return memoryview(self._buffer)[:self._pos].toreadonly()
+
+    def getvalue(self):
+        """
+        Returns the records appended so far as bytes.
+        """
+        return bytes(self.getbuffer())
+
 ########## Entity support functions ##########
 
 def xform_entity(entity_dict, data):
@@ -129,32 +200,209 @@ def fire_entity(entity_dict, key_ordering, data, expected_length=750):
                     {len(record_string)}")
     return record_string
 
-def combined_fed_state_code(state_abbrev):
+class SlottedRecord:
     """
-    Returns the IRS FIRE Combined Federal/State Filing (CF/SF) code for the given state.
+    Base class for the compact record classes generated by
+    RecordLayout.record_class. Each field is stored in a slot rather than in a
+    per-record dict, and records support the same item access as the dicts
+    returned by xform (record[key] and record[key] = value), so they can be
+    used in their place. Unlike a dict, a record has exactly its layout's
+    fields: reading or writing any other key raises KeyError.
 
-    Parameters
+    Methods
     ----------
-    state_abbrev: string
-        State abbreviation, as specified in IRS Pub 1220 (e.g. California = CA)
+    list keys():
+        Returns the field names, in record order.
+    list items():
+        Returns (field name, value) pairs, in record order.
+    get(key, default=None):
+        Returns the value of a field, or default if there is no such field.
+    dict to_dict():
+        Returns the record as a dict.
+    """
+    __slots__ = ()
+    # Field names, set by RecordLayout.record_class
+    _field_names = frozenset()
 
-    Returns
+    def __getitem__(self, key):
+        if key not in self._field_names:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self._field_names:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def keys(self):
+        """
+        Returns the field names, in record order.
+        """
+        return list(self.__slots__)
+
+    def items(self):
+        """
+        Returns (field name, value) pairs, in record order.
+        """
+        return [(key, getattr(self, key)) for key in self.__slots__]
+
+    def get(self, key, default=None):
+        """
+        Returns the value of a field, or default if there is no such field.
+        """
+        return getattr(self, key) if key in self._field_names else default
+
+    def __contains__(self, key):
+        return key in self._field_names
+
+    def to_dict(self):
+        """
+        Returns the record as a dict, e.g. for json.dumps.
+        """
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, SlottedRecord):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+# Values of fields up to this long (codes, states, dates, amounts...) are
+# interned in slotted records, as they repeat across many records.
+_INTERN_MAX_LENGTH = 12
+
+class RecordLayout:
+    """
+    Fixed-width layout of a record type, compiled once from the entity's list
+    of field definitions. Field offsets are precomputed, and rendering a
+    record is a single join over the padded field values, with one length
+    check per record rather than one per field.
+
+    Attributes
     ----------
-    Returns the IRS state code; None if the specified state is not
-    participating in the CF/SF program
+    self.sort_keys : list of str
+        Field names, in the order they appear in the record.
+    self.transforms : dict of tuple
+        Field metadata keyed by field name, in the format
+        (default value, length, fill character, transformation function)
+    self.offsets : dict of tuple
+        (offset, length) of each field within the record, keyed by field name.
+    self.length : int
+        Length of a rendered record.
+
+    Methods
+    ----------
+    dict xform(data):
+        Applies the layout's transformation functions to data.
+    SlottedRecord xform_record(data):
+        Like xform, but returns a compact instance of self.record_class.
+    str fire(data):
+        Renders data as a fixed-width record.
+    str fire_record(record):
+        Renders a SlottedRecord as a fixed-width record.
+    str fire_all(records):
+        Renders and concatenates a list of records.
     """
-    state_codes = dict(
-        AL=1, AZ=4, AR=5, CA=6, CO=7, CT=8,
-        DE=10, GA=13, HI=15, ID=16, IN=18, KS=20, LA=22,
-        ME=23, MD=24, MA=25, MI=26, MN=27, MS=28, MO=29, MT=30,
-        NE=31, NJ=34, NM=35, NC=37, ND=38,
-        OH=39, OK=40, SC=45, WI=55
-    )
-
-    if state_abbrev in state_codes:
-        return state_codes[state_abbrev]
-    else:
-        return None
+    def __init__(self, items, expected_length=750):
+        self.sort_keys, self.transforms = factor_transforms(items)
+        self.offsets = {}
+        self._lengths = []
+        self._fill_chars = []
+        offset = 0
+        for key in self.sort_keys:
+            _, length, fill_char, _ = self.transforms[key]
+            self.offsets[key] = (offset, length)
+            self._lengths.append(length)
+            self._fill_chars.append(fill_char)
+            offset += length
+        if offset != expected_length:
+            raise Exception(f"Record layout has invalid length: {offset} \
+                    -- Expected: {expected_length}")
+        self.length = offset
+        self._getter = itemgetter(*self.sort_keys)
+        self._fields = [(key, default, transform) for key, (default, _, _, transform)
+                        in self.transforms.items()]
+        self._record_class = None
+        self._setters = None
+
+    @property
+    def record_class(self):
+        """
+        SlottedRecord subclass with one slot per field of the layout. It is
+        generated on first use.
+        """
+        if self._record_class is None:
+            self._record_class = type("Record", (SlottedRecord,), dict(
+                __slots__=tuple(self.sort_keys),
+                _field_names=frozenset(self.sort_keys),
+                _getter=attrgetter(*self.sort_keys)))
+            self._setters = [
+                (key, getattr(self._record_class, key).__set__, default,
+                 transform, self.transforms[key][1] <= _INTERN_MAX_LENGTH)
+                for key, default, transform in self._fields]
+        return self._record_class
+
+    def xform_record(self, data):
+        """
+        Equivalent to xform(data), but returns an instance of
+        self.record_class. Short transformed values are interned, so that
+        records share equal codes, states and amounts rather than holding
+        copies of them.
+        """
+        record_class = self.record_class
+        record = object.__new__(record_class)
+        for key, setter, default, transform, intern in self._setters:
+            if key in data:
+                value = transform(data[key])
+                setter(record, sys.intern(value) if intern else value)
+            else:
+                setter(record, default)
+        return record
+
+    def xform(self, data):
+        """
+        Equivalent to xform_entity(self.transforms, data).
+        """
+        return {key: transform(data[key]) if key in data else default
+                for key, default, transform in self._fields}
+
+    def fire(self, data):
+        """
+        Equivalent to fire_entity(self.transforms, self.sort_keys, data,
+        self.length).
+        """
+        record_string = "".join(map(str.ljust, self._getter(data),
+                                    self._lengths, self._fill_chars))
+        if len(record_string) != self.length:
+            # Every field is padded to at least its length, so a wrong total
+            # means some value is too long; let fire_entity report which.
+            fire_entity(self.transforms, self.sort_keys, data, self.length)
+        return record_string
+
+    def fire_record(self, record):
+        """
+        Equivalent to fire(record) for an instance of self.record_class, but
+        reads the fields through the record's slots directly.
+        """
+        # pylint: disable=protected-access
+        record_string = "".join(map(str.ljust, type(record)._getter(record),
+                                    self._lengths, self._fill_chars))
+        if len(record_string) != self.length:
+            fire_entity(self.transforms, self.sort_keys, record, self.length)
+        return record_string
+
+    def fire_all(self, records):
+        """
+        Renders each record of a list (of dicts, or of SlottedRecords) and
+        returns the concatenated string.
+        """
+        if records and isinstance(records[0], SlottedRecord):
+            return "".join([self.fire_record(record) for record in records])
+        return "".join([self.fire(record) for record in records])
 
 """
 Transformations on user-supplied data
@@ -163,29 +411,11 @@ Many attributes in each record / entity type share similar
 formatting requirements according to IRS Pub 1220. For example, most text
 fields are required to contain uppercase characters.
 
-The functions below facilitate transformations that are similar across
-different fields and entities.
+The transform kernels imported from the kernels module (and re-exported
+here) facilitate transformations that are similar across different fields
+and entities.
 """
 
-
-def digits_only(value):
-    """
-    Removes all non-digit characters
-    """
-    return re.sub("[^0-9]*", "", value)
-
-def uppercase(value):
-    """
-    Returns the string with all alpha characters in uppercase
-    """
-    return value.upper()
-
-def rjust_zero(value, length):
-    """
-    right-justifies *value* and pads with zeros to *length*
-    """
-    return f"{digits_only(value):0>{length}}"
-
 def factor_transforms(transforms):
     """
     Factor a list of transform tuples into a list of sort keys and a dict of
@@ -0,0 +1,417 @@
+"""
+Module: Validation
+Validation of user data against the base schema. Validators are built once
+per schema file and cached, so repeated validations skip reading and parsing
+the schema, checking the schema itself and compiling its regex patterns.
+
+jsonschema is imported when the first validator is built rather than when
+this module is imported, so that commands which never validate (such as
+`fire-1099 --help`) do not pay for it.
+"""
+import os
+import os.path
+import json
+import re
+from collections import namedtuple
+
+SCHEMA_PATH = os.path.join(os.path.split(os.path.realpath(__file__))[0],
+                           '../schema', 'base_schema.json')
+
+# Cached validators, keyed by real schema path. Values are tuples of
+# (schema file modification time, validator).
+_VALIDATORS = {}
+
+# Cached incremental validators, in the same format as _VALIDATORS.
+_INCREMENTAL_VALIDATORS = {}
+
+# Compiled regular expressions, keyed by pattern string.
+_PATTERNS = {}
+
+# Number of payees per task when collecting errors in worker processes
+COLLECT_CHUNK_SIZE = 5000
+
+FieldError = namedtuple("FieldError", ["path", "message", "validator"])
+FieldError.__doc__ = """
+A validation error found by collect_errors.
+
+Attributes
+----------
+path : tuple
+    Path from the document's root to the invalid value, e.g.
+    ("payers", 0, "payees", 12, "payees_tin"); see format_path.
+message : str
+    Error message, as in jsonschema's ValidationError.
+validator : str
+    Schema keyword that failed, e.g. "pattern" or "required".
+"""
+
+def get_validator(schema_path=SCHEMA_PATH):
+    """
+    Returns a validator for the schema at schema_path. The validator is built
+    on first use and cached until the schema file is modified.
+
+    Parameters
+    ----------
+    schema_path : str
+        optional system path for file containing the schema
+
+    Returns
+    ----------
+    jsonschema validator
+        Validator whose validate() and iter_errors() methods check data
+        against the schema
+    """
+    path = os.path.realpath(schema_path)
+    mtime = os.stat(path).st_mtime_ns
+    cached = _VALIDATORS.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with open(path, mode='r', encoding='utf-8') as schema_file:
+        schema = json.load(schema_file)
+    validator = build_validator(schema)
+    _VALIDATORS[path] = (mtime, validator)
+    return validator
+
+def get_incremental_validator(schema_path=SCHEMA_PATH):
+    """
+    Returns an IncrementalValidator for the schema at schema_path. Like
+    get_validator, the result is cached until the schema file is modified.
+
+    Parameters
+    ----------
+    schema_path : str
+        optional system path for file containing the schema
+
+    Returns
+    ----------
+    IncrementalValidator
+    """
+    path = os.path.realpath(schema_path)
+    mtime = os.stat(path).st_mtime_ns
+    cached = _INCREMENTAL_VALIDATORS.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with open(path, mode='r', encoding='utf-8') as schema_file:
+        schema = json.load(schema_file)
+    validator = IncrementalValidator(schema)
+    _INCREMENTAL_VALIDATORS[path] = (mtime, validator)
+    return validator
+
+def build_validator(schema):
+    """
+    Checks the given schema and returns a validator for it, with all of the
+    schema's regex patterns (tin, zip_code, phone, email, dollar_amount...)
+    compiled up front.
+
+    Parameters
+    ----------
+    schema : dict
+        JSON schema
+
+    Returns
+    ----------
+    jsonschema validator
+    """
+    # pylint: disable=import-outside-toplevel
+    from jsonschema import validators
+
+    cls = validators.validator_for(schema)
+    cls.check_schema(schema)
+    _compile_patterns(schema)
+    compiled_cls = validators.extend(cls, {"pattern": _pattern})
+    return compiled_cls(schema)
+
+def validate(data, schema_path=SCHEMA_PATH):
+    """
+    Validates data against the schema at schema_path using the cached
+    validator. Equivalent to jsonschema.validate(data, schema).
+
+    Raises
+    ----------
+    jsonschema.exceptions.ValidationError
+        If the data is invalid; the most relevant error is raised.
+    """
+    _raise_best_match(get_validator(schema_path), data, [])
+
+def validate_headers(data, schema_path=SCHEMA_PATH):
+    """
+    Validates the parts of a full user data document other than its payees:
+    the transmitter and each payer's header (including that its "payees" are
+    an array). Once this passes, the payers and their payee arrays can be
+    walked safely, e.g. to look the payees up in a cache.
+
+    Raises
+    ----------
+    jsonschema.exceptions.ValidationError
+        For the first invalid record found.
+    """
+    validator = get_incremental_validator(schema_path)
+    validator.validate_document(data)
+    for payer_index, current_payer in enumerate(data["payers"]):
+        validator.validate_payer(current_payer, payer_index)
+
+def validate_incremental(data, schema_path=SCHEMA_PATH, chunk_size=1000,
+                         known_valid=None):
+    """
+    Validates a full user data document piece by piece: the transmitter,
+    then each payer's header (including that its "payees" are an array),
+    then its payees in chunks of chunk_size. This
+    reports the same kinds of errors as validate(), with the full path to
+    the invalid value, but never validates the whole payee array at once.
+
+    Parameters
+    ----------
+    known_valid : list
+        optional list with one sequence per payer, parallel to its payees,
+        whose truthy items mark payees that are known to be valid against
+        this schema (such as the cached records returned by
+        cache.RenderCache.lookup). Those payees are not validated again.
+
+    Raises
+    ----------
+    jsonschema.exceptions.ValidationError
+        For the first invalid record found.
+    """
+    validator = get_incremental_validator(schema_path)
+    validator.validate_document(data)
+    for payer_index, current_payer in enumerate(data["payers"]):
+        validator.validate_payer(current_payer, payer_index)
+        if known_valid is None:
+            for _ in validator.validate_payees(current_payer["payees"],
+                                               payer_index, chunk_size):
+                pass
+            continue
+        for payee_index, (payee, valid) in enumerate(
+                zip(current_payer["payees"], known_valid[payer_index])):
+            if not valid:
+                validator.validate_payee(payee, payer_index, payee_index)
+
+def collect_errors(data, schema_path=SCHEMA_PATH, workers=None,
+                   chunk_size=COLLECT_CHUNK_SIZE):
+    """
+    Validates a full user data document and returns every error found,
+    rather than raising on the first one. The transmitter and payer headers
+    are validated in the current process, and payees in chunks of
+    chunk_size, in a process pool.
+
+    Parameters
+    ----------
+    data : dict
+        User data, as returned by extract_user_data
+    schema_path : str
+        optional system path for file containing the schema
+    workers : int
+        optional number of worker processes. Defaults to the number of CPUs;
+        with 1, payees are validated in the current process.
+    chunk_size : int
+        optional number of payees validated per task
+
+    Returns
+    ----------
+    list of FieldError
+        Every error, in document order; empty if data is valid
+    """
+    validator = get_incremental_validator(schema_path)
+    errors = _field_errors(validator.document, data, [])
+    payers = data.get("payers") if isinstance(data, dict) else None
+    if not isinstance(payers, list):
+        return errors
+
+    payer_errors = []
+    chunks = []
+    for payer_index, current_payer in enumerate(payers):
+        payer_errors.append(_field_errors(validator.payer, current_payer,
+                                          ["payers", payer_index]))
+        payees = current_payer.get("payees") \
+            if isinstance(current_payer, dict) else None
+        if isinstance(payees, list):
+            chunks += [(payer_index, start, payees[start:start + chunk_size])
+                       for start in range(0, len(payees), chunk_size)]
+
+    payer_indexes, starts, payee_chunks = zip(*chunks) if chunks else ((),)*3
+    schema_paths = [schema_path]*len(chunks)
+    if workers == 1 or len(chunks) <= 1:
+        chunk_errors = list(map(_payee_chunk_errors, schema_paths,
+                                payer_indexes, starts, payee_chunks))
+    else:
+        # Imported here as it pulls in multiprocessing, which single-process
+        # runs never need.
+        # pylint: disable=import-outside-toplevel
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunk_errors = list(executor.map(_payee_chunk_errors, schema_paths,
+                                             payer_indexes, starts,
+                                             payee_chunks))
+
+    # Each payer's header errors come before those of its payees
+    payee_errors = [[] for _ in payers]
+    for payer_index, errors_found in zip(payer_indexes, chunk_errors):
+        payee_errors[payer_index] += errors_found
+    for header_errors, errors_found in zip(payer_errors, payee_errors):
+        errors += header_errors + errors_found
+    return errors
+
+def format_path(path):
+    """
+    Returns a FieldError path as a JSONPath string, e.g.
+    "$.payers[0].payees[12].payees_tin".
+    """
+    return "$" + "".join(f"[{part}]" if isinstance(part, int) else f".{part}"
+                         for part in path)
+
+def _payee_chunk_errors(schema_path, payer_index, first_index, payees):
+    # Runs in worker processes, where the validator is built once and cached
+    validator = get_incremental_validator(schema_path).payee
+    errors = []
+    for payee_index, payee in enumerate(payees, first_index):
+        errors += _field_errors(validator, payee,
+                                ["payers", payer_index, "payees", payee_index])
+    return errors
+
+def _field_errors(validator, record, path):
+    return [FieldError(tuple(path) + tuple(error.absolute_path),
+                       error.message, error.validator)
+            for error in validator.iter_errors(record)]
+
+class IncrementalValidator:
+    """
+    Validates individual records against the relevant parts of a schema, so
+    that a document can be validated as it is read rather than all at once.
+
+    Attributes
+    ----------
+    self.document : jsonschema validator
+        Validator for the document, excluding the contents of "payers". It
+        also requires the transmitter record, without which no output can
+        be rendered.
+    self.transmitter : jsonschema validator
+        Validator for the transmitter record.
+    self.payer : jsonschema validator
+        Validator for a payer header: all payer fields, and that its
+        "payees" are an array, without validating the payees themselves.
+    self.payee : jsonschema validator
+        Validator for a single payee.
+
+    Methods
+    ----------
+    validate_document(data):
+        Validates the document's top level, including the transmitter.
+    validate_transmitter(record):
+        Validates the transmitter record.
+    validate_payer(record, payer_index):
+        Validates a payer header.
+    validate_payee(record, payer_index, payee_index):
+        Validates a single payee.
+    generator validate_payees(payees, payer_index, chunk_size):
+        Validates payees a chunk at a time, yielding each one once validated.
+    """
+    def __init__(self, schema):
+        properties = schema["properties"]
+        payer_schema = dict(properties["payers"]["items"])
+        payer_schema["properties"] = dict(payer_schema["properties"],
+                                          payees={"type": "array"})
+        document_schema = dict(schema, required=["transmitter"],
+                               properties=dict(properties,
+                                               payers={"type": "array"}))
+
+        self.document = build_validator(document_schema)
+        self.transmitter = build_validator(
+            _sub_schema(schema, properties["transmitter"]))
+        self.payer = build_validator(_sub_schema(schema, payer_schema))
+        self.payee = build_validator(
+            _sub_schema(schema, schema["definitions"]["payees"]["items"]))
+
+    def validate_document(self, data):
+        """
+        Validates the top level of the document: that it has a transmitter
+        record, the transmitter and end_of_transmission records, and that
+        "payers" is an array.
+        """
+        _raise_best_match(self.document, data, [])
+
+    def validate_transmitter(self, record):
+        """
+        Validates the transmitter record.
+        """
+        _raise_best_match(self.transmitter, record, ["transmitter"])
+
+    def validate_payer(self, record, payer_index):
+        """
+        Validates a payer header. Its "payees" must be present and an
+        array, but are not validated themselves.
+        """
+        _raise_best_match(self.payer, record, ["payers", payer_index])
+
+    def validate_payee(self, record, payer_index, payee_index):
+        """
+        Validates a single payee.
+        """
+        _raise_best_match(self.payee, record,
+                          ["payers", payer_index, "payees", payee_index])
+
+    def validate_payees(self, payees, payer_index, chunk_size=1000):
+        """
+        Validates payees from an iterable a chunk at a time, and yields each
+        payee once its chunk has been validated. Only one chunk is held in
+        memory, and the caller can render each chunk while the next one is
+        read.
+        """
+        chunk = []
+        payee_index = 0
+        for payee in payees:
+            chunk.append(payee)
+            if len(chunk) >= chunk_size:
+                yield from self._validate_chunk(chunk, payer_index, payee_index)
+                payee_index += len(chunk)
+                chunk = []
+        yield from self._validate_chunk(chunk, payer_index, payee_index)
+
+    def _validate_chunk(self, chunk, payer_index, first_index):
+        for i, payee in enumerate(chunk):
+            self.validate_payee(payee, payer_index, first_index + i)
+        return chunk
+
+def _sub_schema(schema, sub_schema):
+    # Sub-schemas keep the root's definitions (so that "$ref"s resolve) and
+    # its "$schema" (so that the same draft is used).
+    result = dict(sub_schema, definitions=schema["definitions"])
+    if "$schema" in schema:
+        result["$schema"] = schema["$schema"]
+    return result
+
+def _raise_best_match(validator, record, path):
+    # pylint: disable=import-outside-toplevel
+    from jsonschema.exceptions import best_match
+
+    error = best_match(validator.iter_errors(record))
+    if error is not None:
+        error.path.extendleft(reversed(path))
+        raise error
+
+def _compile_patterns(schema):
+    if isinstance(schema, dict):
+        for key, value in schema.items():
+            if key == "pattern" and isinstance(value, str):
+                _compiled(value)
+            else:
+                _compile_patterns(value)
+    elif isinstance(schema, list):
+        for value in schema:
+            _compile_patterns(value)
+
+def _compiled(pattern):
+    compiled = _PATTERNS.get(pattern)
+    if compiled is None:
+        compiled = _PATTERNS[pattern] = re.compile(pattern)
+    return compiled
+
+def _pattern(validator, pattern, instance, _schema):
+    # Same semantics as jsonschema's "pattern" keyword, but with the regex
+    # compiled once up front rather than looked up in re.search's cache.
+    if validator.is_type(instance, "string") and \
+            not _compiled(pattern).search(instance):
+        # pylint: disable=import-outside-toplevel
+        from jsonschema.exceptions import ValidationError
+        yield ValidationError(f"{instance!r} does not match {pattern!r}")
@@ -21,6 +21,7 @@ setup(
     packages=find_packages(exclude=['contrib', 'docs', 'tests*', 'spec*']),
     include_package_data=True,
     install_requires=['click', 'jsonschema'],
+    extras_require={'numpy': ['numpy']},
     scripts=['bin/fire-1099'],
 
     classifiers=[
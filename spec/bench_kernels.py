@@ -0,0 +1,139 @@
+"""
+Micro-benchmark of the field transform kernels: times each kernel in
+fire/translator/kernels.py against the implementation it replaced, on
+typical field values, and checks that both return the same results.
+
+Run from the repository root:
+
+    python spec/bench_kernels.py [--number N] [--min-speedup X]
+
+For each kernel and input, the best of several timing runs is reported in
+nanoseconds per call, with the speedup over the reference implementation.
+With --min-speedup, the script exits with status 1 if any kernel's speedup
+(over all its inputs) is below X.
+"""
+# pylint: disable=missing-docstring, invalid-name
+
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ROOT)
+
+# pylint: disable=wrong-import-position
+from fire.entities import payees
+from fire.translator import kernels
+from fire.translator.util import RecordLayout
+
+"""
+Reference implementations: the transforms as they were before the kernels
+module, kept here to compare against.
+"""
+def reference_digits_only(value):
+    return re.sub("[^0-9]*", "", value)
+
+def reference_uppercase(value):
+    return value.upper()
+
+def reference_rjust_zero(value, length):
+    return f"{reference_digits_only(value):0>{length}}"
+
+def reference_combined_fed_state_code(state_abbrev):
+    state_codes = dict(
+        AL=1, AZ=4, AR=5, CA=6, CO=7, CT=8,
+        DE=10, GA=13, HI=15, ID=16, IN=18, KS=20, LA=22,
+        ME=23, MD=24, MA=25, MI=26, MN=27, MS=28, MO=29, MT=30,
+        NE=31, NJ=34, NM=35, NC=37, ND=38,
+        OH=39, OK=40, SC=45, WI=55
+    )
+
+    if state_abbrev in state_codes:
+        return state_codes[state_abbrev]
+    else:
+        return None
+
+reference_amount = lambda x: reference_rjust_zero(x, 12)
+reference_identity = lambda x: x
+
+# (name, kernel, reference, inputs)
+CASES = [
+    ("identity", kernels.identity, reference_identity, ["", "ACCT-0001"]),
+    ("uppercase", kernels.uppercase, reference_uppercase,
+     ["", "Jane Q. Public", "SAN FRANCISCO"]),
+    ("digits_only", kernels.digits_only, reference_digits_only,
+     ["123456789", "12-3456789", "(415) 555-0100", "", "١٢٣"]),
+    ("zero_fill(12)", kernels.zero_fill(12), reference_amount,
+     ["1000", "12345.67", "1,234.00", "", "000000019900"]),
+    ("combined_fed_state_code", kernels.combined_fed_state_code,
+     reference_combined_fed_state_code, ["CA", "TX", "WI", ""]),
+]
+
+def best_time(function, value, number, repeat=5):
+    timer = timeit.Timer("function(value)",
+                         globals=dict(function=function, value=value))
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+def reference_layout(layout):
+    # The layout with each kernel replaced by its reference implementation
+    references = {kernels.identity: reference_identity,
+                  kernels.uppercase: reference_uppercase,
+                  kernels.digits_only: reference_digits_only}
+    items = []
+    for key in layout.sort_keys:
+        default, length, fill_char, transform = layout.transforms[key]
+        reference = references.get(transform)
+        if reference is None:  # zero_fill(length)
+            reference = lambda x, length=length: reference_rjust_zero(x, length)
+        items.append((key, (default, length, fill_char, reference)))
+    return RecordLayout(items, layout.length)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--number", type=int, default=100_000)
+    parser.add_argument("--min-speedup", type=float)
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'kernel':<26} {'input':<18} {'ns/call':>9} {'reference':>10} "
+          f"{'speedup':>8}")
+    for name, kernel, reference, inputs in CASES:
+        kernel_total = reference_total = 0
+        for value in inputs:
+            if kernel(value) != reference(value):
+                print(f"{name}: {kernel(value)!r} != {reference(value)!r} "
+                      f"for {value!r}")
+                sys.exit(2)
+            kernel_time = best_time(kernel, value, args.number)
+            reference_time = best_time(reference, value, args.number)
+            kernel_total += kernel_time
+            reference_total += reference_time
+            print(f"{name:<26} {value!r:<18} {kernel_time*1e9:9.1f} "
+                  f"{reference_time*1e9:10.1f} "
+                  f"{reference_time/kernel_time:7.2f}x")
+        if args.min_speedup is not None and \
+                reference_total/kernel_total < args.min_speedup:
+            failed = True
+
+    # A whole payee, as transformed by RecordLayout.xform
+    with open(os.path.join(ROOT, "spec", "data", "valid_minimal.json"),
+              mode='r', encoding='utf-8') as template_file:
+        payee = json.load(template_file)["payers"][0]["payees"][0]
+    layout = payees._PAYEE_LAYOUT  # pylint: disable=protected-access
+    reference = reference_layout(layout)
+    if layout.xform(payee) != reference.xform(payee):
+        print("payees.xform: results differ from the reference")
+        sys.exit(2)
+    kernel_time = best_time(layout.xform, payee, args.number // 10)
+    reference_time = best_time(reference.xform, payee, args.number // 10)
+    print(f"{'payees.xform':<26} {'1 payee':<18} {kernel_time*1e9:9.1f} "
+          f"{reference_time*1e9:10.1f} {reference_time/kernel_time:7.2f}x")
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
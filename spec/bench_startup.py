@@ -0,0 +1,84 @@
+"""
+Startup benchmark: import cost of the fire package, as reported by
+`python -X importtime`.
+
+Run from the repository root:
+
+    python spec/bench_startup.py [--runs N] [--max-ms MS]
+
+Each scenario is run in a fresh interpreter several times and the fastest
+run is reported, along with the heavy optional dependencies it imported.
+With --max-ms, the script exits with status 1 if any scenario's import time
+exceeds the limit.
+"""
+# pylint: disable=missing-docstring, invalid-name
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+SCENARIOS = [
+    ("import fire.translator", "import fire.translator"),
+    ("import translator", "from fire.translator import translator"),
+    ("fire-1099 --help",
+     "import sys; sys.argv = ['fire-1099', '--help']\n"
+     "from fire.translator import cli\n"
+     "try:\n    cli()\nexcept SystemExit:\n    pass"),
+]
+
+# Dependencies that should only be imported when they are actually needed
+HEAVY_MODULES = ["click", "jsonschema", "numpy", "concurrent.futures.process"]
+
+def import_times(statement):
+    """
+    Runs statement in a fresh interpreter with -X importtime and returns a
+    dict of {module name: (cumulative import time in microseconds, nesting
+    depth)}. Modules imported directly by statement have depth 0.
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, universal_newlines=True,
+                            check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            times[name.strip()] = (int(cumulative), depth)
+    return times
+
+def fire_import_time(times):
+    """
+    Returns the total import time of the fire modules imported directly by
+    the statement, including everything they import in turn.
+    """
+    return sum(time for name, (time, depth) in times.items()
+               if depth == 0 and name.split(".")[0] == "fire")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float)
+    args = parser.parse_args()
+
+    failed = False
+    for label, statement in SCENARIOS:
+        runs = [import_times(statement) for _ in range(args.runs)]
+        best = min(runs, key=fire_import_time)
+        milliseconds = fire_import_time(best) / 1000
+        heavy = [name for name in HEAVY_MODULES if name in best]
+        print(f"{label:<24} {milliseconds:8.1f} ms  "
+              f"imports: {', '.join(heavy) or '-'}")
+        if args.max_ms is not None and milliseconds > args.max_ms:
+            failed = True
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Throughput benchmark: times each stage of the translator on synthetic inputs
+and reports records per second.
+
+Run from the repository root:
+
+    python spec/bench_translator.py [--large] [--scenario NAME] [--repeat N]
+                                    [--save-baseline] [--tolerance T]
+
+Results are compared against spec/data/bench_baseline.json, and any stage
+slower than the baseline by more than the tolerance (default 25%) makes the
+script exit with status 1. --save-baseline rewrites the baseline file; it is
+kept in the repository so that performance changes show up in its diff.
+"""
+# pylint: disable=missing-docstring, invalid-name
+
+import argparse
+import json
+import os
+import os.path
+import platform
+import shutil
+import sys
+import tempfile
+from collections import namedtuple
+from copy import deepcopy
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ROOT)
+
+# pylint: disable=wrong-import-position
+from fire.translator import translator
+
+BASELINE_PATH = os.path.join(ROOT, "spec", "data", "bench_baseline.json")
+TEMPLATE_PATH = os.path.join(ROOT, "spec", "data", "valid_minimal.json")
+
+Scenario = namedtuple("Scenario", ["name", "payers", "payees", "combined_fed_state"])
+
+SCENARIOS = [
+    Scenario("1x10", 1, 10, False),
+    Scenario("1x10-cfsf", 1, 10, True),
+    Scenario("10x10k", 10, 10_000, False),
+    Scenario("10x10k-cfsf", 10, 10_000, True),
+    Scenario("1000x100k-cfsf", 1000, 100_000, True),
+]
+
+# Several GB of memory; only run with --large
+LARGE_SCENARIOS = [
+    Scenario("1x1m", 1, 1_000_000, False),
+    Scenario("1000x5m-cfsf", 1000, 5_000_000, True),
+]
+
+# Small scenarios are run until at least this many records have been
+# processed, as single runs of a few records are too short to time reliably.
+MIN_RECORDS = 20_000
+
+STAGES = ["extract_user_data", "validate_user_data", "load_full_schema",
+          "insert_generated_values", "get_fire_format", "write_1099_file"]
+
+# Mix of states participating in the CF/SF program and states (TX) that don't
+STATES = ["CA", "NY", "AZ", "OH", "TX", "WI", "NJ"]
+
+def make_user_data(payer_count, payee_count, combined_fed_state):
+    """
+    Returns synthetic user data with payee_count payees spread evenly over
+    payer_count payers, based on spec/data/valid_minimal.json.
+    """
+    with open(TEMPLATE_PATH, mode='r', encoding='utf-8') as template_file:
+        template = json.load(template_file)
+    payer_template = template["payers"][0]
+    payee_template = payer_template["payees"][0]
+
+    data = dict(transmitter=template["transmitter"], payers=[])
+    for payer_index in range(payer_count):
+        current_payer = {key: value for key, value in payer_template.items()
+                         if key != "payees"}
+        if combined_fed_state:
+            current_payer["combined_fed_state"] = "1"
+        current_payer["payees"] = []
+        count = payee_count // payer_count + \
+            (1 if payer_index < payee_count % payer_count else 0)
+        for payee_index in range(count):
+            payee = deepcopy(payee_template)
+            payee["payees_tin"] = f"{(payer_index*count + payee_index) % 10**9:0>9}"
+            payee["payee_state"] = STATES[payee_index % len(STATES)]
+            payee["payment_amount_7"] = f"{100 + payee_index % 100_000}.00"
+            if payee_index % 3 == 0:
+                payee["payment_amount_1"] = f"{payee_index % 5_000:.2f}"
+            current_payer["payees"].append(payee)
+        data["payers"].append(current_payer)
+    return data
+
+def run_stages(input_path, output_path):
+    """
+    Runs the translator stages in turn on the file at input_path and returns
+    a tuple of ({stage: seconds}, number of records written).
+    """
+    times = {}
+    start = perf_counter()
+    user_data = translator.extract_user_data(input_path)
+    times["extract_user_data"] = perf_counter() - start
+
+    start = perf_counter()
+    translator.validate_user_data(user_data)
+    times["validate_user_data"] = perf_counter() - start
+
+    start = perf_counter()
+    master = translator.load_full_schema(user_data)
+    times["load_full_schema"] = perf_counter() - start
+
+    start = perf_counter()
+    translator.insert_generated_values(master)
+    times["insert_generated_values"] = perf_counter() - start
+
+    start = perf_counter()
+    ascii_string = translator.get_fire_format(master)
+    times["get_fire_format"] = perf_counter() - start
+
+    start = perf_counter()
+    translator.write_1099_file(ascii_string, output_path)
+    times["write_1099_file"] = perf_counter() - start
+
+    return times, translator.count_records(master)
+
+def bench_scenario(scenario, repeat, temp_dir):
+    """
+    Returns {stage: records per second} for a scenario, using the fastest of
+    repeat runs (or of enough runs to process MIN_RECORDS records) for each
+    stage.
+    """
+    input_path = os.path.join(temp_dir, f"{scenario.name}.json")
+    output_path = os.path.join(temp_dir, f"{scenario.name}.ascii")
+    with open(input_path, mode='w', encoding='utf-8') as input_file:
+        json.dump(make_user_data(scenario.payers, scenario.payees,
+                                 scenario.combined_fed_state), input_file)
+
+    best = {}
+    run_count = 0
+    while True:
+        times, record_count = run_stages(input_path, output_path)
+        for stage, seconds in times.items():
+            best[stage] = min(best.get(stage, seconds), seconds)
+        run_count += 1
+        if run_count >= repeat and run_count*record_count >= MIN_RECORDS:
+            break
+    os.remove(input_path)
+    os.remove(output_path)
+    return {stage: _round(record_count / max(best[stage], 1e-9))
+            for stage in STAGES}
+
+def load_baseline():
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH, mode='r', encoding='utf-8') as baseline_file:
+        return json.load(baseline_file)["scenarios"]
+
+def save_baseline(results):
+    baseline = dict(python=platform.python_version(),
+                    machine=platform.machine(),
+                    unit="records per second",
+                    scenarios=dict(load_baseline(), **results))
+    with open(BASELINE_PATH, mode='w', encoding='utf-8') as baseline_file:
+        json.dump(baseline, baseline_file, indent=4, sort_keys=True)
+        baseline_file.write("\n")
+
+def _round(rate):
+    # Three significant figures, so that the baseline diff shows real changes
+    # rather than noise in the last digits.
+    return float(f"{rate:.3g}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--large", action="store_true",
+                        help="also run the multi-million payee scenarios")
+    parser.add_argument("--scenario", action="append",
+                        help="only run the named scenario(s)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    scenarios = SCENARIOS + (LARGE_SCENARIOS if args.large else [])
+    if args.scenario:
+        scenarios = [scenario for scenario in scenarios
+                     if scenario.name in args.scenario]
+    baseline = load_baseline()
+
+    results = {}
+    regressions = []
+    temp_dir = tempfile.mkdtemp()
+    try:
+        for scenario in scenarios:
+            results[scenario.name] = rates = bench_scenario(scenario,
+                                                            args.repeat, temp_dir)
+            print(scenario.name)
+            for stage in STAGES:
+                line = f"  {stage:<24} {rates[stage]:>14,.0f} records/s"
+                previous = baseline.get(scenario.name, {}).get(stage)
+                if previous:
+                    change = rates[stage]/previous - 1
+                    line += f"  {change:+7.1%} vs baseline"
+                    if change < -args.tolerance:
+                        regressions.append(f"{scenario.name} {stage}")
+                        line += "  REGRESSION"
+                print(line)
+    finally:
+        shutil.rmtree(temp_dir)
+
+    if args.save_baseline:
+        save_baseline(results)
+        print(f"Baseline written to {BASELINE_PATH}")
+    elif regressions:
+        print(f"{len(regressions)} stage(s) slower than baseline by more "
+              f"than {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
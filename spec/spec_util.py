@@ -4,7 +4,11 @@ Utility functions used in test specs.
 
 # pylint: disable=missing-docstring
 
+import itertools
 import json
+import os
+import shutil
+import tempfile
 
 from copy import deepcopy
 
@@ -13,8 +17,11 @@ import jsonschema
 from jsonschema import validate
 from nose.tools import raises
 
+from fire.translator import translator
+
 SCHEMA = json.load(open("./fire/schema/base_schema.json"))
 VALID_ALL_PATH = "./spec/data/valid_all.json"
+VALID_MINIMAL_PATH = "./spec/data/valid_minimal.json"
 INVALID_PHONE_NUMS = ["+1 555 666 7777", "555 A44 B777", "123ABC5678",
                       "123 45 67", "555 666 777788", "555 666 7777 #"]
 VALID_PHONE_NUMS = ["5556667777", "555-666-7777", "(555)666-7777",
@@ -172,3 +179,59 @@ def check_valid_amount(dict_obj, path, dollar_amount):
 def check_invalid_amount(dict_obj, path, dollar_amount):
     temp_obj = dive_to_path(dict_obj, path, dollar_amount)
     validate(temp_obj, SCHEMA)
+
+def in_temp_dir(test):
+    # Runs test(temp_dir) in a new temporary directory, removed afterwards
+    def wrapper():
+        temp_dir = tempfile.mkdtemp()
+        try:
+            test(temp_dir)
+        finally:
+            shutil.rmtree(temp_dir)
+    wrapper.__name__ = test.__name__
+    return wrapper
+
+def fire_format(user_data, cache=None):
+    data = translator.load_full_schema(deepcopy(user_data), cache=cache)
+    translator.insert_generated_values(data)
+    return translator.get_fire_format(data)
+
+def load_user_data(combined_fed_state=False):
+    with open(VALID_MINIMAL_PATH, mode='r', encoding='utf-8') as file:
+        user_data = json.load(file)
+    if combined_fed_state:
+        user_data["payers"][0]["combined_fed_state"] = "1"
+    return user_data
+
+def make_user_data(payee_counts, combined_fed_state=False, payee_states=None):
+    # One copy of the valid_minimal payer per entry of payee_counts, with that
+    # many payees. Payer TINs count up from 200000000 and payee TINs from
+    # 100000000, unique across payers. Each payer's payees cycle through
+    # payee_states, if given.
+    user_data = load_user_data(combined_fed_state)
+    payer_data = user_data["payers"][0]
+    payee = payer_data["payees"][0]
+    payee_tins = itertools.count(100000000)
+    user_data["payers"] = []
+    for number, count in enumerate(payee_counts):
+        payees = [dict(payee, payees_tin=f"{next(payee_tins)}")
+                  for _ in range(count)]
+        if payee_states:
+            for payee_data, state in zip(payees, itertools.cycle(payee_states)):
+                payee_data["payee_state"] = state
+        user_data["payers"].append(
+            dict(payer_data, payer_tin=f"{200000000 + number}", payees=payees))
+    return user_data
+
+def write_input(temp_dir, user_data, name="input.json"):
+    path = os.path.join(temp_dir, name)
+    with open(path, mode='w', encoding='utf-8') as file:
+        json.dump(user_data, file)
+    return path
+
+def write_fire_file(path, user_data):
+    # Translates user_data to path; returns the rendered master data
+    data = translator.load_full_schema(deepcopy(user_data))
+    translator.insert_generated_values(data)
+    translator.write_1099_file(translator.get_fire_format(data), path)
+    return data
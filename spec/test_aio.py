@@ -0,0 +1,80 @@
+# pylint: disable=missing-docstring, invalid-name
+
+import asyncio
+import gzip
+import os
+
+from jsonschema.exceptions import ValidationError
+from nose.tools import raises
+
+from spec_util import in_temp_dir, make_user_data, write_input
+from fire.translator import aio, translator
+from fire.translator.parallel import get_fire_format_parallel
+
+def make_filing(payer_count, payee_count):
+    # Combined federal/state payers, with payees in CA, TX and WI
+    return make_user_data([payee_count]*payer_count, combined_fed_state=True,
+                          payee_states=["CA", "TX", "WI"])
+
+async def collect(blocks):
+    return [block async for block in blocks]
+
+"""
+asyncio API: aio.run_async() and aio.iter_fire_blocks()
+"""
+def test_iter_fire_blocks_matches_get_fire_format():
+    user_data = make_filing(5, 4)
+    blocks = asyncio.run(collect(aio.iter_fire_blocks(user_data, prefetch=2)))
+    assert len(blocks) == 7
+    assert "".join(blocks) == get_fire_format_parallel(user_data, workers=1)
+
+@in_temp_dir
+def test_run_async_matches_run(temp_dir):
+    input_path = write_input(temp_dir, make_filing(3, 5))
+    output_path = os.path.join(temp_dir, "async.ascii")
+    summary = asyncio.run(aio.run_async(input_path, output_path))
+    assert summary == dict(output_path=output_path, record_count=29,
+                           payer_count=3, payee_count=15)
+
+    expected = translator.run(input_path, os.path.join(temp_dir, "sync.ascii"))
+    with open(output_path, mode='r', encoding='ascii') as output_file:
+        assert output_file.read() == expected["fire_data"]
+
+@in_temp_dir
+def test_run_async_compressed(temp_dir):
+    input_path = write_input(temp_dir, make_filing(2, 3))
+    output_path = os.path.join(temp_dir, "async.ascii.gz")
+    asyncio.run(aio.run_async(input_path, output_path, compression="gzip"))
+    with gzip.open(output_path, mode='rb') as output_file:
+        assert len(output_file.read()) == 16*750
+
+@in_temp_dir
+def test_run_async_yields_to_loop(temp_dir):
+    input_path = write_input(temp_dir, make_filing(50, 20))
+    output_path = os.path.join(temp_dir, "async.ascii")
+    ticks = []
+
+    async def main():
+        async def ticker():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0)
+        ticker_task = asyncio.create_task(ticker())
+        await aio.run_async(input_path, output_path)
+        ticker_task.cancel()
+
+    asyncio.run(main())
+    # The loop ran other tasks at least once per payer block written
+    assert len(ticks) > 50
+
+@raises(ValidationError)
+@in_temp_dir
+def test_run_async_invalid_input(temp_dir):
+    user_data = make_filing(1, 1)
+    user_data["payers"][0]["payees"][0]["payee_state"] = "California"
+    input_path = write_input(temp_dir, user_data)
+    output_path = os.path.join(temp_dir, "async.ascii")
+    try:
+        asyncio.run(aio.run_async(input_path, output_path))
+    finally:
+        assert not os.path.exists(output_path)
@@ -0,0 +1,87 @@
+# pylint: disable=missing-docstring, invalid-name
+
+import os
+
+from click.testing import CliRunner
+
+from spec_util import VALID_MINIMAL_PATH, in_temp_dir, load_user_data, \
+                      write_input
+from fire.translator import cli
+from fire.translator.batch import collect_inputs, run_batch
+
+def make_batch_dir(temp_dir):
+    write_input(temp_dir, load_user_data(), "a.json")
+    write_input(temp_dir, load_user_data(), "b.json")
+    with open(os.path.join(temp_dir, "broken.json"), mode='w') as broken:
+        broken.write("{")
+
+"""
+Input collection: batch.collect_inputs()
+"""
+@in_temp_dir
+def test_collect_inputs_directory_and_glob(temp_dir):
+    make_batch_dir(temp_dir)
+    from_dir = collect_inputs([temp_dir])
+    assert [os.path.basename(path) for path in from_dir] == \
+        ["a.json", "b.json", "broken.json"]
+    from_glob = collect_inputs([os.path.join(temp_dir, "[ab].json"),
+                                os.path.join(temp_dir, "a.json")])
+    assert [os.path.basename(path) for path in from_glob] == \
+        ["a.json", "b.json"]
+
+@in_temp_dir
+def test_collect_inputs_manifest(temp_dir):
+    make_batch_dir(temp_dir)
+    manifest_path = os.path.join(temp_dir, "manifest.txt")
+    with open(manifest_path, mode='w') as manifest:
+        manifest.write("# filings\nb.json\n\na.json\n")
+    assert [os.path.basename(path) for path
+            in collect_inputs([], manifest_path)] == ["b.json", "a.json"]
+
+"""
+Batch translation: batch.run_batch()
+"""
+@in_temp_dir
+def test_run_batch_records_failures(temp_dir):
+    make_batch_dir(temp_dir)
+    output_dir = os.path.join(temp_dir, "out")
+    result = run_batch(collect_inputs([temp_dir]), output_dir)
+    assert result["succeeded"] == 2
+    assert result["failed"] == 1
+    assert result["results"][2]["error"].startswith("JSONDecodeError")
+    assert os.path.getsize(os.path.join(output_dir, "a.ascii")) == 4500
+    assert not os.path.exists(os.path.join(output_dir, "broken.ascii"))
+
+@in_temp_dir
+def test_run_batch_fails_shared_output_paths(temp_dir):
+    make_batch_dir(temp_dir)
+    for name in ["x", "y"]:
+        os.mkdir(os.path.join(temp_dir, name))
+        write_input(os.path.join(temp_dir, name), load_user_data(), "a.json")
+    output_dir = os.path.join(temp_dir, "out")
+    result = run_batch([os.path.join(temp_dir, "x", "a.json"),
+                        os.path.join(temp_dir, "b.json"),
+                        os.path.join(temp_dir, "y", "a.json")], output_dir)
+    assert [item["error"] is None for item in result["results"]] == \
+        [False, True, False]
+    assert "also the output path of another input" in \
+        result["results"][0]["error"]
+    assert os.listdir(output_dir) == ["b.ascii"]
+
+"""
+Command line: fire-1099 [translate | batch]
+"""
+@in_temp_dir
+def test_cli_default_command(temp_dir):
+    output_path = os.path.join(temp_dir, "out.ascii")
+    result = CliRunner().invoke(cli, [VALID_MINIMAL_PATH,
+                                      "--output", output_path])
+    assert result.exit_code == 0, result.output
+    assert os.path.getsize(output_path) == 4500
+
+@in_temp_dir
+def test_cli_batch_exit_code(temp_dir):
+    make_batch_dir(temp_dir)
+    result = CliRunner().invoke(cli, ["batch", temp_dir, "--workers", "2"])
+    assert result.exit_code == 1
+    assert "2 succeeded, 1 failed" in result.output
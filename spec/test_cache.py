@@ -0,0 +1,110 @@
+# pylint: disable=missing-docstring, invalid-name
+
+import json
+import os
+
+from jsonschema.exceptions import ValidationError
+from nose.tools import raises
+
+from spec_util import in_temp_dir, fire_format, load_user_data
+from fire.translator import translator
+from fire.translator.cache import RenderCache, CachedPayee
+
+"""
+Render cache: cache.RenderCache
+"""
+@in_temp_dir
+def test_cache_reuses_rendered_payees(temp_dir):
+    user_data = load_user_data(combined_fed_state=True)
+    payee_count = len(user_data["payers"][0]["payees"])
+    expected = fire_format(user_data)
+
+    with RenderCache(os.path.join(temp_dir, "cache.db")) as cache:
+        assert fire_format(user_data, cache) == expected
+        assert (cache.hits, cache.misses) == (0, payee_count)
+    with RenderCache(os.path.join(temp_dir, "cache.db")) as cache:
+        assert fire_format(user_data, cache) == expected
+        assert (cache.hits, cache.misses) == (payee_count, 0)
+
+        # A changed payee is rendered again; the totals and the sequence
+        # numbers of the other payees follow the change.
+        user_data["payers"][0]["payees"][0]["payment_amount_1"] = "1234.56"
+        user_data["payers"][0]["payees"].reverse()
+        assert fire_format(user_data, cache) == fire_format(user_data)
+        assert (cache.hits, cache.misses) == (2*payee_count - 1, 1)
+
+@in_temp_dir
+def test_cache_key(temp_dir):
+    payee = load_user_data(combined_fed_state=True)["payers"][0]["payees"][0]
+    with RenderCache(os.path.join(temp_dir, "cache.db")) as cache:
+        key = cache.key(payee, "1")
+        assert cache.key(dict(reversed(list(payee.items()))), "1") == key
+        assert cache.key(payee, "") != key
+        assert cache.key(dict(payee, payee_city="ELSEWHERE"), "1") != key
+
+@in_temp_dir
+def test_cached_payee(temp_dir):
+    user_data = load_user_data(combined_fed_state=True)
+    with RenderCache(os.path.join(temp_dir, "cache.db")) as cache:
+        fire_format(user_data, cache)
+        data = translator.load_full_schema(user_data, cache=cache)
+    expected = translator.load_full_schema(user_data)
+    translator.insert_generated_values(expected)
+    payee = data["payers"][0]["payees"][0]
+    assert isinstance(payee, CachedPayee)
+    assert payee == expected["payers"][0]["payees"][0]
+    payee["record_sequence_number"] = "00000042"
+    assert payee["record_sequence_number"] == "00000042"
+    assert payee.fire()[499:507] == "00000042"
+    assert len(payee.fire()) == 750
+
+@in_temp_dir
+def test_translator_run_with_cache(temp_dir):
+    input_path = os.path.join(temp_dir, "input.json")
+    cache_path = os.path.join(temp_dir, "cache.db")
+    with open(input_path, mode='w', encoding='utf-8') as file:
+        json.dump(load_user_data(combined_fed_state=True), file)
+    first = translator.run(input_path, os.path.join(temp_dir, "1.ascii"),
+                           cache_path=cache_path)
+    second = translator.run(input_path, os.path.join(temp_dir, "2.ascii"),
+                            cache_path=cache_path)
+    assert first["fire_data"] == second["fire_data"]
+    assert first["json_data"] == second["json_data"]
+
+@raises(ValidationError)
+@in_temp_dir
+def test_translator_run_with_cache_validates_new_payees(temp_dir):
+    input_path = os.path.join(temp_dir, "input.json")
+    cache_path = os.path.join(temp_dir, "cache.db")
+    user_data = load_user_data(combined_fed_state=True)
+    with open(input_path, mode='w', encoding='utf-8') as file:
+        json.dump(user_data, file)
+    translator.run(input_path, os.path.join(temp_dir, "1.ascii"),
+                   cache_path=cache_path)
+
+    user_data["payers"][0]["payees"][0]["payees_tin"] = "not a tin"
+    with open(input_path, mode='w', encoding='utf-8') as file:
+        json.dump(user_data, file)
+    translator.run(input_path, os.path.join(temp_dir, "2.ascii"),
+                   cache_path=cache_path)
+
+@raises(ValidationError)
+@in_temp_dir
+def test_translator_run_with_cache_invalid_payers(temp_dir):
+    # Invalid input is reported as a validation error, not a failed lookup
+    input_path = os.path.join(temp_dir, "input.json")
+    with open(input_path, mode='w', encoding='utf-8') as file:
+        json.dump(dict(load_user_data(combined_fed_state=True), payers="not an array"), file)
+    translator.run(input_path, os.path.join(temp_dir, "out.ascii"),
+                   cache_path=os.path.join(temp_dir, "cache.db"))
+
+@raises(ValidationError)
+@in_temp_dir
+def test_translator_run_with_cache_payer_without_payees(temp_dir):
+    input_path = os.path.join(temp_dir, "input.json")
+    user_data = load_user_data(combined_fed_state=True)
+    del user_data["payers"][0]["payees"]
+    with open(input_path, mode='w', encoding='utf-8') as file:
+        json.dump(user_data, file)
+    translator.run(input_path, os.path.join(temp_dir, "out.ascii"),
+                   cache_path=os.path.join(temp_dir, "cache.db"))
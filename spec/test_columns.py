@@ -0,0 +1,106 @@
+# pylint: disable=missing-docstring, invalid-name, protected-access
+
+import json
+from copy import deepcopy
+
+from nose.tools import raises
+
+from spec_util import load_user_data
+from fire.entities import payees
+from fire.translator import columns, translator
+from fire.translator.columns import RecordColumns
+from fire.translator.totals import compute_totals
+
+VALID_MINIMAL_DATA = load_user_data()
+
+def user_payees():
+    result = []
+    for i, state in enumerate(["CA", "NY", "TX", "CA", "AZ"]):
+        payee = deepcopy(VALID_MINIMAL_DATA["payers"][0]["payees"][i % 2])
+        payee["payee_state"] = state
+        payee["payment_amount_1"] = str(i*100)
+        result.append(payee)
+    return result
+
+def without_numpy(function):
+    import_numpy = columns._import_numpy
+    columns._import_numpy = lambda: None
+    try:
+        return function()
+    finally:
+        columns._import_numpy = import_numpy
+
+"""
+Columnar payees: payees.xform(data, "columnar")
+"""
+def test_columns_round_trip():
+    stored = payees.xform(user_payees(), "columnar")
+    assert isinstance(stored, RecordColumns)
+    assert len(stored) == 5
+    assert stored.to_list() == payees.xform(user_payees())
+
+def test_columns_store_varying_fields_only():
+    stored = payees.xform(user_payees(), "columnar")
+    assert stored.constant("blank_7") == ""
+    assert stored.constant("payment_amount_2") == 0
+    assert stored.integers("payment_amount_1").tolist() == [0, 100, 200, 300, 400]
+    assert stored.sum("payment_amount_1") == 1000
+
+def test_columns_fire_matches_dicts():
+    expected = payees.fire(payees.xform(user_payees()))
+    stored = payees.xform(user_payees(), "columnar")
+    assert payees.fire(stored) == expected
+    assert without_numpy(stored.fire) == expected
+
+def test_columns_fire_record_range():
+    stored = payees.xform(user_payees(), "columnar")
+    stored.set_range("record_sequence_number", 3)
+    expected = stored.fire()
+    assert stored.fire(1, 4) == expected[750:4*750]
+    assert without_numpy(lambda: stored.fire(1, 4)) == expected[750:4*750]
+    assert [len(chunk) for chunk in payees.iter_fire(stored, 2)] == \
+        [2*750, 2*750, 750]
+    assert "".join(payees.iter_fire(stored, 2)) == expected
+    assert "".join(payees.iter_fire(stored.to_list(), 2)) == expected
+
+def test_columns_range():
+    stored = payees.xform(user_payees(), "columnar")
+    stored.set_range("record_sequence_number", 3)
+    assert stored.values("record_sequence_number") == \
+        ["00000003", "00000004", "00000005", "00000006", "00000007"]
+    assert payees.fire(stored)[4*750 + 499:4*750 + 507] == "00000007"
+
+def test_columns_totals_match_dicts():
+    transformed = payees.xform(user_payees())
+    expected = compute_totals(transformed, "1", "python")
+    stored = payees.xform(user_payees(), "columnar")
+    totals = compute_totals(stored, "1")
+    assert totals.totals == expected.totals
+    assert totals.states == expected.states
+    assert list(totals.states) == list(expected.states)
+    assert stored.values("combined_federal_state_code") == \
+        [payee["combined_federal_state_code"] for payee in transformed]
+    assert stored.values("combined_federal_state_code")[2] == ""
+
+def test_translator_columnar_storage():
+    user_data = deepcopy(VALID_MINIMAL_DATA)
+    user_data["payers"][0]["combined_fed_state"] = "1"
+    master = translator.load_full_schema(user_data)
+    translator.insert_generated_values(master)
+    stored = translator.load_full_schema(user_data, "columnar")
+    translator.insert_generated_values(stored)
+    assert translator.get_fire_format(stored) == \
+        translator.get_fire_format(master)
+    assert translator.dump_master(stored) == json.dumps(master, indent=4)
+
+@raises(Exception)
+def test_columns_value_too_long():
+    data = user_payees()
+    data[2]["payee_city"] = 41*"A"
+    payees.xform(data, "columnar")
+
+@raises(Exception)
+def test_columns_require_ascii():
+    data = user_payees()
+    data[0]["payee_city"] = "MÜNCHEN"
+    payees.xform(data, "columnar")
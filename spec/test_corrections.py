@@ -0,0 +1,147 @@
+# pylint: disable=missing-docstring, invalid-name
+
+import copy
+import json
+import os
+
+from click.testing import CliRunner
+
+from spec_util import in_temp_dir, make_user_data
+from fire.translator import corrections, translator
+from fire.translator.cli import cli
+from fire.translator.reader import FireReader
+
+def make_revised(original):
+    revised = copy.deepcopy(original)
+    payees = revised["payers"][0]["payees"]
+    payees[0]["payee_city"] = "ELSEWHERE"
+    payees[1]["payment_amount_7"] = "99.00"
+    del payees[2]
+    payees.append(dict(payees[0], payees_tin="999999999"))
+    return revised
+
+def write_original_and_revised(temp_dir, original, revised=None):
+    # Writes the original and revised user data (by default, make_revised's
+    # revision of original) to JSON files; returns their paths by name
+    paths = {}
+    for name, user_data in [("original", original),
+                            ("revised", revised or make_revised(original))]:
+        paths[name] = os.path.join(temp_dir, f"{name}.json")
+        with open(paths[name], mode='w', encoding='utf-8') as file:
+            json.dump(user_data, file)
+    return paths
+
+"""
+Corrections: corrections.build_corrections() and run_corrections()
+"""
+def test_build_corrections():
+    original = make_user_data([4])
+    master, additions, summary = corrections.build_corrections(
+        original, make_revised(original))
+    assert summary == dict(changed=2, replaced=0, removed=1, added=1)
+
+    payees = master["payers"][0]["payees"]
+    assert [payee["payees_tin"] for payee in payees] == \
+        ["100000000", "100000001", "100000002"]
+    assert {payee["corrected_return_indicator"] for payee in payees} == {"G"}
+    assert payees[0]["payee_city"] == "ELSEWHERE"
+    assert payees[1]["payment_amount_7"] == "000000009900"
+    assert {payees[2][f"payment_amount_{code}"] for code in "123456789ABCDEFG"} \
+        == {"000000000000"}
+
+    assert [payee["payees_tin"] for payee in additions["payers"][0]["payees"]] \
+        == ["999999999"]
+    translator.validate_user_data(additions)
+
+def test_build_corrections_unchanged():
+    original = make_user_data([4])
+    master, additions, summary = corrections.build_corrections(
+        original, copy.deepcopy(original))
+    assert summary == dict(changed=0, replaced=0, removed=0, added=0)
+    assert master["payers"] == []
+    assert additions["payers"] == []
+
+def test_build_corrections_two_transactions():
+    original = make_user_data([4])
+    for i, payee in enumerate(original["payers"][0]["payees"]):
+        payee["payers_account_number_for_payee"] = f"ACCT-{i}"
+        payee["payment_amount_1"] = "1.00"
+    revised = copy.deepcopy(original)
+    payees = revised["payers"][0]["payees"]
+    payees[0]["payees_tin"] = "999999999"
+    payees[1]["payers_account_number_for_payee"] = "ACCT-NEW"
+    payees.append(dict(payees[2], payees_tin="888888888",
+                       payers_account_number_for_payee="ACCT-9"))
+    master, additions, summary = corrections.build_corrections(original, revised)
+    assert summary == dict(changed=0, replaced=2, removed=0, added=1)
+
+    # Zeroed filed returns and their replacements, under separate A records
+    assert len(master["payers"]) == 2
+    filed, replaced = [current_payer["payees"]
+                       for current_payer in master["payers"]]
+    assert [(payee["payees_tin"], payee["corrected_return_indicator"])
+            for payee in filed] == [("100000000", "G"), ("100000001", "G")]
+    assert {payee["payment_amount_1"] for payee in filed} == {"000000000000"}
+    # The zeroed returns keep the amount codes they were filed with
+    assert master["payers"][0]["amount_codes"] == "17"
+    assert [(payee["payees_tin"], payee["payers_account_number_for_payee"],
+             payee["corrected_return_indicator"]) for payee in replaced] == \
+        [("999999999", "ACCT-0", "C"), ("100000001", "ACCT-NEW", "C")]
+    assert [payee["payees_tin"] for payee in additions["payers"][0]["payees"]] \
+        == ["888888888"]
+
+@in_temp_dir
+def test_run_corrections(temp_dir):
+    paths = write_original_and_revised(temp_dir, make_user_data([4]))
+    output_path = os.path.join(temp_dir, "corrections.ascii")
+    originals_path = os.path.join(temp_dir, "originals.ascii")
+
+    summary = corrections.run_corrections(paths["original"], paths["revised"],
+                                          output_path, originals_path)
+    assert summary["output_path"] == output_path
+    assert summary["originals_path"] == originals_path
+    with FireReader(output_path) as reader:
+        assert reader.record_types == "TABBBCF"
+        assert [record["corrected_return_indicator"]
+                for record in reader.records("B")] == ["G"]*3
+        end_of_payer = next(reader.records("C"))
+        assert end_of_payer["number_of_payees"] == "00000003"
+        assert end_of_payer["payment_amount_7"] == "000000000000019900"
+        assert end_of_payer["record_sequence_number"] == "00000006"
+    with FireReader(originals_path) as reader:
+        assert reader.record_types == "TABCF"
+        assert next(reader.records("B"))["corrected_return_indicator"] == ""
+
+@in_temp_dir
+def test_run_corrections_removed_only(temp_dir):
+    original = make_user_data([4])
+    revised = copy.deepcopy(original)
+    del revised["payers"][0]["payees"][2]
+    paths = write_original_and_revised(temp_dir, original, revised)
+    output_path = os.path.join(temp_dir, "corrections.ascii")
+
+    summary = corrections.run_corrections(paths["original"], paths["revised"],
+                                          output_path)
+    assert summary["removed"] == 1
+    with FireReader(output_path) as reader:
+        assert reader.record_types == "TABCF"
+        assert next(reader.records("A"))["amount_codes"] == "7"
+        assert next(reader.records("B"))["payment_amount_7"] == "000000000000"
+        assert next(reader.records("C"))["payment_amount_7"] == \
+            "000000000000000000"
+
+@in_temp_dir
+def test_corrections_command(temp_dir):
+    paths = write_original_and_revised(temp_dir, make_user_data([4]))
+    output_path = os.path.join(temp_dir, "corrections.ascii")
+    result = CliRunner().invoke(cli, [
+        "corrections", paths["original"], paths["revised"],
+        "--output", output_path])
+    assert result.exit_code == 0
+    assert result.stdout.startswith("2 changed, 0 replaced, 1 removed, 1 added")
+    assert os.path.isfile(output_path)
+    # Payees only in the revised input are never left unfiled
+    originals_path = os.path.join(temp_dir, "corrections.originals.ascii")
+    assert f"Original returns written to {originals_path}" in result.stdout
+    with FireReader(originals_path) as reader:
+        assert reader.record_types == "TABCF"
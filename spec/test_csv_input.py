@@ -0,0 +1,122 @@
+# pylint: disable=missing-docstring, invalid-name
+
+import csv
+import io
+import json
+import os
+
+from nose.tools import raises
+
+from click.testing import CliRunner
+
+from spec_util import in_temp_dir, fire_format, load_user_data
+from fire.translator.cli import cli
+from fire.translator.csv_input import run_csv, iter_csv_events, read_payee_rows
+
+def write_inputs(temp_dir, user_data, column_names=None, payer_column=None):
+    # Writes the payees of user_data as CSV, and the rest as the side file
+    fields = sorted({key for payer_data in user_data["payers"]
+                     for payee in payer_data["payees"] for key in payee})
+    column_names = column_names or {}
+    header = [column_names.get(field, field) for field in fields]
+    if payer_column:
+        header.append(payer_column)
+    payees_path = os.path.join(temp_dir, "payees.csv")
+    with open(payees_path, mode='w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        for payer_data in user_data["payers"]:
+            for payee in payer_data["payees"]:
+                row = [payee.get(field, "") for field in fields]
+                if payer_column:
+                    row.append(payer_data["payer_tin"])
+                writer.writerow(row)
+    payers_path = os.path.join(temp_dir, "payers.json")
+    with open(payers_path, mode='w', encoding='utf-8') as file:
+        json.dump(dict(user_data, payers=[
+            {k: v for k, v in payer_data.items() if k != "payees"}
+            for payer_data in user_data["payers"]]), file)
+    return payees_path, payers_path
+
+def expected_output(user_data):
+    return fire_format(user_data).encode("ascii")
+
+"""
+CSV input: csv_input.run_csv() and `fire-1099 csv`
+"""
+@in_temp_dir
+def test_run_csv_single_payer(temp_dir):
+    user_data = load_user_data()
+    payees_path, payers_path = write_inputs(temp_dir, user_data)
+    output_path = os.path.join(temp_dir, "out.ascii")
+    summary = run_csv(payees_path, payers_path, output_path)
+    assert summary["payee_count"] == 2
+    with open(output_path, mode='rb') as output_file:
+        assert output_file.read() == expected_output(user_data)
+
+@in_temp_dir
+def test_run_csv_column_map_and_payer_column(temp_dir):
+    user_data = load_user_data()
+    second = json.loads(json.dumps(user_data["payers"][0]))
+    second["payer_tin"] = "987654321"
+    second["combined_fed_state"] = "1"
+    user_data["payers"].append(second)
+    column_names = {"payees_tin": "Tax ID", "payee_city": "City"}
+    payees_path, payers_path = write_inputs(temp_dir, user_data, column_names,
+                                            "Payer TIN")
+    # Columns that are not mapped (payee_name, phone) are ignored
+    with open(payees_path, mode='r', encoding='utf-8', newline='') as file:
+        header = next(csv.reader(file))
+    column_map = {name: name for name in header
+                  if name not in ["Payer TIN", "payee_name", "phone"]}
+    column_map.update({"Tax ID": "payees_tin", "City": "payee_city"})
+
+    output_path = os.path.join(temp_dir, "out.ascii")
+    run_csv(payees_path, payers_path, output_path, column_map, "Payer TIN")
+    with open(output_path, mode='rb') as output_file:
+        assert output_file.read() == expected_output(user_data)
+
+@in_temp_dir
+def test_run_csv_payer_without_rows(temp_dir):
+    # A payer with no CSV rows still gets its A and C records, after the
+    # payers that have rows, as it would from a JSON input file
+    user_data = load_user_data()
+    first = user_data["payers"][0]
+    empty = dict(first, payer_tin="111111111", payees=[])
+    last = dict(first, payer_tin="987654321")
+    user_data["payers"] = [first, empty, last]
+    payees_path, payers_path = write_inputs(temp_dir, user_data,
+                                            payer_column="Payer TIN")
+    output_path = os.path.join(temp_dir, "out.ascii")
+    summary = run_csv(payees_path, payers_path, output_path,
+                      payer_column="Payer TIN")
+    assert summary["payer_count"] == 3
+    with open(output_path, mode='rb') as output_file:
+        assert output_file.read() == expected_output(
+            dict(user_data, payers=[first, last, empty]))
+
+def test_read_payee_rows_skips_empty_cells():
+    file = io.StringIO("payees_tin,payee_city,Notes\n123456789,,x\n\n")
+    assert list(read_payee_rows(file)) == [(None, {"payees_tin": "123456789"})]
+
+@raises(Exception)
+def test_iter_csv_events_rows_not_grouped():
+    user_data = load_user_data()
+    user_data["payers"].append(dict(user_data["payers"][0], payer_tin="1"))
+    file = io.StringIO("payees_tin,payer\n1,123456789\n2,1\n3,123456789\n")
+    list(iter_csv_events(user_data, file, payer_column="payer"))
+
+@raises(Exception)
+def test_read_payee_rows_unknown_field():
+    list(read_payee_rows(io.StringIO("a\n1\n"), {"a": "no_such_field"}))
+
+@in_temp_dir
+def test_csv_command(temp_dir):
+    user_data = load_user_data()
+    payees_path, payers_path = write_inputs(temp_dir, user_data)
+    output_path = os.path.join(temp_dir, "out.ascii")
+    result = CliRunner().invoke(cli, ["csv", payees_path, "--payers", payers_path,
+                                      "--output", output_path])
+    assert result.exit_code == 0
+    with open(output_path, mode='rb') as output_file:
+        assert output_file.read() == expected_output(user_data)
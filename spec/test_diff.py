@@ -0,0 +1,69 @@
+# pylint: disable=missing-docstring, invalid-name
+
+import os
+
+from click.testing import CliRunner
+
+from spec_util import in_temp_dir, make_user_data, write_fire_file
+from fire.translator import diff
+from fire.translator.cli import cli
+
+def write_old_and_new(temp_dir, payee_count):
+    old_path = os.path.join(temp_dir, "old.ascii")
+    new_path = os.path.join(temp_dir, "new.ascii")
+    user_data = make_user_data([payee_count])
+    write_fire_file(old_path, user_data)
+
+    payees = user_data["payers"][0]["payees"]
+    payees[1]["payee_city"] = "ELSEWHERE"
+    del payees[2]
+    payees.insert(0, dict(payees[0], payees_tin="999999999"))
+    write_fire_file(new_path, user_data)
+    return old_path, new_path
+
+"""
+Diff: diff.diff_files() and `fire-1099 diff`
+"""
+@in_temp_dir
+def test_diff_files(temp_dir):
+    old_path, new_path = write_old_and_new(temp_dir, 5)
+    result = {item.status: item for item in diff.diff_files(old_path, new_path)}
+    assert sorted(result) == ["added", "changed", "removed"]
+
+    assert result["added"].key == ("200000000", "999999999", "")
+    assert result["added"].old_index is None
+    assert result["removed"].key[1] == "100000002"
+    assert result["removed"].new_index is None
+    changed = result["changed"]
+    assert changed.key[1] == "100000001"
+    assert (changed.old_index, changed.new_index) == (3, 4)
+    assert changed.changes == [("payee_city", "MOON", "ELSEWHERE")]
+
+@in_temp_dir
+def test_diff_identical_files(temp_dir):
+    path = os.path.join(temp_dir, "old.ascii")
+    write_fire_file(path, make_user_data([3]))
+    assert list(diff.diff_files(path, path)) == []
+    assert [item.changes for item in diff.diff_files(
+        path, path, ignored_fields=())] == []
+
+@in_temp_dir
+def test_diff_partitions(temp_dir):
+    old_path, new_path = write_old_and_new(temp_dir, 200)
+    expected = sorted(diff.diff_files(old_path, new_path))
+    partition_size, flush_size = diff.PARTITION_SIZE, diff._FLUSH_SIZE
+    diff.PARTITION_SIZE, diff._FLUSH_SIZE = 16, 100
+    try:
+        assert sorted(diff.diff_files(old_path, new_path)) == expected
+    finally:
+        diff.PARTITION_SIZE, diff._FLUSH_SIZE = partition_size, flush_size
+    assert len(expected) == 3
+
+@in_temp_dir
+def test_diff_command(temp_dir):
+    old_path, new_path = write_old_and_new(temp_dir, 5)
+    result = CliRunner().invoke(cli, ["diff", old_path, new_path])
+    assert result.exit_code == 1
+    assert "payee_city: 'MOON' -> 'ELSEWHERE'" in result.output
+    assert result.output.endswith("1 added, 1 removed, 1 changed\n")
+    assert CliRunner().invoke(cli, ["diff", old_path, old_path]).exit_code == 0
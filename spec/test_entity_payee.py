@@ -135,3 +135,61 @@ def test_payee_fire_blanks_layout():
     test_string = payees.fire(transformed)
     for (offset_1_indexed, inclusive_bound) in PAYEE_BLANK_MAP:
         yield check_blanks, test_string[(offset_1_indexed -1):inclusive_bound]
+
+"""
+Precompiled record layouts: payees._PAYEE_LAYOUT
+"""
+def test_payee_layout_matches_fire_entity():
+    # pylint: disable=protected-access
+    from fire.translator.util import fire_entity
+    transformed = payees.xform(deepcopy(VALID_PAYEE))
+    for payee in transformed:
+        assert payees._PAYEE_LAYOUT.fire(payee) == fire_entity(
+            payees._PAYEE_TRANSFORMS, payees._PAYEE_SORT, payee)
+
+def test_payee_layout_offsets():
+    # pylint: disable=protected-access
+    assert payees._PAYEE_LAYOUT.offsets["payee_mailing_address"] == (367, 40)
+    assert payees._PAYEE_LAYOUT.offsets["record_sequence_number"] == (499, 8)
+
+@raises(Exception)
+def test_payee_layout_value_too_long():
+    transformed = payees.xform(deepcopy(VALID_PAYEE))
+    transformed[0]["payee_city"] = 41*"A"
+    payees.fire(transformed)
+
+"""
+Slotted payee records: payees.xform(data, "slots")
+"""
+def test_payee_slots_match_dicts():
+    transformed = payees.xform(deepcopy(VALID_PAYEE))
+    records = payees.xform(deepcopy(VALID_PAYEE), "slots")
+    assert records == transformed
+    assert payees.fire(records) == payees.fire(transformed)
+
+def test_payee_slots_item_access():
+    record = payees.xform(deepcopy(VALID_PAYEE), "slots")[0]
+    record["record_sequence_number"] = "00000002"
+    assert record["record_sequence_number"] == "00000002"
+    assert record.get("not_a_field") is None
+    assert "payee_state" in record
+    assert not hasattr(record, "__dict__")
+
+def test_payee_slots_intern_short_values():
+    records = payees.xform(deepcopy(VALID_PAYEE) + deepcopy(VALID_PAYEE), "slots")
+    assert records[0]["payment_year"] is records[1]["payment_year"]
+
+@raises(KeyError)
+def test_payee_slots_unknown_field():
+    record = payees.xform(deepcopy(VALID_PAYEE), "slots")[0]
+    record["not_a_field"] = "1"
+
+@raises(KeyError)
+def test_payee_slots_method_is_not_a_field():
+    record = payees.xform(deepcopy(VALID_PAYEE), "slots")[0]
+    assert "keys" not in record
+    record["keys"]  # pylint: disable=pointless-statement
+
+@raises(ValueError)
+def test_payee_xform_unknown_storage():
+    payees.xform(deepcopy(VALID_PAYEE), "tuples")
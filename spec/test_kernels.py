@@ -0,0 +1,129 @@
+# pylint: disable=missing-docstring, invalid-name
+
+import re
+
+from fire.translator.kernels import identity, uppercase, digits_only, rjust_zero, \
+    zero_fill, STATE_CODES, combined_fed_state_code
+
+# The straightforward implementations that the kernels replaced
+def reference_digits_only(value):
+    return re.sub("[^0-9]*", "", value)
+
+def reference_rjust_zero(value, length):
+    digits = reference_digits_only(value)
+    return f"{digits:0>{length}}"
+
+"""
+identity
+"""
+def test_identity_returns_value():
+    value = "abc 123"
+    assert identity(value) is value
+
+"""
+uppercase
+"""
+def test_uppercase():
+    assert uppercase("Acme Corp. 1st") == "ACME CORP. 1ST"
+
+def test_uppercase_empty():
+    assert uppercase("") == ""
+
+"""
+digits_only
+"""
+def test_digits_only_all_digits():
+    assert digits_only("0123456789") == "0123456789"
+
+def test_digits_only_mixed_punctuation():
+    assert digits_only("12-3456789") == "123456789"
+    assert digits_only("(555) 123-4567 x.89") == "555123456789"
+    assert digits_only("$1,234.56") == "123456"
+
+def test_digits_only_no_digits():
+    assert digits_only("N/A") == ""
+
+def test_digits_only_empty():
+    assert digits_only("") == ""
+
+def test_digits_only_non_ascii_digits():
+    # Only ASCII 0-9 are kept, even though str.isdigit() accepts these
+    assert digits_only("١٢٣") == ""
+    assert digits_only("12²") == "12"
+    assert digits_only("１２ 34") == "34"
+
+def test_digits_only_non_ascii_mixed():
+    assert digits_only("Café #12-3") == "123"
+
+def test_digits_only_matches_reference():
+    values = ["", "123", "1-2-3", " 4 5 ", "١-1", "12²", "aéb9", "0000"]
+    for value in values:
+        assert digits_only(value) == reference_digits_only(value), value
+
+"""
+rjust_zero and zero_fill
+"""
+def test_rjust_zero_pads():
+    assert rjust_zero("123", 6) == "000123"
+
+def test_rjust_zero_strips_non_digits():
+    assert rjust_zero("1,234.56", 10) == "0000123456"
+
+def test_rjust_zero_empty():
+    assert rjust_zero("", 4) == "0000"
+
+def test_rjust_zero_overlong_not_truncated():
+    assert rjust_zero("1234567", 4) == "1234567"
+
+def test_zero_fill_pads():
+    assert zero_fill(6)("123") == "000123"
+
+def test_zero_fill_strips_non_digits():
+    assert zero_fill(10)("$1,234.56") == "0000123456"
+
+def test_zero_fill_empty():
+    assert zero_fill(4)("") == "0000"
+
+def test_zero_fill_overlong_not_truncated():
+    assert zero_fill(4)("1234567") == "1234567"
+    assert zero_fill(4)("12-345-67") == "1234567"
+
+def test_zero_fill_non_ascii_digits():
+    assert zero_fill(4)("١٢") == "0000"
+    assert zero_fill(4)("9²") == "0009"
+
+def test_zero_fill_kernel_shared_per_length():
+    assert zero_fill(12) is zero_fill(12)
+    assert zero_fill(12) is not zero_fill(13)
+    assert zero_fill(12).__name__ == "zero_fill_12"
+
+def test_zero_fill_matches_rjust_zero():
+    values = ["", "0", "123", "1,234.56", "1234567890123", "١-1", "x"]
+    for length in (1, 4, 12, 15):
+        for value in values:
+            expected = reference_rjust_zero(value, length)
+            assert rjust_zero(value, length) == expected, (value, length)
+            assert zero_fill(length)(value) == expected, (value, length)
+
+"""
+combined_fed_state_code
+"""
+def test_combined_fed_state_code():
+    assert combined_fed_state_code("CA") == 6
+    assert combined_fed_state_code("WI") == 55
+    assert combined_fed_state_code("AL") == 1
+
+def test_combined_fed_state_code_all_states():
+    for state, code in STATE_CODES.items():
+        assert combined_fed_state_code(state) == code
+
+def test_combined_fed_state_code_unknown_state():
+    # Not participating in the CF/SF program
+    assert combined_fed_state_code("TX") is None
+    assert combined_fed_state_code("ZZ") is None
+    assert combined_fed_state_code("") is None
+
+def test_combined_fed_state_code_lower_case():
+    # The lookup is case-sensitive
+    assert combined_fed_state_code("ca") is None
+    assert combined_fed_state_code(uppercase("ca")) == 6
@@ -0,0 +1,119 @@
+# pylint: disable=missing-docstring, invalid-name
+
+import gzip
+import os
+import zipfile
+
+from click.testing import CliRunner
+from nose.tools import raises
+
+from spec_util import in_temp_dir
+from fire.translator import translator
+from fire.translator.cli import cli
+from fire.translator.output import AtomicFile, write_output, member_name
+
+RECORD = 750*"A"
+
+"""
+Atomic output: output.write_output() and output.AtomicFile
+"""
+@in_temp_dir
+def test_write_output_str_bytes_and_records(temp_dir):
+    path = os.path.join(temp_dir, "out.ascii")
+    for data in [3*RECORD, (3*RECORD).encode("ascii"),
+                 memoryview((3*RECORD).encode("ascii")), iter([RECORD]*3)]:
+        write_output(data, path)
+        with open(path, mode='rb') as output_file:
+            assert output_file.read() == (3*RECORD).encode("ascii")
+    assert os.listdir(temp_dir) == ["out.ascii"]
+
+@in_temp_dir
+def test_write_output_non_ascii_keeps_existing_file(temp_dir):
+    path = os.path.join(temp_dir, "out.ascii")
+    translator.write_1099_file(RECORD, path)
+    try:
+        translator.write_1099_file(RECORD + "MÜNCHEN", path)
+        assert False, "non-ASCII output was written"
+    except Exception as ex: # pylint: disable=broad-except
+        assert "ASCII" in str(ex)
+    with open(path, mode='r', encoding='ascii') as output_file:
+        assert output_file.read() == RECORD
+    assert os.listdir(temp_dir) == ["out.ascii"]
+
+@in_temp_dir
+def test_write_output_permissions_follow_umask(temp_dir):
+    path = os.path.join(temp_dir, "out.ascii")
+    mask = os.umask(0o027)
+    try:
+        write_output(RECORD, path)
+        # The process-wide umask is left alone
+        assert os.umask(0o027) == 0o027
+    finally:
+        os.umask(mask)
+    assert os.stat(path).st_mode & 0o777 == 0o640
+
+@in_temp_dir
+def test_atomic_file_discarded_on_error(temp_dir):
+    path = os.path.join(temp_dir, "out.ascii")
+    try:
+        with AtomicFile(path, size=2*750) as output:
+            output.file.write(RECORD.encode("ascii"))
+            raise KeyError("payers")
+    except KeyError:
+        pass
+    assert os.listdir(temp_dir) == []
+
+@in_temp_dir
+def test_atomic_file_path_set_late(temp_dir):
+    with AtomicFile(dirname=temp_dir) as output:
+        output.file.write(RECORD.encode("ascii"))
+        output.path = os.path.join(temp_dir, "named_later.ascii")
+    assert os.listdir(temp_dir) == ["named_later.ascii"]
+
+@raises(FileNotFoundError)
+def test_write_output_missing_directory():
+    write_output(RECORD, "./spec/data/no_such_directory/out.ascii")
+
+"""
+Compressed output: write_output(compression=...) and member_name()
+"""
+@in_temp_dir
+def test_write_output_gzip(temp_dir):
+    path = os.path.join(temp_dir, "out.ascii.gz")
+    for data in [3*RECORD, iter([RECORD]*3)]:
+        translator.write_1099_file(data, path, "gzip", 1)
+        with gzip.open(path, mode='rb') as output_file:
+            assert output_file.read() == (3*RECORD).encode("ascii")
+    assert os.path.getsize(path) < 750
+    assert os.listdir(temp_dir) == ["out.ascii.gz"]
+
+@in_temp_dir
+def test_write_output_zip(temp_dir):
+    path = os.path.join(temp_dir, "out.ascii.zip")
+    for data in [3*RECORD, iter([RECORD]*3)]:
+        write_output(data, path, "zip")
+        with zipfile.ZipFile(path) as archive:
+            assert archive.namelist() == ["out.ascii"]
+            assert archive.read("out.ascii") == (3*RECORD).encode("ascii")
+    assert os.listdir(temp_dir) == ["out.ascii.zip"]
+
+@raises(ValueError)
+def test_write_output_unknown_compression():
+    write_output(RECORD, "./spec/data/out.ascii.bz2", "bzip2")
+
+def test_member_name():
+    assert member_name("out/filing.ascii.zip") == "filing.ascii"
+    assert member_name("out/filing.gz") == "filing"
+    assert member_name("out/filing") == "filing"
+
+@in_temp_dir
+def test_stream_cannot_compress(temp_dir):
+    # Placeholder records are overwritten in place, which a compressed
+    # stream does not allow
+    output_path = os.path.join(temp_dir, "out.ascii.gz")
+    result = CliRunner().invoke(cli, [
+        "./spec/data/valid_standard.json", "--output", output_path,
+        "--stream", "--compress", "gzip"])
+    assert result.exit_code == 2
+    assert "--compress" in result.output
+    assert os.listdir(temp_dir) == []
@@ -0,0 +1,30 @@
+# pylint: disable=missing-docstring, invalid-name
+
+from spec_util import fire_format, make_user_data
+from fire.translator import parallel
+
+"""
+Record counts: parallel.count_payer_records()
+"""
+def test_count_payer_records():
+    data = make_user_data([2])
+    assert parallel.count_payer_records(data["payers"][0]) == 4
+    # Two payees in two participating states: two K records
+    data = make_user_data([2], combined_fed_state=True,
+                          payee_states=["CA", "WI"])
+    assert parallel.count_payer_records(data["payers"][0]) == 6
+
+"""
+Parallel rendering: parallel.get_fire_format_parallel()
+"""
+def test_parallel_matches_sequential_in_process():
+    data = make_user_data([2]*6, combined_fed_state=True,
+                          payee_states=["CA", "WI"])
+    assert parallel.get_fire_format_parallel(data, workers=1) == \
+        fire_format(data)
+
+def test_parallel_matches_sequential_process_pool():
+    data = make_user_data([2]*6, combined_fed_state=True,
+                          payee_states=["CA", "WI"])
+    assert parallel.get_fire_format_parallel(data, workers=2) == \
+        fire_format(data)
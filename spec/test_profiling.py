@@ -0,0 +1,58 @@
+# pylint: disable=missing-docstring, invalid-name
+
+import os
+import pstats
+
+from nose.tools import raises
+
+from spec_util import VALID_MINIMAL_PATH, in_temp_dir
+from fire.translator import translator
+from fire.translator.profiling import STAGES, StageProfiler
+
+"""
+Stage profiling: profiling.StageProfiler
+"""
+@in_temp_dir
+def test_profiler_records_each_stage(temp_dir):
+    seen = []
+    profiler = StageProfiler(hooks=[seen.append])
+    translator.run(VALID_MINIMAL_PATH, os.path.join(temp_dir, "out.ascii"),
+                   profiler=profiler)
+    assert [stats.name for stats in profiler.stages] == STAGES
+    assert seen == profiler.stages
+    for stats in profiler.stages:
+        assert stats.wall_time >= 0
+        assert stats.cpu_time >= 0
+        assert stats.peak_memory >= 0
+    assert profiler.report().splitlines()[-1].startswith("total")
+
+def test_profiler_without_memory():
+    profiler = StageProfiler(memory=False)
+    with profiler.stage("render"):
+        pass
+    assert profiler.stages[0].peak_memory is None
+
+@in_temp_dir
+def test_profiler_cprofile_stats(temp_dir):
+    stats_path = os.path.join(temp_dir, "render.prof")
+    profiler = StageProfiler(cprofile_stages=["render"],
+                             stats_path=stats_path)
+    translator.run(VALID_MINIMAL_PATH, os.path.join(temp_dir, "out.ascii"),
+                   profiler=profiler)
+    functions = [function for _, _, function
+                 in pstats.Stats(stats_path).stats]
+    assert "get_fire_format" in functions
+    assert "load_full_schema" not in functions
+
+def test_profiler_records_failed_stage():
+    profiler = StageProfiler(memory=False)
+    try:
+        with profiler.stage("extract"):
+            raise KeyError("payers")
+    except KeyError:
+        pass
+    assert [stats.name for stats in profiler.stages] == ["extract"]
+
+@raises(ValueError)
+def test_profiler_cprofile_requires_stats_path():
+    StageProfiler(cprofile_stages=["render"])
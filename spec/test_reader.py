@@ -0,0 +1,92 @@
+# pylint: disable=missing-docstring, invalid-name
+
+import os
+
+from nose.tools import raises
+
+from spec_util import in_temp_dir, make_user_data, write_fire_file
+from fire.translator import translator
+from fire.translator.reader import FireReader
+
+def write_sample(temp_dir, payer_count=2):
+    path = os.path.join(temp_dir, "out.ascii")
+    user_data = make_user_data([2]*payer_count, combined_fed_state=True)
+    return path, write_fire_file(path, user_data)
+
+"""
+Reader: reader.FireReader
+"""
+@in_temp_dir
+def test_reader_decodes_records_as_rendered(temp_dir):
+    path, data = write_sample(temp_dir)
+    with FireReader(path) as reader:
+        assert len(reader) == translator.count_records(data)
+        assert reader.record(0).to_dict() == \
+            {k: v.rstrip("\x00") for k, v in data["transmitter"].items()}
+        payee = data["payers"][1]["payees"][0]
+        found = reader.find_payees(payee["payees_tin"])
+        assert len(found) == 1
+        assert found[0].record_type == "B"
+        assert found[0].to_dict() == payee
+        assert found[0]["payment_amount_1"] == payee["payment_amount_1"]
+        assert reader.record(-1).record_type == "F"
+
+@in_temp_dir
+def test_reader_index(temp_dir):
+    path, _ = write_sample(temp_dir)
+    with FireReader(path) as reader:
+        payers = reader.payers()
+        assert [payer["payer_tin"] for payer in payers] == \
+            ["200000000", "200000001"]
+        assert reader.find_payers("200000001")[0].index == payers[1].index
+        assert reader.find_payers("999999999") == []
+
+        payees = reader.payees(payers[1].index)
+        assert [payee.record_type for payee in payees] == ["B"]*len(payees)
+        assert reader.payer_of(payees[0]).index == payers[1].index
+        tin = payees[0]["payees_tin"]
+        assert len(reader.find_payees(tin, payer_tin="200000001")) == 1
+        assert reader.find_payees(tin, payer_tin="200000000") == []
+
+        assert reader.record_types[0] == "T"
+        assert "".join(r.record_type for r in reader.records()) == \
+            reader.record_types
+        assert [r.index for r in reader.records("C")] == \
+            [i for i, t in enumerate(reader.record_types) if t == "C"]
+
+@in_temp_dir
+def test_reader_record_types_before_index(temp_dir):
+    path, data = write_sample(temp_dir)
+    with FireReader(path) as reader:
+        # First thing read, before anything else builds the index
+        assert reader.record_types == \
+            "TA" + "B"*len(data["payers"][0]["payees"]) + "C" + "K" + \
+            "A" + "B"*len(data["payers"][1]["payees"]) + "C" + "K" + "F"
+
+@in_temp_dir
+def test_reader_zero_filled_fields_keep_trailing_zeros(temp_dir):
+    # Totals are zero-filled on the left: their zeros are part of the value
+    path, data = write_sample(temp_dir, payer_count=1)
+    end_of_payer = data["payers"][0]["end_of_payer"]
+    with FireReader(path) as reader:
+        found = next(reader.records("C"))
+        assert found["payment_amount_1"] == end_of_payer["payment_amount_1"]
+        assert found["payment_amount_1"].endswith("0")
+        assert found["payment_amount_2"] == 18*"0"
+        assert found["number_of_payees"] == end_of_payer["number_of_payees"]
+
+@in_temp_dir
+def test_reader_empty_file(temp_dir):
+    path = os.path.join(temp_dir, "empty.ascii")
+    open(path, mode='wb').close()
+    with FireReader(path) as reader:
+        assert len(reader) == 0
+        assert reader.find_payees("123456789") == []
+
+@raises(Exception)
+@in_temp_dir
+def test_reader_truncated_file(temp_dir):
+    path = os.path.join(temp_dir, "short.ascii")
+    with open(path, mode='wb') as file:
+        file.write(b"T"*749)
+    FireReader(path)
@@ -0,0 +1,104 @@
+# pylint: disable=missing-docstring, invalid-name
+
+import os
+
+from click.testing import CliRunner
+from nose.tools import raises
+
+from spec_util import VALID_MINIMAL_PATH, in_temp_dir, make_user_data, write_input
+from fire.translator import split, translator
+from fire.translator.cli import cli
+from fire.translator.reader import FireReader
+
+"""
+Split: split.split_user_data()
+"""
+def test_split_packs_payers():
+    parts = split.split_user_data(make_user_data([3, 2, 4]), 11)
+    # A payer block of n payees has n + 2 records; parts hold 9 besides T, F
+    assert [[len(payer_data["payees"]) for payer_data in part["payers"]]
+            for part in parts] == [[3, 2], [4]]
+    for part in parts:
+        translator.validate_user_data(part)
+
+def test_split_fits_in_one_part():
+    user_data = make_user_data([3, 2, 4])
+    parts = split.split_user_data(user_data, 100)
+    assert parts == [user_data]
+
+def test_split_large_payer():
+    parts = split.split_user_data(make_user_data([1, 10]), 7)
+    assert [[(payer_data["payer_tin"], len(payer_data["payees"]))
+             for payer_data in part["payers"]] for part in parts] == \
+        [[("200000000", 1)], [("200000001", 3)], [("200000001", 3)],
+         [("200000001", 3)], [("200000001", 1)]]
+
+def test_split_large_payer_with_state_totals():
+    parts = split.split_user_data(make_user_data([10], True), 8)
+    # One K record per piece: 8 - T, F, A, C, K leaves 3 payees
+    assert [len(part["payers"][0]["payees"]) for part in parts] == [3, 3, 3, 1]
+
+@raises(ValueError)
+def test_split_limit_too_small():
+    split.split_user_data(make_user_data([2], True), 5)
+
+def test_split_output_paths():
+    assert split.split_output_paths("out/filing.ascii", 2) == \
+        ["out/filing.001.ascii", "out/filing.002.ascii"]
+
+"""
+Split: split.run_split()
+"""
+@in_temp_dir
+def test_run_split(temp_dir):
+    input_path = write_input(temp_dir, make_user_data([3, 2, 4]))
+    output_path = os.path.join(temp_dir, "filing.ascii")
+    parts = split.run_split(input_path, output_path, max_records=11, workers=2)
+    assert [part["output_path"] for part in parts] == \
+        split.split_output_paths(output_path, 2)
+    assert [part["payee_count"] for part in parts] == [5, 4]
+
+    for part in parts:
+        with FireReader(part["output_path"]) as reader:
+            assert reader.record_types[0] == "T"
+            assert reader.record_types[-1] == "F"
+            assert len(reader) == part["record_count"] <= 11
+            assert [record["record_sequence_number"] for record in
+                    (reader.record(index) for index in range(len(reader)))] == \
+                [f"{number:08d}" for number in range(1, len(reader) + 1)]
+            assert reader.record(0)["total_number_of_payees"] == \
+                f"{part['payee_count']:08d}"
+
+@in_temp_dir
+def test_run_split_max_bytes(temp_dir):
+    input_path = write_input(temp_dir, make_user_data([3, 2, 4]))
+    output_path = os.path.join(temp_dir, "filing.ascii")
+    parts = split.run_split(input_path, output_path, max_bytes=11*750 + 749,
+                            workers=1)
+    assert [part["record_count"] for part in parts] == [11, 8]
+
+@in_temp_dir
+def test_split_command(temp_dir):
+    input_path = write_input(temp_dir, make_user_data([1, 10]))
+    output_path = os.path.join(temp_dir, "filing.ascii")
+    result = CliRunner().invoke(cli, ["split", input_path, "--output",
+                                      output_path, "--max-records", "7"])
+    assert result.exit_code == 0
+    assert len(result.stdout.splitlines()) == 5
+    assert sorted(os.listdir(temp_dir)) == \
+        [f"filing.00{number}.ascii" for number in range(1, 6)] + \
+        ["input.json"]
+
+@in_temp_dir
+def test_split_command_huge_max_bytes(temp_dir):
+    # A limit beyond what a transmission can hold is capped, not rejected
+    input_path = write_input(temp_dir, make_user_data([3, 2, 4]))
+    output_path = os.path.join(temp_dir, "filing.ascii")
+    result = CliRunner().invoke(cli, ["split", input_path, "--output",
+                                      output_path, "--max-bytes", str(10**12)])
+    assert result.exit_code == 0, result.output
+    assert sorted(os.listdir(temp_dir)) == ["filing.001.ascii", "input.json"]
+
+def test_split_command_requires_limit():
+    result = CliRunner().invoke(cli, ["split", VALID_MINIMAL_PATH])
+    assert result.exit_code == 2
@@ -0,0 +1,28 @@
+# pylint: disable=missing-docstring, invalid-name
+
+import subprocess
+import sys
+
+def imported_modules(statement):
+    result = subprocess.run(
+        [sys.executable, "-c",
+         statement + "\nimport sys\nprint('\\n'.join(sys.modules))"],
+        stdout=subprocess.PIPE, universal_newlines=True, check=True)
+    return set(result.stdout.split())
+
+"""
+Startup: optional and heavy dependencies are imported on first use
+"""
+def test_startup_translator_import_is_lazy():
+    modules = imported_modules("from fire.translator import translator")
+    assert "jsonschema" not in modules
+    assert "numpy" not in modules
+    assert "concurrent.futures.process" not in modules
+
+def test_startup_validation_imports_jsonschema():
+    modules = imported_modules(
+        "from fire.translator import translator\n"
+        "translator.validate_user_data("
+        "translator.extract_user_data('./spec/data/valid_minimal.json'))")
+    assert "jsonschema" in modules
+    assert "numpy" not in modules
@@ -0,0 +1,115 @@
+# pylint: disable=missing-docstring, invalid-name
+
+import io
+import json
+import os
+
+from copy import deepcopy
+
+from jsonschema.exceptions import ValidationError
+from nose.tools import raises
+
+from spec_util import VALID_MINIMAL_PATH, fire_format, load_user_data
+from fire.translator import translator
+from fire.translator.json_stream import iter_user_data
+from fire.translator.stream import run_stream, write_stream
+from fire.translator.validation import get_incremental_validator
+
+OUTPUT_FILE_PREFIX = "./spec/data/test_outfile"
+
+VALID_MINIMAL_DATA = load_user_data()
+
+def stream_format(data, chunk_size=65536):
+    events = iter_user_data(io.StringIO(json.dumps(data)), chunk_size)
+    output = io.BytesIO()
+    write_stream(events, output)
+    return output.getvalue().decode("ascii")
+
+def validate_stream(data):
+    events = iter_user_data(io.StringIO(json.dumps(data)))
+    write_stream(events, io.BytesIO(),
+                 get_incremental_validator(translator.SCHEMA_PATH))
+
+"""
+Incremental JSON parsing: json_stream.iter_user_data()
+"""
+def test_iter_user_data_event_order():
+    events = list(iter_user_data(io.StringIO(json.dumps(VALID_MINIMAL_DATA))))
+    kinds = [kind for kind, _ in events]
+    assert kinds == ["transmitter", "payer", "payee", "payee", "end_of_payer",
+                     "document"]
+    assert events[2][1] == VALID_MINIMAL_DATA["payers"][0]["payees"][0]
+    assert events[-1][1] == dict(VALID_MINIMAL_DATA, payers=[])
+
+def test_iter_user_data_small_chunks():
+    text = json.dumps(VALID_MINIMAL_DATA, indent=4)
+    events = list(iter_user_data(io.StringIO(text), chunk_size=7))
+    assert [kind for kind, _ in events] == \
+        ["transmitter", "payer", "payee", "payee", "end_of_payer", "document"]
+    assert events[0][1] == VALID_MINIMAL_DATA["transmitter"]
+
+def test_iter_user_data_end_of_payer_has_payees():
+    events = list(iter_user_data(io.StringIO(json.dumps(VALID_MINIMAL_DATA))))
+    assert events[-2][1]["payees"] == []
+
+"""
+Streaming output: stream.write_stream()
+"""
+def test_stream_matches_fire_format():
+    assert stream_format(VALID_MINIMAL_DATA, chunk_size=16) == \
+        fire_format(VALID_MINIMAL_DATA)
+
+def test_stream_matches_fire_format_combined_fed_state():
+    temp = deepcopy(VALID_MINIMAL_DATA)
+    temp["payers"].append(deepcopy(temp["payers"][0]))
+    temp["payers"][1]["payees"][1]["payee_state"] = "WI"
+    temp["payers"][1]["combined_fed_state"] = "1"
+    ascii_string = stream_format(temp)
+    assert ascii_string == fire_format(temp)
+    record_types = ascii_string[::750]
+    assert record_types == "TABBCABBCKKF"
+
+def test_stream_combined_fed_state_after_payees():
+    temp = deepcopy(VALID_MINIMAL_DATA)
+    payees = temp["payers"][0].pop("payees")
+    temp["payers"][0]["payees"] = payees
+    temp["payers"][0]["combined_fed_state"] = "1"
+    assert list(temp["payers"][0].keys())[-1] == "combined_fed_state"
+    assert stream_format(temp) == fire_format(temp)
+
+def test_run_stream_output_file():
+    output_path = f"{OUTPUT_FILE_PREFIX}_stream_valid.ascii"
+    summary = run_stream(VALID_MINIMAL_PATH, output_path)
+    assert summary["record_count"] == 6
+    assert summary["payee_count"] == 2
+    assert os.path.getsize(output_path) == 4500
+    os.remove(output_path)
+
+@raises(ValidationError)
+def test_stream_payer_without_payees():
+    # Rejected, as it is by full validation
+    temp = deepcopy(VALID_MINIMAL_DATA)
+    del temp["payers"][0]["payees"]
+    validate_stream(temp)
+
+@raises(ValidationError)
+def test_stream_payees_not_an_array():
+    temp = deepcopy(VALID_MINIMAL_DATA)
+    temp["payers"][0]["payees"] = "payees"
+    validate_stream(temp)
+
+@raises(ValidationError)
+def test_stream_without_transmitter():
+    temp = deepcopy(VALID_MINIMAL_DATA)
+    del temp["transmitter"]
+    validate_stream(temp)
+
+@raises(ValidationError)
+def test_stream_payers_not_an_array():
+    # Rejected by validation, as it is by the non-streaming translator,
+    # rather than by the JSON parser
+    validate_stream(dict(VALID_MINIMAL_DATA, payers={}))
+
+@raises(ValidationError)
+def test_stream_document_not_an_object():
+    validate_stream([VALID_MINIMAL_DATA])
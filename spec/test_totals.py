@@ -0,0 +1,70 @@
+# pylint: disable=missing-docstring, invalid-name
+
+import json
+
+from copy import deepcopy
+from unittest import SkipTest
+
+from fire.entities import payees, end_of_payer
+from fire.translator import totals
+
+with open("./spec/data/valid_minimal.json", mode='r', encoding='utf-8') as file:
+    VALID_PAYEES = json.load(file)["payers"][0]["payees"]
+
+def many_payees():
+    data = []
+    for i in range(200):
+        payee = deepcopy(VALID_PAYEES[i % 2])
+        payee["payee_state"] = ["CA", "NY", "WI", "AL"][i % 4]
+        payee["payment_amount_7"] = str(1000 + i)
+        payee["payment_amount_1"] = str(i % 3)
+        data.append(payee)
+    return payees.xform(data)
+
+def insert_totals(engine, combined_fed_state):
+    transformed = many_payees()
+    result = totals.compute_totals(transformed, combined_fed_state, engine)
+    current_payer = {"end_of_payer": end_of_payer.xform({}),
+                     "combined_fed_state": combined_fed_state}
+    result.insert(current_payer)
+    return current_payer, transformed
+
+"""
+Payer totals: totals.compute_totals()
+"""
+def test_python_totals():
+    current_payer, _ = insert_totals("python", "")
+    assert current_payer["amount_codes"] == "17"
+    assert current_payer["end_of_payer"]["number_of_payees"] == "00000200"
+    assert current_payer["end_of_payer"]["payment_amount_7"] == \
+        f"{sum(range(1000, 1200)):0>18}"
+    assert "state_totals" not in current_payer
+
+def test_python_state_totals():
+    current_payer, transformed = insert_totals("python", "1")
+    state_codes = [state["combined_federal_state_code"]
+                   for state in current_payer["state_totals"]]
+    # Ordered by first appearance; NY does not participate in CF/SF
+    assert state_codes == ["06", "55", "01"]
+    assert current_payer["state_totals"][0]["number_of_payees"] == "00000050"
+    assert transformed[0]["combined_federal_state_code"] == "06"
+    assert transformed[1]["combined_federal_state_code"] == ""
+
+def test_numpy_totals_match_python():
+    if not totals.has_numpy():
+        raise SkipTest("numpy is not installed")
+    for combined_fed_state in ["", "1"]:
+        assert insert_totals("numpy", combined_fed_state) == \
+            insert_totals("python", combined_fed_state)
+
+def test_numpy_totals_irregular_amounts():
+    if not totals.has_numpy():
+        raise SkipTest("numpy is not installed")
+    # Amounts that are not fixed-width digit strings fall back to Python
+    transformed = many_payees()
+    transformed[3]["payment_amount_2"] = "12"
+    transformed[5]["payment_amount_4"] = "N/A"
+    numpy_totals = totals.compute_totals(deepcopy(transformed), "1", "numpy")
+    python_totals = totals.compute_totals(deepcopy(transformed), "1", "python")
+    assert numpy_totals.totals == python_totals.totals
+    assert numpy_totals.states == python_totals.states
@@ -1,5 +1,6 @@
 # pylint: disable=missing-docstring, invalid-name
 
+import json
 import os
 import re
 
@@ -11,7 +12,7 @@ from spec_util import check_blanks, \
                       PAYER_BLANK_MAP, PAYEE_BLANK_MAP, \
                       END_OF_PAYER_BLANK_MAP, END_OF_TRANSMISSION_BLANK_MAP, \
                       TRANSMITTER_BLANK_MAP, VALID_ALL_DATA, \
-                      VALID_ALL_PATH
+                      VALID_ALL_PATH, load_user_data
 from fire.translator import translator
 
 # Tests whether a correct input file generates a correct output file
@@ -136,3 +137,60 @@ def test_translator_get_fire_format():
 
     for (offset, inclusive_bound) in END_OF_TRANSMISSION_BLANK_MAP:
         yield check_blanks, ascii_string[(offset + 749*5):inclusive_bound]
+
+# Checks that the preallocated buffer holds exactly the records produced by
+# get_fire_format, and that its size is known before rendering
+def test_translator_get_fire_buffer():
+    data = translator.load_full_schema(load_user_data())
+    translator.insert_generated_values(data)
+    assert translator.count_records(data) == 6
+
+    buffer = translator.get_fire_buffer(data)
+    assert buffer.count == 6
+    assert len(buffer.getbuffer()) == 4500
+    assert buffer.getvalue() == translator.get_fire_format(data).encode("ascii")
+
+# Checks that the fused single-pass insert_generated_values produces the same
+# records as the individual insert_* functions called in turn
+def test_translator_insert_generated_values_fused():
+    user_data = load_user_data(combined_fed_state=True)
+    user_data["payers"].append(user_data["payers"][0])
+
+    fused = translator.load_full_schema(user_data)
+    translator.insert_generated_values(fused)
+
+    separate = translator.load_full_schema(user_data)
+    translator.insert_payers_totals(separate)
+    translator.insert_transmitter_totals(separate)
+    translator.create_and_insert_state_totals(separate)
+    translator.insert_sequence_numbers(separate)
+
+    assert fused == separate
+    assert fused["payers"][1]["state_totals"][0]["record_sequence_number"] == \
+        "00000011"
+
+# Checks that slotted payee records produce the same output and debug JSON
+# as dicts
+def test_translator_slots_storage():
+    user_data = load_user_data(combined_fed_state=True)
+
+    master = translator.load_full_schema(user_data)
+    translator.insert_generated_values(master)
+    slotted = translator.load_full_schema(user_data, "slots")
+    translator.insert_generated_values(slotted)
+    assert translator.get_fire_format(slotted) == \
+        translator.get_fire_format(master)
+    assert translator.dump_master(slotted) == json.dumps(master, indent=4)
+
+# Checks that a payer whose payees all have zero amounts gets blank
+# amount_codes, rather than the payer layout's default
+def test_translator_zero_amounts_blank_amount_codes():
+    user_data = load_user_data()
+    for payee in user_data["payers"][0]["payees"]:
+        payee["payment_amount_7"] = "0.00"
+
+    master = translator.load_full_schema(user_data)
+    translator.insert_generated_values(master)
+    assert master["payers"][0]["amount_codes"] == ""
+    assert master["payers"][0]["end_of_payer"]["payment_amount_7"] == \
+        "000000000000000000"
@@ -0,0 +1,167 @@
+# pylint: disable=missing-docstring, invalid-name
+
+import json
+import os
+import shutil
+
+from copy import deepcopy
+
+import jsonschema
+
+from click.testing import CliRunner
+from nose.tools import raises
+
+from spec_util import SCHEMA, in_temp_dir, load_user_data, write_input
+from fire.translator import translator, validation
+from fire.translator.cli import cli
+
+VALID_MINIMAL_DATA = load_user_data()
+
+"""
+Cached validators: validation.get_validator()
+"""
+def test_validator_is_cached():
+    assert validation.get_validator() is validation.get_validator()
+    assert translator.get_validator() is validation.get_validator()
+
+@in_temp_dir
+def test_validator_rebuilt_when_schema_modified(temp_dir):
+    schema_path = os.path.join(temp_dir, "schema.json")
+    shutil.copy(validation.SCHEMA_PATH, schema_path)
+    first = validation.get_validator(schema_path)
+    stat = os.stat(schema_path)
+    os.utime(schema_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert validation.get_validator(schema_path) is not first
+
+def test_validator_compiles_patterns():
+    validation.get_validator()
+    tin_pattern = SCHEMA["definitions"]["tin"]["pattern"]
+    assert tin_pattern in validation._PATTERNS  # pylint: disable=protected-access
+
+"""
+Validation results: translator.validate_user_data()
+"""
+def test_validate_valid_data():
+    assert translator.validate_user_data(VALID_MINIMAL_DATA) is None
+
+@raises(jsonschema.exceptions.ValidationError)
+def test_validate_invalid_tin():
+    temp = deepcopy(VALID_MINIMAL_DATA)
+    temp["payers"][0]["payees"][1]["payees_tin"] = "12-ABCDEFG"
+    translator.validate_user_data(temp)
+
+def test_validate_same_error_as_jsonschema():
+    temp = deepcopy(VALID_MINIMAL_DATA)
+    temp["transmitter"]["company_zip_code"] = "1001"
+    temp["payers"][0]["payees"][0]["payment_amount_7"] = "€1.00"
+    expected = jsonschema.exceptions.best_match(
+        jsonschema.Draft4Validator(SCHEMA).iter_errors(temp))
+    try:
+        translator.validate_user_data(temp)
+    except jsonschema.exceptions.ValidationError as error:
+        assert list(error.absolute_path) == list(expected.absolute_path)
+        assert error.message == expected.message
+    else:
+        assert False, "Invalid data passed validation"
+
+"""
+Incremental validation: validation.IncrementalValidator
+"""
+def test_validate_incremental_valid_data():
+    assert translator.validate_user_data(VALID_MINIMAL_DATA,
+                                         incremental=True) is None
+
+def test_validate_incremental_error_path():
+    temp = deepcopy(VALID_MINIMAL_DATA)
+    temp["payers"][0]["payees"][1]["payees_tin"] = "12-ABCDEFG"
+    try:
+        validation.validate_incremental(temp, chunk_size=1)
+    except jsonschema.exceptions.ValidationError as error:
+        assert list(error.absolute_path) == \
+            ["payers", 0, "payees", 1, "payees_tin"]
+    else:
+        assert False, "Invalid data passed validation"
+
+@raises(jsonschema.exceptions.ValidationError)
+def test_validate_incremental_payer_header():
+    temp = deepcopy(VALID_MINIMAL_DATA)
+    del temp["payers"][0]["payer_tin"]
+    translator.validate_user_data(temp, incremental=True)
+
+def test_validate_incremental_payer_without_payees():
+    temp = deepcopy(VALID_MINIMAL_DATA)
+    del temp["payers"][0]["payees"]
+    try:
+        validation.validate_incremental(temp)
+    except jsonschema.exceptions.ValidationError as error:
+        assert error.message == "'payees' is a required property"
+        assert list(error.absolute_path) == ["payers", 0]
+    else:
+        assert False, "Invalid data passed validation"
+
+def test_validate_incremental_payees_not_an_array():
+    temp = deepcopy(VALID_MINIMAL_DATA)
+    temp["payers"][0]["payees"] = "payees"
+    try:
+        validation.validate_incremental(temp)
+    except jsonschema.exceptions.ValidationError as error:
+        assert error.validator == "type"
+        assert list(error.absolute_path) == ["payers", 0, "payees"]
+    else:
+        assert False, "Invalid data passed validation"
+
+def test_validate_payees_in_chunks():
+    validator = validation.get_incremental_validator()
+    payees = VALID_MINIMAL_DATA["payers"][0]["payees"]*5
+    validated = list(validator.validate_payees(iter(payees), 0, chunk_size=3))
+    assert validated == payees
+
+"""
+Collecting every error: validation.collect_errors()
+"""
+def make_invalid_data():
+    temp = deepcopy(VALID_MINIMAL_DATA)
+    temp["transmitter"]["company_zip_code"] = "1001"
+    temp["payers"] = [deepcopy(temp["payers"][0]) for _ in range(3)]
+    temp["payers"][0]["payees"] = temp["payers"][0]["payees"]*4
+    temp["payers"][0]["payees"][1] = dict(temp["payers"][0]["payees"][1],
+                                          payees_tin="12-ABCDEFG")
+    temp["payers"][0]["payees"][6] = dict(temp["payers"][0]["payees"][6],
+                                          payment_amount_7="€1.00")
+    del temp["payers"][1]["payer_tin"]
+    temp["payers"][2]["payees"] = "none"
+    return temp
+
+def test_collect_errors_valid_data():
+    assert validation.collect_errors(VALID_MINIMAL_DATA) == []
+
+def test_collect_errors_finds_every_error():
+    errors = validation.collect_errors(make_invalid_data(), workers=1,
+                                       chunk_size=3)
+    assert [validation.format_path(error.path) for error in errors] == [
+        "$.transmitter.company_zip_code",
+        "$.payers[0].payees[1].payees_tin",
+        "$.payers[0].payees[6].payment_amount_7",
+        "$.payers[1]",
+        "$.payers[2].payees"]
+    assert [error.validator for error in errors] == \
+        ["pattern", "pattern", "pattern", "required", "type"]
+
+def test_collect_errors_in_workers():
+    data = make_invalid_data()
+    assert validation.collect_errors(data, workers=2, chunk_size=3) == \
+        validation.collect_errors(data, workers=1)
+
+@in_temp_dir
+def test_validate_command(temp_dir):
+    input_path = write_input(temp_dir, make_invalid_data())
+    result = CliRunner().invoke(cli, ["validate", input_path, "--workers", "1"])
+    assert result.exit_code == 1
+    lines = result.stdout.splitlines()
+    assert lines[1].startswith("$.payers[0].payees[1].payees_tin: ")
+    assert lines[-1] == "5 errors"
+
+    result = CliRunner().invoke(cli, ["validate", input_path, "--json"])
+    assert json.loads(result.stdout)[3] == dict(
+        path=["payers", 1], message="'payer_tin' is a required property",
+        validator="required")